@@ -16,6 +16,13 @@ class DatabaseConfig(BaseModel):
         "REDIS_URL", "redis://redis.observability.svc.cluster.local:6379/0"
     )
     alert_debounce_seconds: int = int(os.getenv("ALERT_DEBOUNCE_SECONDS", "120"))
+    shared_circuit_state: bool = os.getenv("CB_SHARED_STATE", "false").lower() == "true"
+    circuit_state_cache_ttl: float = float(os.getenv("CB_STATE_CACHE_TTL", "1.0"))
+    shared_target_locks: bool = (
+        os.getenv("TARGET_LOCK_SHARED", "false").lower() == "true"
+    )
+    target_lock_ttl: float = float(os.getenv("TARGET_LOCK_TTL", "60"))
+    target_lock_wait: float = float(os.getenv("TARGET_LOCK_WAIT", "30"))
 
 
 class LLMConfig(BaseModel):
@@ -31,6 +38,40 @@ class LLMConfig(BaseModel):
     max_retries: int = int(os.getenv("OLLAMA_MAX_RETRIES", "3"))
     base_wait: float = float(os.getenv("OLLAMA_BASE_WAIT", "2.0"))
     timeout: int = int(os.getenv("OLLAMA_TIMEOUT", "120"))
+    # Retries across all callers are capped to this fraction of successes
+    retry_budget_ratio: float = float(os.getenv("OLLAMA_RETRY_BUDGET_RATIO", "0.1"))
+    retry_budget_max: float = float(os.getenv("OLLAMA_RETRY_BUDGET_MAX", "10"))
+    # Hedge to a secondary Ollama once a call outlives the primary's p95
+    secondary_url: str = os.getenv("OLLAMA_SECONDARY_URL", "")
+    hedge_delay: float = float(os.getenv("OLLAMA_HEDGE_DELAY", "60"))
+    hedge_min_samples: int = int(os.getenv("OLLAMA_HEDGE_MIN_SAMPLES", "20"))
+    # Client-side balancing over one Ollama per GPU node (base URLs). Empty
+    # means the single server behind OLLAMA_URL / OLLAMA_CHAT_URL.
+    endpoints: List[str] = [
+        u.strip() for u in os.getenv("OLLAMA_ENDPOINTS", "").split(",") if u.strip()
+    ]
+    lb_policy: str = os.getenv("OLLAMA_LB_POLICY", "least_outstanding")  # or ewma
+    probe_interval: float = float(os.getenv("OLLAMA_PROBE_INTERVAL", "15"))
+    # keep_alive follows alert traffic within these bounds (seconds)
+    keep_alive_min: float = float(os.getenv("OLLAMA_KEEP_ALIVE_MIN", "300"))
+    keep_alive_max: float = float(os.getenv("OLLAMA_KEEP_ALIVE_MAX", "3600"))
+    warm_on_startup: bool = (
+        os.getenv("OLLAMA_WARM_ON_STARTUP", "true").lower() == "true"
+    )
+    prewarm_on_pending: bool = (
+        os.getenv("OLLAMA_PREWARM_ON_PENDING", "true").lower() == "true"
+    )
+    # Per-role models (empty = OLLAMA_MODEL). A role's answer that fails its
+    # quality check is regenerated with the fallback model.
+    specialist_model: str = os.getenv("OLLAMA_SPECIALIST_MODEL", "")
+    director_model: str = os.getenv("OLLAMA_DIRECTOR_MODEL", "")
+    fallback_model: str = os.getenv("OLLAMA_FALLBACK_MODEL", "")
+    specialist_min_chars: int = int(os.getenv("OLLAMA_SPECIALIST_MIN_CHARS", "40"))
+
+    def model_for(self, role: Optional[str]) -> str:
+        """Model serving ``role`` (specialist, director or fallback)"""
+        role_model = getattr(self, f"{role}_model", "") if role else ""
+        return role_model or self.model
 
 
 class GitOpsConfig(BaseModel):
@@ -42,12 +83,35 @@ class GitOpsConfig(BaseModel):
         os.getenv("MANIFESTS_BASE_DIR", "apps/online-boutique"),
         "kubernetes-manifests.yaml",
     )
+    # Scanned recursively for the manifest that defines each workload
+    manifest_search_dirs: List[str] = [
+        d
+        for d in [os.getenv("MANIFESTS_BASE_DIR", "apps/online-boutique")]
+        + os.getenv("MANIFEST_EXTRA_DIRS", "").split(",")
+        if d
+    ]
     git_repo_dir: str = os.getenv("GIT_REPO_DIR", "/workspace")
     git_remote: str = os.getenv("GIT_REMOTE", "origin")
     git_branch: str = os.getenv("GIT_BRANCH", "main")
     github_token: str = os.getenv("GITHUB_TOKEN", "")
     runbooks_dir: str = os.getenv("RUNBOOKS_DIR", "runbooks")
     post_mortems_dir: str = os.getenv("POST_MORTEMS_DIR", "post-mortems")
+    git_backend: str = os.getenv("GIT_BACKEND", "auto")
+    # Agent-managed shallow, sparse clone (GIT_REPO_URL is cloned when
+    # GIT_REPO_DIR holds no repository yet)
+    git_repo_url: str = os.getenv("GIT_REPO_URL", "")
+    manage_working_copy: bool = (
+        os.getenv("GIT_MANAGE_WORKING_COPY", "false").lower() == "true"
+    )
+    sparse_checkout: bool = os.getenv("GIT_SPARSE_CHECKOUT", "true").lower() == "true"
+    clone_depth: int = int(os.getenv("GIT_CLONE_DEPTH", "1"))
+    sync_before_commit: bool = (
+        os.getenv("GITOPS_SYNC_BEFORE_COMMIT", "true").lower() == "true"
+    )
+    push_retries: int = int(os.getenv("GITOPS_PUSH_RETRIES", "2"))
+    batch_window: float = float(os.getenv("GITOPS_BATCH_WINDOW", "0.5"))
+    batch_max: int = int(os.getenv("GITOPS_BATCH_MAX", "20"))
+    commit_timeout: float = float(os.getenv("GITOPS_COMMIT_TIMEOUT", "120"))
 
 
 class SecurityConfig(BaseModel):
@@ -77,6 +141,57 @@ class VectorStoreConfig(BaseModel):
         "VECTOR_STORE_DIR",
         os.path.join(os.path.dirname(__file__), "..", "..", "data", "vector_store"),
     )
+    # Near-duplicate collapsing at ingest time (SimHash over normalized text)
+    near_dup_enabled: bool = os.getenv("NEAR_DUP_ENABLED", "true").lower() == "true"
+    near_dup_max_distance: int = int(os.getenv("NEAR_DUP_MAX_DISTANCE", "3"))
+    # Compressed embeddings: none | int8 | pq (exact float re-rank of candidates)
+    quantization: str = os.getenv("VECTOR_QUANTIZATION", "none").lower()
+    pq_m: int = int(os.getenv("PQ_M", "48"))
+    pq_train_size: int = int(os.getenv("PQ_TRAIN_SIZE", "10000"))
+    rerank_factor: int = int(os.getenv("QUANT_RERANK_FACTOR", "4"))
+
+
+class KubernetesConfig(BaseModel):
+    """Kubernetes API access."""
+
+    # Watch-backed cache of Deployments/Rollouts in the safe namespaces
+    informer_enabled: bool = os.getenv("K8S_INFORMER_ENABLED", "true").lower() == "true"
+    watch_timeout: int = int(os.getenv("K8S_WATCH_TIMEOUT", "300"))
+    # How long a remediated target may take to converge before it counts as failed
+    verify_timeout: float = float(os.getenv("ROLLOUT_VERIFY_TIMEOUT", "300"))
+
+
+class FastPathConfig(BaseModel):
+    """Fast-path remediation of known incidents."""
+
+    enabled: bool = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+    # Post-mortems retrieved from RAG must be at least this similar
+    min_similarity: float = float(os.getenv("FAST_PATH_MIN_SIMILARITY", "0.92"))
+    # Run the LLM pipeline in the background to audit replayed actions
+    audit: bool = os.getenv("FAST_PATH_AUDIT", "true").lower() == "true"
+
+
+class PersistenceConfig(BaseModel):
+    """Background persistence of post-mortems, runbooks and their embeddings."""
+
+    enabled: bool = os.getenv("PERSIST_ASYNC", "true").lower() == "true"
+    # Journal of accepted jobs, replayed at startup; empty keeps them in memory
+    spool_dir: str = os.getenv(
+        "PERSIST_SPOOL_DIR",
+        os.path.join(os.path.dirname(__file__), "..", "..", "data", "persist-spool"),
+    )
+    max_pending: int = int(os.getenv("PERSIST_MAX_PENDING", "500"))
+    batch_max: int = int(os.getenv("PERSIST_BATCH_MAX", "32"))
+    batch_window: float = float(os.getenv("PERSIST_BATCH_WINDOW", "0.5"))
+    max_attempts: int = int(os.getenv("PERSIST_MAX_ATTEMPTS", "5"))
+    retry_backoff: float = float(os.getenv("PERSIST_RETRY_BACKOFF", "2.0"))
+    # How long a full queue may block the caller before it persists inline
+    submit_timeout: float = float(os.getenv("PERSIST_SUBMIT_TIMEOUT", "5.0"))
+    # Older post-mortems are rolled into compressed monthly archive segments
+    archive_retain_days: int = int(os.getenv("POST_MORTEM_RETAIN_DAYS", "30"))
+    archive_rollup_interval: float = float(
+        os.getenv("POST_MORTEM_ROLLUP_INTERVAL", "86400")
+    )
 
 
 class AppConfig(BaseModel):
@@ -87,6 +202,9 @@ class AppConfig(BaseModel):
     gitops: GitOpsConfig = GitOpsConfig()
     security: SecurityConfig = SecurityConfig()
     vector_store: VectorStoreConfig = VectorStoreConfig()
+    kubernetes: KubernetesConfig = KubernetesConfig()
+    fast_path: FastPathConfig = FastPathConfig()
+    persistence: PersistenceConfig = PersistenceConfig()
     host: str = os.getenv("HOST", "0.0.0.0")
     port: int = int(os.getenv("PORT", "8000"))
     version: str = "5.0.0"
@@ -105,6 +223,11 @@ def validate_config(config: AppConfig) -> None:
         logger.error(
             "GitOps mode enabled but no GitHub token provided; push will fail."
         )
+    if config.vector_store.quantization not in ("none", "int8", "pq"):
+        logger.error(
+            f"Unknown VECTOR_QUANTIZATION '{config.vector_store.quantization}'; "
+            "falling back to float32 vectors."
+        )
     # Add more checks as needed
 
 
@@ -3,11 +3,15 @@ Circuit Breaker Pattern Implementation for AI4ALL-SRE
 Provides resilience for external dependencies (Ollama, Redis, K8s API)
 """
 
+import os
 import time
+import asyncio
+import inspect
 import functools
 import threading
+import collections
 from enum import Enum
-from typing import Callable, Any, Optional
+from typing import Callable, Any, Optional, Tuple
 from loguru import logger
 
 
@@ -19,6 +23,55 @@ class CircuitState(Enum):
     HALF_OPEN = "HALF_OPEN"  # Testing if service recovered
 
 
+class SlidingWindow:
+    """
+    Time-bucketed ring buffer of call outcomes.
+
+    The window is split into ``buckets`` slots of ``window_size / buckets``
+    seconds. Each slot holds (calls, failures, slow calls) and is recycled
+    once it falls out of the window, so recording is O(1) and memory is fixed.
+    Not thread-safe on its own; the owning CircuitBreaker holds its lock.
+    """
+
+    def __init__(self, window_size: float, buckets: int = 10):
+        self.window_size = window_size
+        self.buckets = max(buckets, 1)
+        self.bucket_width = window_size / self.buckets
+        self._epochs = [-1] * self.buckets
+        self._calls = [0] * self.buckets
+        self._failures = [0] * self.buckets
+        self._slow = [0] * self.buckets
+
+    def _slot(self, now: float) -> int:
+        epoch = int(now // self.bucket_width)
+        slot = epoch % self.buckets
+        if self._epochs[slot] != epoch:
+            self._epochs[slot] = epoch
+            self._calls[slot] = self._failures[slot] = self._slow[slot] = 0
+        return slot
+
+    def record(self, failed: bool, slow: bool, now: Optional[float] = None):
+        slot = self._slot(time.monotonic() if now is None else now)
+        self._calls[slot] += 1
+        self._failures[slot] += int(failed)
+        self._slow[slot] += int(slow)
+
+    def snapshot(self, now: Optional[float] = None) -> Tuple[int, int, int]:
+        """(calls, failures, slow calls) over the buckets still in the window"""
+        oldest = int((time.monotonic() if now is None else now) // self.bucket_width)
+        oldest -= self.buckets - 1
+        calls = failures = slow = 0
+        for i, epoch in enumerate(self._epochs):
+            if epoch >= oldest:
+                calls += self._calls[i]
+                failures += self._failures[i]
+                slow += self._slow[i]
+        return calls, failures, slow
+
+    def reset(self):
+        self._epochs = [-1] * self.buckets
+
+
 class CircuitBreaker:
     """
     Circuit breaker pattern implementation.
@@ -28,6 +81,21 @@ class CircuitBreaker:
     - HALF_OPEN: After reset_timeout, circuit allows one test request.
         - If success: circuit closes
         - If failure: circuit opens again
+
+    With ``window_size`` set, the circuit also opens when, over the last
+    ``window_size`` seconds and at least ``minimum_calls`` calls, the failure
+    rate reaches ``failure_rate_threshold`` or the share of calls slower than
+    ``slow_call_threshold`` seconds reaches ``slow_call_rate_threshold``.
+    A slow test request in HALF_OPEN re-opens the circuit.
+
+    Coroutines are protected with ``execute_async``, the decorator (which
+    detects ``async def`` functions) or ``async with breaker.guard()``. State
+    lives behind a short, I/O-free lock shared by threads and tasks, so
+    transitions never await and never stall the event loop. Redis round trips
+    for shared state happen outside that lock, and the async paths run them in
+    a worker thread. HALF_OPEN admits
+    at most ``half_open_max_calls`` concurrent test requests across threads
+    and tasks.
     """
 
     def __init__(
@@ -37,107 +105,376 @@ class CircuitBreaker:
         reset_timeout: float = 60.0,
         exclude_exceptions: tuple = (),
         fallback_function: Optional[Callable] = None,
+        window_size: Optional[float] = None,
+        window_buckets: int = 10,
+        minimum_calls: int = 10,
+        failure_rate_threshold: float = 0.5,
+        slow_call_threshold: Optional[float] = None,
+        slow_call_rate_threshold: float = 0.5,
+        half_open_max_calls: int = 1,
+        bulkhead: Optional["Bulkhead"] = None,
+        shared_state: Optional["RedisCircuitState"] = None,
     ):
         self.name = name
         self.fail_max = fail_max
         self.reset_timeout = reset_timeout
         self.exclude_exceptions = exclude_exceptions
         self.fallback_function = fallback_function
+        self.minimum_calls = minimum_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_threshold = slow_call_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.half_open_max_calls = max(half_open_max_calls, 1)
+        self.bulkhead = bulkhead
+        self.shared_state = shared_state
+        self._outbox = []
+        self._probe_denied_at = float("-inf")
+        self.window = (
+            SlidingWindow(window_size, window_buckets) if window_size else None
+        )
 
         self.state = CircuitState.CLOSED
         self.failure_count = 0
         self.last_failure_time = 0
         self.success_count = 0
+        self._half_open_calls = 0
 
         self._lock = threading.RLock()
 
+        mode = f", window={window_size}s" if window_size else ""
         logger.info(
-            f"[+] Circuit breaker '{name}' initialized (fail_max={fail_max}, reset_timeout={reset_timeout}s)"
+            f"[+] Circuit breaker '{name}' initialized (fail_max={fail_max}, reset_timeout={reset_timeout}s{mode})"
         )
 
-    def _can_execute(self) -> bool:
-        """Check if request can be executed"""
+    def _is_slow(self, duration: float) -> bool:
+        return (
+            self.slow_call_threshold is not None
+            and duration >= self.slow_call_threshold
+        )
+
+    def _window_tripped(self) -> Optional[str]:
+        """Reason to open the circuit based on the sliding window, if any"""
+        calls, failures, slow = self.window.snapshot()
+        if calls < self.minimum_calls:
+            return None
+        if failures / calls >= self.failure_rate_threshold:
+            return f"failure rate {failures}/{calls}"
+        if self.slow_call_threshold is not None and (
+            slow / calls >= self.slow_call_rate_threshold
+        ):
+            return f"slow-call rate {slow}/{calls} (>= {self.slow_call_threshold}s)"
+        return None
+
+    def _open(self, reason: str):
+        self.state = CircuitState.OPEN
+        self.success_count = 0
+        self.last_failure_time = time.time()
+        self._outbox.append(("open", self.last_failure_time))
+        logger.error(f"[CB:{self.name}] Circuit OPENED ({reason})")
+
+    def _adopt_shared(self):
+        """Follow transitions other replicas published (cached, no I/O per call)"""
+        shared = self.shared_state.get(self.name)
+        if shared is None:
+            return
         with self._lock:
-            if self.state == CircuitState.CLOSED:
-                return True
+            if (
+                shared["state"] == CircuitState.OPEN.value
+                and shared["opened_at"] > self.last_failure_time
+            ):
+                if self.state != CircuitState.OPEN:
+                    logger.warning(
+                        f"[CB:{self.name}] Circuit OPENED (tripped by another replica)"
+                    )
+                self.state = CircuitState.OPEN
+                self.success_count = 0
+                self.last_failure_time = shared["opened_at"]
+            elif (
+                shared["state"] == CircuitState.CLOSED.value
+                and self.state != CircuitState.CLOSED
+                and shared["changed_at"] > self.last_failure_time
+            ):
+                self.state = CircuitState.CLOSED
+                self.failure_count = 0
+                if self.window is not None:
+                    self.window.reset()
+                logger.info(
+                    f"[CB:{self.name}] Circuit CLOSED (recovery seen by another replica)"
+                )
+
+    def _claim_probe(self) -> bool:
+        """Ask the fleet for the HALF_OPEN test slot; denials are cached"""
+        now = time.monotonic()
+        if now - self._probe_denied_at < self.shared_state.cache_ttl:
+            return False
+        if self.shared_state.claim_probe(self.name, self.reset_timeout):
+            return True
+        self._probe_denied_at = now
+        return False
+
+    def _flush_shared(self):
+        """Publish queued transitions outside the lock"""
+        with self._lock:
+            events, self._outbox = self._outbox, []
+        if self.shared_state is None:
+            return
+        for event, opened_at in events:
+            if event == "open":
+                self.shared_state.publish_open(self.name, opened_at, self.reset_timeout)
+            else:
+                self.shared_state.publish_closed(
+                    self.name, opened_at, self.reset_timeout
+                )
 
-            if self.state == CircuitState.OPEN:
-                # Check if reset timeout has passed
-                if time.time() - self.last_failure_time >= self.reset_timeout:
-                    self.state = CircuitState.HALF_OPEN
-                    logger.info(f"[CB:{self.name}] Circuit transitioning to HALF_OPEN")
-                    return True
+    def _admit_locked(self, probe_claimed: Optional[bool] = None) -> Optional[bool]:
+        """
+        Admission decision on local state; caller holds the lock.
+
+        None means the OPEN circuit is due for a test request but the fleet
+        has not been asked yet: the caller claims the probe outside the lock
+        and decides again with ``probe_claimed``.
+        """
+        if self.state == CircuitState.CLOSED:
+            return True
+
+        if self.state == CircuitState.OPEN:
+            # Check if reset timeout has passed
+            if time.time() - self.last_failure_time < self.reset_timeout:
                 return False
+            # Across the fleet only one replica sends the test request
+            if self.shared_state is not None:
+                if probe_claimed is None:
+                    return None
+                if not probe_claimed:
+                    return False
+            self.state = CircuitState.HALF_OPEN
+            self._half_open_calls = 1
+            logger.info(f"[CB:{self.name}] Circuit transitioning to HALF_OPEN")
+            return True
 
-            if self.state == CircuitState.HALF_OPEN:
-                # Only allow one request in HALF_OPEN state
-                return self.success_count == 0
+        if self.state == CircuitState.HALF_OPEN:
+            # Only half_open_max_calls test requests in flight at a time
+            if self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True
+            return False
 
         return False
 
-    def _on_success(self):
+    def _can_execute(self) -> bool:
+        """Check if request can be executed"""
+        # Shared-state round trips never run under the lock
+        if self.shared_state is not None:
+            self._adopt_shared()
+
+        with self._lock:
+            verdict = self._admit_locked()
+        if verdict is not None:
+            return verdict
+
+        claimed = self._claim_probe()
+        with self._lock:
+            return bool(self._admit_locked(claimed))
+
+    async def _can_execute_async(self) -> bool:
+        """_can_execute for coroutines: Redis round trips run off the loop"""
+        if self.shared_state is None:
+            return self._can_execute()
+
+        # Served from the local cache most of the time, without a thread hop
+        if self.shared_state.needs_refresh(self.name):
+            await asyncio.to_thread(self._adopt_shared)
+        else:
+            self._adopt_shared()
+
+        with self._lock:
+            verdict = self._admit_locked()
+        if verdict is not None:
+            return verdict
+
+        claimed = await asyncio.to_thread(self._claim_probe)
+        with self._lock:
+            return bool(self._admit_locked(claimed))
+
+    def _release_half_open(self):
+        """Free a HALF_OPEN test slot whose call ended without a verdict"""
+        with self._lock:
+            if self.state == CircuitState.HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def _on_success(self, duration: float = 0.0):
         """Handle successful request"""
         with self._lock:
+            slow = self.window is not None and self._is_slow(duration)
+
             if self.state == CircuitState.HALF_OPEN:
+                if slow:
+                    self.state = CircuitState.OPEN
+                    self.last_failure_time = time.time()
+                    self._outbox.append(("open", self.last_failure_time))
+                    logger.warning(
+                        f"[CB:{self.name}] Circuit re-OPENED (test request took {duration:.1f}s)"
+                    )
+                    return
                 self.state = CircuitState.CLOSED
+                if self.window is not None:
+                    self.window.reset()
+                self._outbox.append(("closed", self.last_failure_time))
                 logger.info(f"[CB:{self.name}] Circuit CLOSED (service recovered)")
 
             self.failure_count = 0
             self.success_count += 1
 
-    def _on_failure(self, exception: Exception):
+            if self.window is not None:
+                self.window.record(failed=False, slow=slow)
+                reason = self._window_tripped()
+                if reason and self.state == CircuitState.CLOSED:
+                    self._open(reason)
+
+    def _on_failure(self, exception: Exception, duration: float = 0.0):
         """Handle failed request"""
         with self._lock:
             # Check if exception should be excluded
             if isinstance(exception, self.exclude_exceptions):
+                self._release_half_open()
                 return
 
             self.failure_count += 1
             self.success_count = 0
             self.last_failure_time = time.time()
 
+            if self.window is not None:
+                self.window.record(failed=True, slow=self._is_slow(duration))
+
             if self.state == CircuitState.HALF_OPEN:
                 self.state = CircuitState.OPEN
+                self._outbox.append(("open", self.last_failure_time))
                 logger.warning(
                     f"[CB:{self.name}] Circuit re-OPENED (test request failed)"
                 )
 
             elif self.failure_count >= self.fail_max:
-                self.state = CircuitState.OPEN
-                logger.error(
-                    f"[CB:{self.name}] Circuit OPENED (failures: {self.failure_count})"
-                )
+                self._open(f"failures: {self.failure_count}")
 
-    def execute(self, func: Callable, *args, **kwargs) -> Any:
-        """Execute function with circuit breaker protection"""
-        if not self._can_execute():
-            if self.fallback_function:
-                logger.warning(
-                    f"[CB:{self.name}] Circuit {self.state.value}, using fallback"
-                )
-                return self.fallback_function(*args, **kwargs)
+            elif self.window is not None and self.state == CircuitState.CLOSED:
+                reason = self._window_tripped()
+                if reason:
+                    self._open(reason)
+
+    def _fallback_or_raise(self) -> Callable:
+        """Fallback for a rejected call, or CircuitBreakerOpenError if none"""
+        if self.fallback_function is None:
             raise CircuitBreakerOpenError(
                 f"Circuit breaker '{self.name}' is {self.state.value}"
             )
+        logger.warning(f"[CB:{self.name}] Circuit {self.state.value}, using fallback")
+        return self.fallback_function
+
+    def _record_local(self, exc: Optional[BaseException], duration: float):
+        if exc is None:
+            self._on_success(duration)
+        elif isinstance(exc, Exception):
+            self._on_failure(exc, duration)
+        else:
+            # Cancelled tasks say nothing about the dependency's health
+            self._release_half_open()
+
+    def _record(self, exc: Optional[BaseException], duration: float):
+        """Feed a finished call's outcome into the circuit state"""
+        self._record_local(exc, duration)
+        if self._outbox:
+            self._flush_shared()
+
+    async def _record_async(self, exc: Optional[BaseException], duration: float):
+        """_record for coroutines: transitions are published off the loop"""
+        self._record_local(exc, duration)
+        if self._outbox:
+            if self.shared_state is None:
+                self._flush_shared()
+            else:
+                await asyncio.to_thread(self._flush_shared)
+
+    def _shed(self, error: "BulkheadFullError") -> Callable:
+        """Fallback for a call the bulkhead turned away, or re-raise"""
+        self._release_half_open()
+        if self.fallback_function is None:
+            raise error
+        return self.fallback_function
+
+    def execute(self, func: Callable, *args, **kwargs) -> Any:
+        """Execute function with circuit breaker protection"""
+        if not self._can_execute():
+            return self._fallback_or_raise()(*args, **kwargs)
+        if self.bulkhead is not None:
+            try:
+                self.bulkhead.acquire()
+            except BulkheadFullError as e:
+                return self._shed(e)(*args, **kwargs)
 
+        started = time.monotonic()
         try:
             result = func(*args, **kwargs)
-            self._on_success()
-            return result
-        except Exception as e:
-            self._on_failure(e)
+        except BaseException as e:
+            self._record(e, time.monotonic() - started)
+            raise
+        finally:
+            if self.bulkhead is not None:
+                self.bulkhead.release()
+        self._record(None, time.monotonic() - started)
+        return result
+
+    async def execute_async(self, func: Callable, *args, **kwargs) -> Any:
+        """Await a coroutine function with circuit breaker protection"""
+        if not await self._can_execute_async():
+            result = self._fallback_or_raise()(*args, **kwargs)
+            return await result if inspect.isawaitable(result) else result
+        if self.bulkhead is not None:
+            try:
+                await self.bulkhead.acquire_async()
+            except BulkheadFullError as e:
+                result = self._shed(e)(*args, **kwargs)
+                return await result if inspect.isawaitable(result) else result
+            except asyncio.CancelledError:
+                self._release_half_open()
+                raise
+
+        started = time.monotonic()
+        try:
+            result = await func(*args, **kwargs)
+        except BaseException as e:
+            if self.bulkhead is not None:
+                self.bulkhead.release()
+            await self._record_async(e, time.monotonic() - started)
             raise
+        if self.bulkhead is not None:
+            self.bulkhead.release()
+        await self._record_async(None, time.monotonic() - started)
+        return result
+
+    def guard(self) -> "CircuitBreakerGuard":
+        """Context manager (sync or async) protecting the enclosed block"""
+        return CircuitBreakerGuard(self)
 
     def get_state(self) -> dict:
         """Get current circuit state"""
         with self._lock:
-            return {
+            state = {
                 "name": self.name,
                 "state": self.state.value,
                 "failure_count": self.failure_count,
                 "success_count": self.success_count,
                 "last_failure_time": self.last_failure_time,
             }
+            if self.window is not None:
+                calls, failures, slow = self.window.snapshot()
+                state["window"] = {
+                    "calls": calls,
+                    "failure_rate": failures / calls if calls else 0.0,
+                    "slow_call_rate": slow / calls if calls else 0.0,
+                }
+        if self.bulkhead is not None:
+            state["bulkhead"] = self.bulkhead.get_state()
+        return state
 
 
 class CircuitBreakerOpenError(Exception):
@@ -146,6 +483,451 @@ class CircuitBreakerOpenError(Exception):
     pass
 
 
+class BulkheadFullError(Exception):
+    """Exception raised when a bulkhead sheds a call"""
+
+    pass
+
+
+class _ThreadWaiter:
+    def __init__(self):
+        self.event = threading.Event()
+
+    def grant(self):
+        self.event.set()
+
+
+class _TaskWaiter:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.future = loop.create_future()
+
+    def grant(self):
+        self.loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self):
+        if not self.future.done():
+            self.future.set_result(True)
+
+
+class Bulkhead:
+    """
+    Caps concurrent calls to one dependency.
+
+    At most ``max_concurrent_calls`` run at once. Further callers queue
+    (FIFO) for up to ``max_wait_time`` seconds and are then rejected with
+    BulkheadFullError; with ``max_wait_time=0`` excess calls are shed
+    immediately. Threads and asyncio tasks share the same permits, so a
+    dependency has one limit regardless of how it is called:
+
+        with bulkhead: ...
+        async with bulkhead: ...
+        bulkhead.execute(func, *args)
+        await bulkhead.execute_async(coro_func, *args)
+    """
+
+    def __init__(
+        self, name: str, max_concurrent_calls: int, max_wait_time: float = 0.0
+    ):
+        self.name = name
+        self.max_concurrent_calls = max(max_concurrent_calls, 1)
+        self.max_wait_time = max_wait_time
+
+        self.in_flight = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.queued = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+        self._waiters = collections.deque()
+        self._lock = threading.Lock()
+
+    def _admit(self, waiter) -> Optional[bool]:
+        """True: permit taken. None: queued behind ``waiter``. False: shed."""
+        with self._lock:
+            if self.in_flight < self.max_concurrent_calls and not self._waiters:
+                self.in_flight += 1
+                self.accepted += 1
+                return True
+            if self.max_wait_time <= 0:
+                self.rejected += 1
+                return False
+            self._waiters.append(waiter)
+            self.queued += 1
+            return None
+
+    def _abandon(self, waiter) -> bool:
+        """Leave the queue; False if a permit was handed over meanwhile."""
+        with self._lock:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                return False
+            self.rejected += 1
+            return True
+
+    def _granted(self, waited: float):
+        with self._lock:
+            self.accepted += 1
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+
+    def _full(self) -> BulkheadFullError:
+        logger.warning(
+            f"[BH:{self.name}] Rejected call ({self.in_flight}/{self.max_concurrent_calls} in flight, {len(self._waiters)} queued)"
+        )
+        return BulkheadFullError(f"Bulkhead '{self.name}' is full")
+
+    def acquire(self):
+        waiter = _ThreadWaiter()
+        admitted = self._admit(waiter)
+        if admitted:
+            return
+        if admitted is False:
+            raise self._full()
+        started = time.monotonic()
+        if not waiter.event.wait(self.max_wait_time) and self._abandon(waiter):
+            raise self._full()
+        self._granted(time.monotonic() - started)
+
+    async def acquire_async(self):
+        waiter = _TaskWaiter(asyncio.get_running_loop())
+        admitted = self._admit(waiter)
+        if admitted:
+            return
+        if admitted is False:
+            raise self._full()
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter.future, self.max_wait_time)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if not self._abandon(waiter):
+                # A permit arrived as we gave up; pass it on
+                self.release()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise self._full()
+        self._granted(time.monotonic() - started)
+
+    def release(self):
+        with self._lock:
+            if self._waiters:
+                # Hand the permit straight to the next waiter
+                self._waiters.popleft().grant()
+            else:
+                self.in_flight -= 1
+
+    def execute(self, func: Callable, *args, **kwargs) -> Any:
+        with self:
+            return func(*args, **kwargs)
+
+    async def execute_async(self, func: Callable, *args, **kwargs) -> Any:
+        async with self:
+            return await func(*args, **kwargs)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+    async def __aenter__(self):
+        await self.acquire_async()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+    def get_state(self) -> dict:
+        """Get current bulkhead occupancy and queue metrics"""
+        with self._lock:
+            waited = self.accepted and self.wait_time_total / self.accepted
+            return {
+                "max_concurrent_calls": self.max_concurrent_calls,
+                "max_wait_time": self.max_wait_time,
+                "in_flight": self.in_flight,
+                "waiting": len(self._waiters),
+                "accepted": self.accepted,
+                "queued": self.queued,
+                "rejected": self.rejected,
+                "avg_wait_ms": waited * 1000,
+                "max_wait_ms": self.wait_time_max * 1000,
+            }
+
+
+class RetryBudget:
+    """
+    Token bucket capping retries to a fraction of successful calls.
+
+    Every success deposits ``ratio`` tokens (up to ``max_tokens``) and every
+    retry spends one, so across all callers retries stay near ``ratio`` x
+    successes. When a dependency is overloaded and calls start failing, the
+    bucket drains and callers stop multiplying the load with retries.
+    """
+
+    def __init__(self, name: str, ratio: float = 0.1, max_tokens: float = 10.0):
+        self.name = name
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.retries_spent = 0
+        self.retries_denied = 0
+        self._lock = threading.Lock()
+
+    def record_success(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        """Take a token for one retry; False if the budget is exhausted"""
+        with self._lock:
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                self.retries_spent += 1
+                return True
+            self.retries_denied += 1
+            return False
+
+    def get_state(self) -> dict:
+        with self._lock:
+            return {
+                "tokens": round(self.tokens, 2),
+                "retries_spent": self.retries_spent,
+                "retries_denied": self.retries_denied,
+            }
+
+
+class RedisCircuitState:
+    """
+    Circuit state shared by agent replicas through Redis.
+
+    Each breaker has a hash ``{prefix}{name}`` with state, opened_at,
+    changed_at and probe_until (epoch seconds). Transitions are Lua scripts,
+    so concurrent replicas cannot interleave a read-modify-write:
+
+      - publish_open: record OPEN unless a newer OPEN is already recorded
+      - claim_probe: let exactly one replica send the HALF_OPEN test request
+      - publish_closed: record recovery unless the circuit re-opened since
+
+    Reads are cached locally for ``cache_ttl`` seconds, so a healthy call
+    path costs at most one HGETALL per breaker per TTL. Redis errors are
+    logged and the breaker carries on with its local state.
+    """
+
+    OPEN_SCRIPT = """
+    local state = redis.call('HGET', KEYS[1], 'state')
+    local opened = tonumber(redis.call('HGET', KEYS[1], 'opened_at') or '0')
+    if state == 'OPEN' and opened >= tonumber(ARGV[1]) then
+        return 0
+    end
+    redis.call('HSET', KEYS[1], 'state', 'OPEN', 'opened_at', ARGV[1],
+               'changed_at', ARGV[1], 'probe_until', '0')
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    return 1
+    """
+
+    PROBE_SCRIPT = """
+    if redis.call('HGET', KEYS[1], 'state') ~= 'OPEN' then
+        return 1
+    end
+    local now = tonumber(ARGV[1])
+    local opened = tonumber(redis.call('HGET', KEYS[1], 'opened_at') or '0')
+    local probe_until = tonumber(redis.call('HGET', KEYS[1], 'probe_until') or '0')
+    if now - opened < tonumber(ARGV[2]) or probe_until > now then
+        return 0
+    end
+    redis.call('HSET', KEYS[1], 'probe_until', tostring(now + tonumber(ARGV[3])))
+    return 1
+    """
+
+    CLOSE_SCRIPT = """
+    local state = redis.call('HGET', KEYS[1], 'state')
+    local opened = tonumber(redis.call('HGET', KEYS[1], 'opened_at') or '0')
+    if state == 'OPEN' and opened > tonumber(ARGV[1]) then
+        return 0
+    end
+    redis.call('HSET', KEYS[1], 'state', 'CLOSED', 'changed_at', ARGV[2],
+               'probe_until', '0')
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+    return 1
+    """
+
+    def __init__(
+        self,
+        client,
+        cache_ttl: float = 1.0,
+        key_prefix: str = "circuit:",
+        probe_lease: float = 30.0,
+    ):
+        self.client = client
+        self.cache_ttl = cache_ttl
+        self.key_prefix = key_prefix
+        self.probe_lease = probe_lease
+        self._open_script = client.register_script(self.OPEN_SCRIPT)
+        self._probe_script = client.register_script(self.PROBE_SCRIPT)
+        self._close_script = client.register_script(self.CLOSE_SCRIPT)
+        self._cache = {}
+        self._retry_after = 0.0
+        self._lock = threading.Lock()
+
+    def _key(self, name: str) -> str:
+        return f"{self.key_prefix}{name}"
+
+    @staticmethod
+    def _ttl(reset_timeout: float) -> int:
+        # Outlive a few reset cycles, then let an idle key expire
+        return int(reset_timeout * 4) + 60
+
+    def _unavailable(self, action: str, error: Exception):
+        self._retry_after = time.monotonic() + self.cache_ttl * 5
+        logger.warning(f"[CB] Shared circuit state {action} failed: {error}")
+
+    def get(self, name: str) -> Optional[dict]:
+        """Last known shared state, refreshed at most once per cache_ttl"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(name)
+            if cached and now - cached[0] < self.cache_ttl:
+                return cached[1]
+            if now < self._retry_after:
+                return cached[1] if cached else None
+            # Claim the refresh so concurrent callers keep using the cache
+            self._cache[name] = (now, cached[1] if cached else None)
+
+        try:
+            raw = self.client.hgetall(self._key(name))
+        except Exception as e:
+            self._unavailable("read", e)
+            return None
+
+        raw = {
+            (k.decode() if isinstance(k, bytes) else k): (
+                v.decode() if isinstance(v, bytes) else v
+            )
+            for k, v in raw.items()
+        }
+        state = None
+        if raw.get("state"):
+            state = {
+                "state": raw["state"],
+                "opened_at": float(raw.get("opened_at") or 0),
+                "changed_at": float(raw.get("changed_at") or 0),
+            }
+        with self._lock:
+            self._cache[name] = (time.monotonic(), state)
+        return state
+
+    def needs_refresh(self, name: str) -> bool:
+        """True if get() would read Redis rather than the local cache"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(name)
+            if cached and now - cached[0] < self.cache_ttl:
+                return False
+            return now >= self._retry_after
+
+    def _invalidate(self, name: str):
+        with self._lock:
+            self._cache.pop(name, None)
+
+    def publish_open(self, name: str, opened_at: float, reset_timeout: float):
+        try:
+            self._open_script(
+                keys=[self._key(name)], args=[opened_at, self._ttl(reset_timeout)]
+            )
+        except Exception as e:
+            self._unavailable("update", e)
+        self._invalidate(name)
+
+    def publish_closed(self, name: str, opened_at: float, reset_timeout: float):
+        try:
+            self._close_script(
+                keys=[self._key(name)],
+                args=[opened_at, time.time(), self._ttl(reset_timeout)],
+            )
+        except Exception as e:
+            self._unavailable("update", e)
+        self._invalidate(name)
+
+    def claim_probe(self, name: str, reset_timeout: float) -> bool:
+        """True if this replica may send the HALF_OPEN test request"""
+        if time.monotonic() < self._retry_after:
+            return True
+        try:
+            claimed = self._probe_script(
+                keys=[self._key(name)],
+                args=[time.time(), reset_timeout, self.probe_lease],
+            )
+        except Exception as e:
+            self._unavailable("probe claim", e)
+            return True
+        return bool(int(claimed))
+
+
+class CircuitBreakerGuard:
+    """
+    One protected call as a context manager; use a fresh guard per call:
+
+        async with CircuitBreakers.ollama.guard():
+            response = await client.post(...)
+
+    Raises CircuitBreakerOpenError on entry when the circuit rejects the call,
+    or BulkheadFullError when its bulkhead sheds it (fallback functions do not
+    apply to blocks).
+    """
+
+    def __init__(self, breaker: CircuitBreaker):
+        self.breaker = breaker
+        self._started = None
+
+    def _rejected(self) -> CircuitBreakerOpenError:
+        return CircuitBreakerOpenError(
+            f"Circuit breaker '{self.breaker.name}' is {self.breaker.state.value}"
+        )
+
+    def __enter__(self):
+        if not self.breaker._can_execute():
+            raise self._rejected()
+        if self.breaker.bulkhead is not None:
+            try:
+                self.breaker.bulkhead.acquire()
+            except BaseException:
+                self.breaker._release_half_open()
+                raise
+        self._started = time.monotonic()
+        return self.breaker
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.breaker._record(exc, time.monotonic() - self._started)
+        finally:
+            if self.breaker.bulkhead is not None:
+                self.breaker.bulkhead.release()
+        return False
+
+    async def __aenter__(self):
+        if not await self.breaker._can_execute_async():
+            raise self._rejected()
+        if self.breaker.bulkhead is not None:
+            try:
+                await self.breaker.bulkhead.acquire_async()
+            except BaseException:
+                self.breaker._release_half_open()
+                raise
+        self._started = time.monotonic()
+        return self.breaker
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self.breaker.bulkhead is not None:
+            self.breaker.bulkhead.release()
+        await self.breaker._record_async(exc, time.monotonic() - self._started)
+        return False
+
+
 def circuit_breaker(
     name: str,
     fail_max: int = 5,
@@ -165,9 +947,17 @@ def circuit_breaker(
             fallback_function=fallback_function,
         )
 
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            return cb.execute(func, *args, **kwargs)
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                return await cb.execute_async(func, *args, **kwargs)
+
+        else:
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                return cb.execute(func, *args, **kwargs)
 
         # Attach circuit breaker to wrapper for access
         wrapper.circuit_breaker = cb
@@ -178,25 +968,69 @@ def circuit_breaker(
 
 
 # Pre-configured circuit breakers for common dependencies
-class CircuitBreakers:
-    """Pre-configured circuit breakers for AI4ALL-SRE dependencies"""
+def ollama_circuit_breaker(name: str = "ollama") -> CircuitBreaker:
+    """
+    Circuit breaker and bulkhead for one Ollama server.
 
-    # Ollama circuit breaker (longer timeout for LLM inference)
-    ollama = CircuitBreaker(
-        name="ollama",
+    Longer timeout for LLM inference; the sliding window also trips it when
+    most calls in 10 minutes take 90s+ to answer. The bulkhead keeps
+    specialists x alerts from oversubscribing the server's GPU; excess
+    prompts queue for up to OLLAMA_MAX_QUEUE_WAIT seconds.
+    """
+    return CircuitBreaker(
+        name=name,
         fail_max=3,
         reset_timeout=120.0,
         exclude_exceptions=(ValueError, KeyError),
+        window_size=600.0,
+        minimum_calls=4,
+        failure_rate_threshold=0.5,
+        slow_call_threshold=90.0,
+        slow_call_rate_threshold=0.5,
+        bulkhead=Bulkhead(
+            name,
+            max_concurrent_calls=int(os.getenv("OLLAMA_MAX_CONCURRENT", "2")),
+            max_wait_time=float(os.getenv("OLLAMA_MAX_QUEUE_WAIT", "300")),
+        ),
     )
 
+
+class CircuitBreakers:
+    """Pre-configured circuit breakers for AI4ALL-SRE dependencies"""
+
+    # Ollama circuit breaker (primary endpoint; see ollama_circuit_breaker)
+    ollama = ollama_circuit_breaker()
+
     # Redis circuit breaker (fast recovery)
-    redis = CircuitBreaker(name="redis", fail_max=5, reset_timeout=30.0)
+    redis = CircuitBreaker(
+        name="redis",
+        fail_max=5,
+        reset_timeout=30.0,
+        bulkhead=Bulkhead("redis", max_concurrent_calls=50, max_wait_time=0.5),
+    )
 
     # Kubernetes API circuit breaker
-    k8s_api = CircuitBreaker(name="k8s_api", fail_max=3, reset_timeout=60.0)
+    k8s_api = CircuitBreaker(
+        name="k8s_api",
+        fail_max=3,
+        reset_timeout=60.0,
+        bulkhead=Bulkhead("k8s_api", max_concurrent_calls=10, max_wait_time=10.0),
+    )
 
-    # Git operations circuit breaker
-    git = CircuitBreaker(name="git", fail_max=2, reset_timeout=300.0)
+    # Git operations circuit breaker (one working copy, so one git op at a time)
+    git = CircuitBreaker(
+        name="git",
+        fail_max=2,
+        reset_timeout=300.0,
+        bulkhead=Bulkhead("git", max_concurrent_calls=1, max_wait_time=120.0),
+    )
+
+    @classmethod
+    def share_state(cls, shared_state: RedisCircuitState):
+        """Share circuit state across agent replicas (Redis keeps its own)"""
+        for breaker in (cls.ollama, cls.k8s_api, cls.git):
+            breaker.shared_state = shared_state
+        logger.info("[+] Circuit breaker state shared across replicas via Redis")
 
     @classmethod
     def get_all_states(cls) -> dict:
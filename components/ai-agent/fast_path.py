@@ -0,0 +1,201 @@
+"""
+Fast-path remediation for known incidents.
+
+Every post-mortem (and the runbook of its alert) ends with a machine-readable
+remediation record: the alert it answered, the RemediationAction taken, and
+whether the action succeeded and the target was verified healthy afterwards.
+
+When the same alert fires again on the same deployment, FastPathMatcher
+returns the last verified record so the agent can replay it immediately,
+without the specialist + Director LLM calls. Lookups are:
+  1. exact (alert, deployment, namespace) over records loaded from disk
+  2. high-similarity post-mortems from the RAG pipeline, which also covers
+     post-mortems written by other replicas into a shared vector store
+
+The LLM pipeline then audits the replayed action in the background; a
+disagreement retires the record so the next occurrence takes the slow path.
+Retirement is itself an (unverified) record: written to the runbook it
+survives restarts, and verified records older than it, whether loaded from
+disk or retrieved from RAG, are no longer replayed.
+"""
+
+import os
+import re
+import json
+import datetime
+import threading
+from typing import Iterable, Optional, Tuple
+
+from loguru import logger
+
+RECORD_HEADING = "## Remediation Record"
+RECORD_RE = re.compile(
+    r"\n*" + re.escape(RECORD_HEADING) + r"\s*```json\s*(\{.*?\})\s*```\n?", re.S
+)
+
+
+def render_record(record: dict) -> str:
+    return f"\n{RECORD_HEADING}\n```json\n{json.dumps(record, indent=2)}\n```\n"
+
+
+def parse_record(markdown: str) -> Optional[dict]:
+    """Last remediation record in a post-mortem or runbook, if any."""
+    matches = RECORD_RE.findall(markdown or "")
+    if not matches:
+        return None
+    try:
+        return json.loads(matches[-1])
+    except json.JSONDecodeError:
+        return None
+
+
+def upsert_record(markdown: str, record: dict) -> str:
+    """Replace the record section of ``markdown``, keeping the prose."""
+    return RECORD_RE.sub("", markdown).rstrip("\n") + "\n" + render_record(record)
+
+
+class FastPathMatcher:
+    """Index of verified remediations keyed by alert, deployment and namespace."""
+
+    def __init__(self, rag_pipeline=None, min_similarity: float = 0.92):
+        self.rag = rag_pipeline
+        self.min_similarity = min_similarity
+        self._records = {}
+        # Key -> timestamp of the last unverified record; older fixes stay retired
+        self._retired = {}
+        self._lock = threading.Lock()
+        self.hits = {"record": 0, "post_mortem": 0}
+        self.misses = 0
+        self.audits_agreed = 0
+        self.audits_disagreed = 0
+
+    @staticmethod
+    def _key(alert_name: str, deployment: str, namespace: str) -> tuple:
+        return (alert_name, deployment, namespace)
+
+    @classmethod
+    def _record_key(cls, record: dict) -> tuple:
+        alert = record.get("alert", {})
+        return cls._key(
+            alert.get("alert_name"), alert.get("deployment"), alert.get("namespace")
+        )
+
+    def remember(self, record: dict) -> bool:
+        """Index a verified record; an unverified one retires the old fix."""
+        key = self._record_key(record)
+        timestamp = record.get("timestamp", "")
+        with self._lock:
+            if not record.get("verified"):
+                self._records.pop(key, None)
+                self._retired[key] = max(self._retired.get(key, ""), timestamp)
+                return False
+            if key in self._retired and timestamp <= self._retired[key]:
+                return False
+            current = self._records.get(key)
+            if current is None or current.get("timestamp", "") <= timestamp:
+                self._records[key] = record
+            return True
+
+    def forget(
+        self,
+        alert_name: str,
+        deployment: str,
+        namespace: str,
+        action: Optional[dict] = None,
+        reason: str = "",
+    ) -> dict:
+        """Retire the fix for this incident; persist the returned record."""
+        record = {
+            "alert": {
+                "alert_name": alert_name,
+                "deployment": deployment,
+                "namespace": namespace,
+            },
+            "action": action,
+            "result": reason,
+            "verified": False,
+            "source": "audit",
+            "timestamp": datetime.datetime.utcnow().strftime("%Y%m%d-%H%M%S"),
+        }
+        self.remember(record)
+        return record
+
+    def load_documents(self, documents: Iterable[str]) -> int:
+        """Index the records of markdown documents, given oldest first."""
+        count = 0
+        for text in documents:
+            record = parse_record(text)
+            if record is not None:
+                self.remember(record)
+                count += 1
+        return count
+
+    def load_dir(self, path: str) -> int:
+        """Index the records of every markdown file under ``path``."""
+        if not os.path.isdir(path):
+            return 0
+
+        def documents():
+            # Post-mortem filenames start with their timestamp: replay in order
+            for name in sorted(os.listdir(path)):
+                if name.endswith(".md"):
+                    with open(os.path.join(path, name), "r") as f:
+                        yield f.read()
+
+        return self.load_documents(documents())
+
+    def match(
+        self, alert_name: str, deployment: str, namespace: str, alert_context: str
+    ) -> Optional[Tuple[dict, str]]:
+        """(record, source) of a verified remediation for this alert, or None"""
+        key = self._key(alert_name, deployment, namespace)
+        with self._lock:
+            record = self._records.get(key)
+        if record is not None:
+            self._hit("record")
+            return record, "record"
+
+        if self.rag is not None:
+            try:
+                hits = self.rag.query_similar_incidents(alert_context, n_results=3)
+            except Exception as e:
+                logger.warning(f"[!] Fast-path RAG lookup failed: {e}")
+                hits = []
+            for hit in hits:
+                if hit.similarity < self.min_similarity:
+                    continue
+                record = parse_record(hit.content)
+                if (
+                    record is not None
+                    and record.get("verified")
+                    and self._record_key(record) == key
+                    and self.remember(record)
+                ):
+                    self._hit("post_mortem")
+                    return record, "post_mortem"
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _hit(self, source: str):
+        with self._lock:
+            self.hits[source] += 1
+
+    def record_audit(self, agreed: bool):
+        with self._lock:
+            if agreed:
+                self.audits_agreed += 1
+            else:
+                self.audits_disagreed += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "known_incidents": len(self._records),
+                "retired_incidents": len(self._retired),
+                "hits": dict(self.hits),
+                "misses": self.misses,
+                "audits_agreed": self.audits_agreed,
+                "audits_disagreed": self.audits_disagreed,
+            }
@@ -0,0 +1,279 @@
+"""
+Git backends for GitOps commits.
+
+The GitOps path needs six operations on the working copy: a one-time setup
+(commit identity, authenticated remote), a clean-tree check, commit of the
+edited paths, push, undo of the last commit when the push is rejected, and
+discard of the edits so the next batch starts from a clean tree.
+The manifest catalog also reads HEAD and the paths changed between commits.
+
+  - SubprocessGitBackend: the git CLI, one process per operation. Setup runs
+    once rather than on every remediation, so a batch costs four processes
+    (status, add, commit, push) instead of seven or more.
+  - DulwichGitBackend: status, staging, commit and undo in-process through
+    dulwich (optional dependency); only the network push does real I/O.
+
+make_git_backend("auto") prefers dulwich when it is installed.
+"""
+
+import io
+import os
+import abc
+import threading
+import subprocess
+from typing import List
+
+from loguru import logger
+
+AGENT_NAME = "AI SRE Agent"
+AGENT_EMAIL = "ai-agent@ai4all-sre.local"
+
+
+class GitError(Exception):
+    """A git operation failed; the message carries git's error output"""
+
+    pass
+
+
+def authenticated_remote_url(remote: str, token: str) -> str:
+    return f"https://{token}@github.com/{remote.replace('https://', '').replace('http://', '')}"
+
+
+class GitBackend(abc.ABC):
+    """Working-copy operations used by the GitOps commit path"""
+
+    name = "base"
+
+    def __init__(self, repo_dir: str, remote: str, branch: str, token: str = ""):
+        self.repo_dir = repo_dir
+        self.remote = remote
+        self.branch = branch
+        self.token = token
+        self._setup_done = False
+        self._setup_lock = threading.Lock()
+
+    def ensure_setup(self):
+        """Run the one-time repository setup on first use."""
+        with self._setup_lock:
+            if not self._setup_done:
+                self.setup()
+                self._setup_done = True
+
+    @abc.abstractmethod
+    def setup(self):
+        """Set the commit identity and the authenticated remote URL."""
+        pass
+
+    @abc.abstractmethod
+    def dirty_paths(self) -> List[str]:
+        """Modified, staged or untracked paths; empty when the tree is clean"""
+        pass
+
+    @abc.abstractmethod
+    def commit(self, paths: List[str], message: str):
+        """Stage ``paths`` (relative to the repository) and commit them."""
+        pass
+
+    @abc.abstractmethod
+    def push(self):
+        """Push the branch; GitError if the remote rejects any ref."""
+        pass
+
+    @abc.abstractmethod
+    def undo_commit(self):
+        """Soft-reset the last commit, keeping its changes in the tree."""
+        pass
+
+    @abc.abstractmethod
+    def discard(self, paths: List[str]):
+        """Restore ``paths`` in the index and tree to their content at HEAD."""
+        pass
+
+    @abc.abstractmethod
+    def head(self) -> str:
+        """Commit id of HEAD"""
+        pass
+
+    @abc.abstractmethod
+    def changed_paths(self, since: str, until: str) -> List[str]:
+        """Paths added, modified or deleted between two commits"""
+        pass
+
+
+class SubprocessGitBackend(GitBackend):
+    """The git CLI, one subprocess per operation."""
+
+    name = "subprocess"
+
+    def _git(self, *args: str, timeout: float = 30) -> str:
+        result = subprocess.run(
+            ["git", "-C", self.repo_dir, *args],
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+        if result.returncode != 0:
+            raise GitError(f"git {args[0]} failed: {result.stderr.strip()}")
+        return result.stdout
+
+    def setup(self):
+        self._git("config", "user.email", AGENT_EMAIL, timeout=10)
+        self._git("config", "user.name", AGENT_NAME, timeout=10)
+        if self.token:
+            url = authenticated_remote_url(self.remote, self.token)
+            self._git("remote", "set-url", self.remote, url, timeout=10)
+
+    def dirty_paths(self) -> List[str]:
+        out = self._git("status", "--porcelain", timeout=10)
+        return [line[3:] for line in out.splitlines() if line.strip()]
+
+    def commit(self, paths: List[str], message: str):
+        self._git("add", "--", *paths)
+        self._git("commit", "--allow-empty", "-m", message)
+
+    def push(self):
+        self._git("push", self.remote, self.branch, timeout=60)
+
+    def undo_commit(self):
+        self._git("reset", "--soft", "HEAD~1")
+
+    def discard(self, paths: List[str]):
+        self._git("checkout", "HEAD", "--", *paths)
+
+    def head(self) -> str:
+        return self._git("rev-parse", "HEAD", timeout=10).strip()
+
+    def changed_paths(self, since: str, until: str) -> List[str]:
+        out = self._git("diff", "--name-only", "--no-renames", since, until)
+        return [line for line in out.splitlines() if line]
+
+
+class DulwichGitBackend(GitBackend):
+    """In-process git through dulwich; nothing is spawned except the push."""
+
+    name = "dulwich"
+
+    def __init__(self, repo_dir: str, remote: str, branch: str, token: str = ""):
+        super().__init__(repo_dir, remote, branch, token)
+        from dulwich import porcelain
+        from dulwich.repo import Repo
+
+        self._porcelain = porcelain
+        self._repo_class = Repo
+        self._repo_obj = None
+        self._identity = f"{AGENT_NAME} <{AGENT_EMAIL}>".encode()
+
+    @property
+    def _repo(self):
+        # Opened on first use: the working copy may not exist at import time
+        if self._repo_obj is None:
+            self._repo_obj = self._repo_class(self.repo_dir)
+        return self._repo_obj
+
+    def setup(self):
+        config = self._repo.get_config()
+        config.set(b"user", b"name", AGENT_NAME.encode())
+        config.set(b"user", b"email", AGENT_EMAIL.encode())
+        if self.token:
+            url = authenticated_remote_url(self.remote, self.token)
+            config.set((b"remote", self.remote.encode()), b"url", url.encode())
+        config.write_to_path()
+
+    def dirty_paths(self) -> List[str]:
+        status = self._porcelain.status(self._repo)
+        paths = [p for changes in status.staged.values() for p in changes]
+        paths += list(status.unstaged) + list(status.untracked)
+        return [p.decode() if isinstance(p, bytes) else str(p) for p in paths]
+
+    def commit(self, paths: List[str], message: str):
+        root = os.path.abspath(self.repo_dir)
+        self._porcelain.add(self._repo, paths=[os.path.join(root, p) for p in paths])
+        self._porcelain.commit(
+            self._repo,
+            message=message.encode(),
+            author=self._identity,
+            committer=self._identity,
+        )
+
+    def push(self):
+        errstream = io.BytesIO()
+        try:
+            result = self._porcelain.push(
+                self._repo,
+                self.remote,
+                f"refs/heads/{self.branch}",
+                outstream=_NullStream(),
+                errstream=errstream,
+            )
+        except Exception as e:
+            raise GitError(f"git push failed: {e}")
+        errors = [
+            f"{ref.decode()}: {status}"
+            for ref, status in (getattr(result, "ref_status", None) or {}).items()
+            if status
+        ]
+        # dulwich < 0.22 returns None and reports rejected refs (remote
+        # hooks, protected branches) only as lines on errstream
+        errors += [
+            line.decode(errors="replace")
+            for line in errstream.getvalue().splitlines()
+            if line.startswith(b"Push of ref ") and b" failed" in line
+        ]
+        if errors:
+            raise GitError(f"git push failed: {'; '.join(errors)}")
+
+    def undo_commit(self):
+        # A soft reset only moves the branch; index and tree keep the changes
+        head = self._repo[self._repo.head()]
+        if not head.parents:
+            raise GitError("cannot undo the root commit")
+        self._repo.refs.set_if_equals(b"HEAD", head.id, head.parents[0])
+
+    def discard(self, paths: List[str]):
+        root = os.path.abspath(self.repo_dir)
+        try:
+            for path in paths:
+                self._porcelain.reset_file(self._repo, path)
+        except KeyError as e:
+            raise GitError(f"path not in HEAD: {e}")
+        # Re-staging the restored files brings the index back to HEAD too
+        self._porcelain.add(self._repo, paths=[os.path.join(root, p) for p in paths])
+
+    def head(self) -> str:
+        return self._repo.head().decode()
+
+    def changed_paths(self, since: str, until: str) -> List[str]:
+        from dulwich.diff_tree import tree_changes
+
+        try:
+            old = self._repo[since.encode()].tree
+            new = self._repo[until.encode()].tree
+        except KeyError as e:
+            raise GitError(f"unknown commit {e}")
+        paths = set()
+        for change in tree_changes(self._repo.object_store, old, new):
+            for entry in (change.old, change.new):
+                if entry is not None and entry.path is not None:
+                    paths.add(entry.path.decode())
+        return sorted(paths)
+
+
+class _NullStream:
+    def write(self, data):
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+def make_git_backend(
+    kind: str, repo_dir: str, remote: str, branch: str, token: str = ""
+) -> GitBackend:
+    """Backend for GIT_BACKEND: "subprocess", "dulwich" or "auto"."""
+    if kind in ("dulwich", "auto"):
+        try:
+            return DulwichGitBackend(repo_dir, remote, branch, token)
+        except ImportError:
+            if kind == "dulwich":
+                logger.warning("[GitOps] dulwich not installed, using git CLI")
+    return SubprocessGitBackend(repo_dir, remote, branch, token)
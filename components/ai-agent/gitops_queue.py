@@ -0,0 +1,125 @@
+"""
+Batched GitOps commits.
+
+Every GitOps remediation used to read and rewrite the manifest, commit and
+push on its own. During an alert storm that meant dozens of pushes racing
+each other into non-fast-forward failures. GitOpsCommitQueue collects the
+actions submitted within a short window and hands them to one commit
+function call, which edits the manifest once and makes one commit and one
+push. The outcome for each action goes back to its caller through a future.
+
+A caller that stops waiting cancels its future. A cancelled edit is dropped
+when the next batch is taken. Once an edit has been taken its future is
+running and can no longer be cancelled, so the caller knows the commit may
+still land.
+"""
+
+import threading
+import concurrent.futures
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional
+
+from loguru import logger
+
+
+@dataclass
+class PendingEdit:
+    """One remediation waiting for the next GitOps commit"""
+
+    dep_name: str
+    namespace: str
+    action: Any
+    # Manifest kind of the live target, when the caller knows it
+    kind: Optional[str] = None
+    future: concurrent.futures.Future = field(default_factory=concurrent.futures.Future)
+
+
+class GitOpsCommitQueue:
+    """
+    Coalesces GitOps remediations into one commit per batch window.
+
+    ``commit_batch`` receives the pending edits in submission order and returns
+    one bool per edit; an exception fails the whole batch.
+    """
+
+    def __init__(
+        self,
+        commit_batch: Callable[[List[PendingEdit]], List[bool]],
+        window: float = 0.5,
+        max_batch: int = 20,
+    ):
+        self.commit_batch = commit_batch
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: List[PendingEdit] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.batches = 0
+        self.committed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.largest_batch = 0
+
+    def submit(
+        self, dep_name: str, namespace: str, action, kind: Optional[str] = None
+    ) -> concurrent.futures.Future:
+        edit = PendingEdit(dep_name, namespace, action, kind)
+        with self._cond:
+            self._pending.append(edit)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="gitops-commit-queue", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+        return edit.future
+
+    def _next_batch(self) -> List[PendingEdit]:
+        with self._cond:
+            while True:
+                while not self._pending:
+                    self._cond.wait()
+                # Give concurrent remediations the window to join this commit
+                self._cond.wait_for(
+                    lambda: len(self._pending) >= self.max_batch, timeout=self.window
+                )
+                taken = self._pending[: self.max_batch]
+                del self._pending[: self.max_batch]
+                # Edits whose caller gave up are skipped; the rest can't be cancelled
+                batch = [e for e in taken if e.future.set_running_or_notify_cancel()]
+                self.cancelled += len(taken) - len(batch)
+                if batch:
+                    return batch
+
+    def _run(self):
+        while True:
+            self.flush(self._next_batch())
+
+    def flush(self, batch: List[PendingEdit]):
+        """Commit ``batch`` and resolve each edit's future."""
+        try:
+            results = self.commit_batch(batch)
+            if len(results) != len(batch):
+                raise ValueError(f"{len(results)} results for {len(batch)} edits")
+        except Exception as e:
+            logger.exception(f"[GitOps] Batch of {len(batch)} failed: {e}")
+            results = [False] * len(batch)
+
+        with self._cond:
+            self.batches += 1
+            self.largest_batch = max(self.largest_batch, len(batch))
+            self.committed += sum(1 for ok in results if ok)
+            self.failed += sum(1 for ok in results if not ok)
+        for edit, ok in zip(batch, results):
+            edit.future.set_result(bool(ok))
+
+    def get_stats(self) -> dict:
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "batches": self.batches,
+                "committed": self.committed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+                "largest_batch": self.largest_batch,
+            }
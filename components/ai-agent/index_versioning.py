@@ -0,0 +1,72 @@
+"""
+Embedding-model versioning for the vector stores.
+
+Vectors from different embedding models (or dimensions) are not comparable,
+so every index records which model built it:
+  - ChromaDB: one collection per model, tagged with embed_model/vector_dim
+  - FAISS: an index_manifest.json next to the index files
+
+Indexes written before versioning carry no tag and are assumed to come from
+LEGACY_EMBED_MODEL, the only model the agent shipped with.
+"""
+
+import os
+import re
+import json
+import hashlib
+import datetime
+from typing import Optional
+
+LEGACY_EMBED_MODEL = "all-MiniLM-L6-v2"
+LEGACY_VECTOR_DIM = 384
+COLLECTION_PREFIX = "post-mortems"
+MANIFEST_FILE = "index_manifest.json"
+
+
+def collection_name_for(embed_model: str) -> str:
+    """ChromaDB collection holding vectors from ``embed_model``."""
+    if embed_model == LEGACY_EMBED_MODEL:
+        # Keep serving the pre-versioning collection without a migration
+        return COLLECTION_PREFIX
+    slug = re.sub(r"[^a-z0-9]+", "-", embed_model.lower()).strip("-")[:40]
+    digest = hashlib.sha256(embed_model.encode()).hexdigest()[:6]
+    return f"{COLLECTION_PREFIX}-{slug}-{digest}"
+
+
+def collection_embed_model(name: str, metadata: Optional[dict]) -> Optional[str]:
+    """Model that built a collection, or None if it is not a post-mortem index."""
+    if metadata and metadata.get("embed_model"):
+        return metadata["embed_model"]
+    if name == COLLECTION_PREFIX:
+        return LEGACY_EMBED_MODEL
+    return None
+
+
+def read_manifest(persist_dir: str) -> Optional[dict]:
+    path = os.path.join(persist_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def write_manifest(persist_dir: str, embed_model: str, vector_dim: int) -> None:
+    path = os.path.join(persist_dir, MANIFEST_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(
+            {
+                "embed_model": embed_model,
+                "vector_dim": vector_dim,
+                "built_at": datetime.datetime.utcnow().isoformat(),
+            },
+            f,
+        )
+    os.replace(tmp_path, path)
+
+
+def manifest_matches(manifest: dict, embed_model: str, vector_dim: int) -> bool:
+    return (
+        manifest.get("embed_model") == embed_model
+        and int(manifest.get("vector_dim", 0)) == vector_dim
+    )
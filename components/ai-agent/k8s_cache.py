@@ -0,0 +1,432 @@
+"""
+Informer-style local cache of Deployments and Argo Rollouts.
+
+One background list-watch per (kind, namespace) keeps an in-memory store in
+sync: an initial LIST records the collection's resourceVersion, and WATCH
+resumes from the last version seen (bookmarks included) so reconnects do not
+relist. A 410 Gone means the version fell out of etcd's window; only then
+does the informer relist.
+
+Lookups are O(1) dict reads. Until both kinds are synced for a namespace the
+cache answers None and callers fall back to a live GET, so the agent behaves
+the same with or without the informers running.
+
+RolloutVerifier rides on the same watch streams: each remediation registers
+a future that resolves True once the target's status converges, or False at
+its deadline, so any number of verifications share the informers' watches.
+"""
+
+import time
+import heapq
+import itertools
+import threading
+import concurrent.futures
+from typing import Callable, Optional, Tuple
+
+from kubernetes import client, watch
+from loguru import logger
+
+
+def _field(obj, *path):
+    """Read metadata fields from typed models and custom-object dicts alike"""
+    for name in path:
+        if obj is None:
+            return None
+        if isinstance(obj, dict):
+            obj = obj.get(name) or obj.get(
+                "".join(
+                    w.capitalize() if i else w for i, w in enumerate(name.split("_"))
+                )
+            )
+        else:
+            obj = getattr(obj, name, None)
+    return obj
+
+
+class ResourceInformer:
+    """List-watch cache of one resource kind across a set of namespaces."""
+
+    RETRY_SECONDS = 5.0
+    ABSENT_RETRY_SECONDS = 300.0
+
+    def __init__(
+        self,
+        kind: str,
+        list_func: Callable,
+        namespaces: list,
+        watch_timeout: int = 300,
+        watch_factory: Callable = watch.Watch,
+        **list_kwargs,
+    ):
+        self.kind = kind
+        self.list_func = list_func
+        self.namespaces = list(namespaces)
+        self.watch_timeout = watch_timeout
+        self.watch_factory = watch_factory
+        self.list_kwargs = list_kwargs
+
+        self.store = {}
+        self.synced = set()
+        self.relists = 0
+        self.events = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self._listeners = []
+
+    def start(self):
+        for namespace in self.namespaces:
+            thread = threading.Thread(
+                target=self._run,
+                args=(namespace,),
+                daemon=True,
+                name=f"informer-{self.kind}-{namespace}",
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+
+    def add_listener(self, callback: Callable):
+        """``callback(kind, namespace, name, obj)``; obj is None once deleted"""
+        self._listeners.append(callback)
+
+    def _notify(self, namespace: str, name: str, obj):
+        for callback in self._listeners:
+            try:
+                callback(self.kind, namespace, name, obj)
+            except Exception as e:
+                logger.warning(f"[k8s-cache] {self.kind} listener failed: {e}")
+
+    def get(self, namespace: str, name: str):
+        with self._lock:
+            return self.store.get((namespace, name))
+
+    def is_synced(self, namespace: str) -> bool:
+        return namespace in self.synced
+
+    def _relist(self, namespace: str) -> str:
+        """Replace the namespace's objects; returns the list resourceVersion"""
+        result = self.list_func(namespace=namespace, **self.list_kwargs)
+        items = _field(result, "items") or []
+        with self._lock:
+            for key in [k for k in self.store if k[0] == namespace]:
+                del self.store[key]
+            for obj in items:
+                self.store[(namespace, _field(obj, "metadata", "name"))] = obj
+            self.relists += 1
+        self.synced.add(namespace)
+        for obj in items:
+            self._notify(namespace, _field(obj, "metadata", "name"), obj)
+        return _field(result, "metadata", "resource_version")
+
+    def _apply(self, namespace: str, event: dict) -> Optional[str]:
+        """Apply one watch event; returns the resourceVersion to resume from"""
+        obj = event["object"]
+        kind = event["type"]
+        if kind == "ERROR":
+            code = _field(obj, "code")
+            raise client.ApiException(status=code or 500, reason=_field(obj, "message"))
+        version = _field(obj, "metadata", "resource_version")
+        if kind == "BOOKMARK":
+            return version
+        key = (namespace, _field(obj, "metadata", "name"))
+        with self._lock:
+            if kind == "DELETED":
+                self.store.pop(key, None)
+            else:
+                self.store[key] = obj
+            self.events += 1
+        self._notify(namespace, key[1], None if kind == "DELETED" else obj)
+        return version
+
+    def _run(self, namespace: str):
+        version = None
+        while not self._stop.is_set():
+            try:
+                if version is None:
+                    version = self._relist(namespace)
+                stream = self.watch_factory().stream(
+                    self.list_func,
+                    namespace=namespace,
+                    resource_version=version,
+                    timeout_seconds=self.watch_timeout,
+                    allow_watch_bookmarks=True,
+                    **self.list_kwargs,
+                )
+                for event in stream:
+                    version = self._apply(namespace, event) or version
+                    if self._stop.is_set():
+                        return
+            except client.ApiException as e:
+                if e.status == 410:
+                    logger.info(
+                        f"[k8s-cache] {self.kind}/{namespace} expired; relisting"
+                    )
+                    version = None
+                    continue
+                if e.status == 404:
+                    # The kind is not served here (e.g. no Argo Rollouts CRD):
+                    # an empty, synced store is the truthful answer
+                    with self._lock:
+                        for key in [k for k in self.store if k[0] == namespace]:
+                            del self.store[key]
+                    self.synced.add(namespace)
+                    version = None
+                    self._stop.wait(self.ABSENT_RETRY_SECONDS)
+                    continue
+                logger.warning(f"[k8s-cache] {self.kind}/{namespace} watch failed: {e}")
+                self._stop.wait(self.RETRY_SECONDS)
+            except Exception as e:
+                logger.warning(f"[k8s-cache] {self.kind}/{namespace} watch failed: {e}")
+                self._stop.wait(self.RETRY_SECONDS)
+
+    def get_state(self) -> dict:
+        with self._lock:
+            objects = len(self.store)
+        return {
+            "objects": objects,
+            "synced_namespaces": sorted(self.synced),
+            "relists": self.relists,
+            "events": self.events,
+        }
+
+
+class ClusterCache:
+    """Deployments + Rollouts of the safe namespaces, for target lookups."""
+
+    def __init__(
+        self,
+        apps_api: client.AppsV1Api,
+        custom_api: client.CustomObjectsApi,
+        namespaces: list,
+        watch_timeout: int = 300,
+    ):
+        self.deployments = ResourceInformer(
+            "deployments",
+            apps_api.list_namespaced_deployment,
+            namespaces,
+            watch_timeout,
+        )
+        self.rollouts = ResourceInformer(
+            "rollouts",
+            custom_api.list_namespaced_custom_object,
+            namespaces,
+            watch_timeout,
+            group="argoproj.io",
+            version="v1alpha1",
+            plural="rollouts",
+        )
+        self.hits = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.rollouts.start()
+        self.deployments.start()
+        logger.info("[+] Kubernetes informer cache started")
+
+    def stop(self):
+        self.rollouts.stop()
+        self.deployments.stop()
+
+    def is_synced(self, namespace: str) -> bool:
+        return self.rollouts.is_synced(namespace) and self.deployments.is_synced(
+            namespace
+        )
+
+    def get_target(self, name: str, namespace: str) -> Optional[Tuple]:
+        """
+        ("rollout", obj), ("deployment", obj) or (None, None) from the cache;
+        None when the namespace is not synced and a live GET is needed.
+        """
+        if not self.is_synced(namespace):
+            with self._lock:
+                self.fallbacks += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        rollout = self.rollouts.get(namespace, name)
+        if rollout is not None:
+            return "rollout", rollout
+        deployment = self.deployments.get(namespace, name)
+        if deployment is not None:
+            return "deployment", deployment
+        return None, None
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = {"hits": self.hits, "fallbacks": self.fallbacks}
+        return {
+            **lookups,
+            "deployments": self.deployments.get_state(),
+            "rollouts": self.rollouts.get_state(),
+        }
+
+
+def generation_of(obj) -> Optional[int]:
+    """metadata.generation of a Deployment/Rollout, model or dict"""
+    generation = _field(obj, "metadata", "generation") if obj is not None else None
+    return generation if isinstance(generation, int) else None
+
+
+def rollout_converged(kind: str, obj, min_generation: Optional[int] = None) -> bool:
+    """
+    Whether a Deployment/Rollout finished rolling out: the controller has
+    observed the latest spec, every desired replica runs the new template and
+    is ready, and no old replicas remain. ``min_generation`` rejects states
+    that predate the remediation's own write.
+    """
+    if obj is None:
+        return False
+    generation = _field(obj, "metadata", "generation") or 0
+    if min_generation is not None and generation < min_generation:
+        return False
+    if kind == "rollouts":
+        status = obj.get("status") or {}
+        # Argo records observedGeneration as a string
+        if str(status.get("observedGeneration", "")) != str(generation):
+            return False
+        if status.get("phase"):
+            return status["phase"] == "Healthy"
+        desired = (obj.get("spec") or {}).get("replicas", 1)
+        updated = status.get("updatedReplicas", 0)
+        total = status.get("replicas", 0)
+        ready = status.get("readyReplicas", 0)
+    else:
+        if (obj.status.observed_generation or 0) < generation:
+            return False
+        desired = obj.spec.replicas if obj.spec.replicas is not None else 1
+        updated = obj.status.updated_replicas or 0
+        total = obj.status.replicas or 0
+        ready = obj.status.ready_replicas or 0
+    return updated >= desired and total <= updated and ready >= desired
+
+
+class _Verification:
+    __slots__ = ("key", "deadline", "min_generation", "future", "started")
+
+    def __init__(self, key, deadline, min_generation):
+        self.key = key
+        self.deadline = deadline
+        self.min_generation = min_generation
+        self.future = concurrent.futures.Future()
+        self.started = time.monotonic()
+
+
+class RolloutVerifier:
+    """
+    Multiplexes rollout verifications over the ClusterCache watch streams.
+
+    verify() returns a Future[bool]. Watch events re-check only the
+    verifications of the object that changed; one timer thread expires
+    deadlines from a heap, so pending verifications cost no API calls.
+    """
+
+    def __init__(self, cache: ClusterCache):
+        self.cache = cache
+        self._pending = {}
+        self._deadlines = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._timer = None
+        self.converged = 0
+        self.timed_out = 0
+        self._converge_seconds = 0.0
+        cache.deployments.add_listener(self._on_event)
+        cache.rollouts.add_listener(self._on_event)
+
+    def verify(
+        self,
+        name: str,
+        namespace: str,
+        timeout: float = 300.0,
+        min_generation: Optional[int] = None,
+    ) -> concurrent.futures.Future:
+        pending = _Verification(
+            (namespace, name), time.monotonic() + timeout, min_generation
+        )
+        with self._lock:
+            self._pending.setdefault(pending.key, []).append(pending)
+            heapq.heappush(
+                self._deadlines, (pending.deadline, next(self._sequence), pending)
+            )
+            self._ensure_timer()
+            self._wake.notify()
+        # The object may already be converged; no event would arrive for it
+        target = self.cache.get_target(name, namespace)
+        if target and target[0]:
+            kind = "rollouts" if target[0] == "rollout" else "deployments"
+            self._on_event(kind, namespace, name, target[1])
+        return pending.future
+
+    def _on_event(self, kind: str, namespace: str, name: str, obj):
+        key = (namespace, name)
+        with self._lock:
+            waiting = self._pending.get(key)
+            if not waiting:
+                return
+            done = [
+                v for v in waiting if rollout_converged(kind, obj, v.min_generation)
+            ]
+            if not done:
+                return
+            self._pending[key] = [v for v in waiting if v not in done]
+            if not self._pending[key]:
+                del self._pending[key]
+            now = time.monotonic()
+            for verification in done:
+                self.converged += 1
+                self._converge_seconds += now - verification.started
+        for verification in done:
+            if not verification.future.done():
+                verification.future.set_result(True)
+
+    def _ensure_timer(self):
+        if self._timer is None or not self._timer.is_alive():
+            self._timer = threading.Thread(
+                target=self._expire_loop, daemon=True, name="rollout-verifier"
+            )
+            self._timer.start()
+
+    def _expire_loop(self):
+        while True:
+            expired = []
+            with self._lock:
+                while self._deadlines and self._deadlines[0][2].future.done():
+                    heapq.heappop(self._deadlines)
+                if not self._deadlines:
+                    self._wake.wait(timeout=60)
+                    if not self._deadlines:
+                        self._timer = None
+                        return
+                    continue
+                wait = self._deadlines[0][0] - time.monotonic()
+                if wait > 0:
+                    self._wake.wait(timeout=wait)
+                    continue
+                _, _, verification = heapq.heappop(self._deadlines)
+                waiting = self._pending.get(verification.key, [])
+                if verification in waiting:
+                    waiting.remove(verification)
+                    if not waiting:
+                        del self._pending[verification.key]
+                    self.timed_out += 1
+                    expired.append(verification)
+            for verification in expired:
+                verification.future.set_result(False)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": sum(len(v) for v in self._pending.values()),
+                "converged": self.converged,
+                "timed_out": self.timed_out,
+                "avg_converge_seconds": (
+                    round(self._converge_seconds / self.converged, 1)
+                    if self.converged
+                    else None
+                ),
+            }
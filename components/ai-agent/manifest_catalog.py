@@ -0,0 +1,262 @@
+"""
+Catalog of workload manifests across the GitOps tree.
+
+GitOps remediation used to edit one hard-coded kubernetes-manifests.yaml.
+Workloads defined in any other file, such as a Rollout kept next to the
+bundle, fell back to direct patching. ManifestCatalog scans the manifest
+directories once. It maps (kind, namespace, name) to the file that defines
+each workload, using the per-file document indexes of ManifestEditor.
+
+Documents that a kustomization removes with ``$patch: delete`` are skipped,
+like the upstream frontend Deployment that the frontend Rollout replaces.
+Callers that know the live kind pass it to locate(). Otherwise a Rollout is
+preferred over a Deployment of the same name, matching get_target_type().
+
+Refreshes are incremental: the catalog remembers the commit it last
+indexed and re-reads only the files the git backend reports changed since
+then. If git cannot answer, the catalog falls back to a full scan, in which
+unchanged files are served from the editor's cache.
+"""
+
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import yaml
+from loguru import logger
+
+from manifest_editor import ManifestEditor
+
+MANIFEST_SUFFIXES = (".yaml", ".yml")
+WORKLOAD_KINDS = ("Rollout", "Deployment")
+KUSTOMIZATION_FILES = ("kustomization.yaml", "kustomization.yml")
+_DELETE_PATCH = re.compile(r"^\$patch:\s*delete\s*$", re.MULTILINE)
+
+
+def _delete_targets(patch_text: str, target: Optional[dict]) -> Set[tuple]:
+    """(kind, name) removed by a ``$patch: delete`` strategic-merge patch"""
+    try:
+        docs = list(yaml.safe_load_all(patch_text))
+    except yaml.YAMLError:
+        return set()
+    deleted = set()
+    for doc in docs:
+        if not isinstance(doc, dict) or doc.get("$patch") != "delete":
+            continue
+        if target:
+            # A label-selector target can't be resolved without the cluster
+            kind, name = target.get("kind") or doc.get("kind"), target.get("name")
+        else:
+            kind, name = doc.get("kind"), (doc.get("metadata") or {}).get("name")
+        if kind and name:
+            deleted.add((kind, name))
+    return deleted
+
+
+def kustomize_deletions(path: str) -> Set[tuple]:
+    """(kind, name) of the resources a kustomization deletes by patch"""
+    with open(path) as f:
+        kustomization = yaml.safe_load(f) or {}
+    base = os.path.dirname(path)
+    patches = [
+        p if isinstance(p, dict) else {"patch" if "\n" in p else "path": p}
+        for p in (kustomization.get("patches") or [])
+        + (kustomization.get("patchesStrategicMerge") or [])
+    ]
+    deleted = set()
+    for patch in patches:
+        text = patch.get("patch")
+        if text is None and patch.get("path"):
+            try:
+                with open(os.path.join(base, patch["path"])) as f:
+                    text = f.read()
+            except OSError:
+                continue
+        if text:
+            deleted |= _delete_targets(text, patch.get("target"))
+    return deleted
+
+
+class ManifestCatalog:
+    """(kind, namespace, name) -> manifest file, relative to the repository"""
+
+    def __init__(
+        self,
+        repo_dir: str,
+        search_dirs: Sequence[str],
+        editor: ManifestEditor,
+        git_backend=None,
+    ):
+        self.repo_dir = repo_dir
+        self.search_dirs = [d.strip("/") for d in search_dirs if d]
+        self.editor = editor
+        self.git = git_backend
+        self._entries: Dict[tuple, str] = {}
+        self._files: Dict[str, List[tuple]] = {}
+        # kustomization directory -> (kind, name) it deletes from its resources
+        self._deleted: Dict[str, Set[tuple]] = {}
+        self._commit: Optional[str] = None
+        self._built = False
+        self._lock = threading.Lock()
+        self.full_scans = 0
+        self.incremental_refreshes = 0
+        self.files_reindexed = 0
+
+    def covers(self, rel_path: str) -> bool:
+        """Whether ``rel_path`` is a manifest file under the search directories"""
+        return rel_path.endswith(MANIFEST_SUFFIXES) and any(
+            rel_path == d or rel_path.startswith(d + "/") for d in self.search_dirs
+        )
+
+    def _head(self) -> Optional[str]:
+        if self.git is None:
+            return None
+        try:
+            return self.git.head()
+        except Exception as e:
+            logger.debug(f"[Catalog] HEAD unavailable: {e}")
+            return None
+
+    def _index_file(self, rel_path: str):
+        """Replace the catalog entries contributed by ``rel_path``."""
+        for key in self._files.pop(rel_path, []):
+            if self._entries.get(key) == rel_path:
+                del self._entries[key]
+        path = os.path.join(self.repo_dir, rel_path)
+        if os.path.basename(rel_path) in KUSTOMIZATION_FILES:
+            self._index_kustomization(rel_path, path)
+            return
+        if not os.path.isfile(path):
+            return
+        try:
+            index = self.editor.index(path)
+        except (OSError, UnicodeDecodeError) as e:
+            logger.warning(f"[Catalog] Cannot index {rel_path}: {e}")
+            return
+        keys = []
+        for doc in index.documents:
+            # A patch document, not a resource
+            if _DELETE_PATCH.search(index.text, doc.start, doc.end):
+                continue
+            if doc.kind and doc.name:
+                key = (doc.kind, doc.namespace, doc.name)
+                if key in self._entries and self._entries[key] != rel_path:
+                    logger.warning(
+                        f"[Catalog] {doc.kind}/{doc.name} defined in both "
+                        f"{self._entries[key]} and {rel_path}; using the first"
+                    )
+                    continue
+                self._entries[key] = rel_path
+                keys.append(key)
+        self._files[rel_path] = keys
+        self.files_reindexed += 1
+
+    def _index_kustomization(self, rel_path: str, path: str):
+        scope = os.path.dirname(rel_path)
+        self._deleted.pop(scope, None)
+        if not os.path.isfile(path):
+            return
+        try:
+            deleted = kustomize_deletions(path)
+        except (OSError, yaml.YAMLError) as e:
+            logger.warning(f"[Catalog] Cannot read {rel_path}: {e}")
+            deleted = set()
+        if deleted:
+            self._deleted[scope] = deleted
+        self._files[rel_path] = []
+
+    def _is_deleted(self, kind: str, name: str, rel_path: str) -> bool:
+        """Whether a kustomization above ``rel_path`` deletes the document"""
+        directory = os.path.dirname(rel_path)
+        return any(
+            (kind, name) in deleted
+            and (scope == "" or directory == scope or directory.startswith(scope + "/"))
+            for scope, deleted in self._deleted.items()
+        )
+
+    def rebuild(self):
+        """Full scan of the search directories."""
+        with self._lock:
+            head = self._head()
+            found = set()
+            for base in self.search_dirs:
+                for root, dirs, files in os.walk(os.path.join(self.repo_dir, base)):
+                    dirs[:] = [d for d in dirs if not d.startswith(".")]
+                    for name in files:
+                        if name.endswith(MANIFEST_SUFFIXES):
+                            rel = os.path.relpath(
+                                os.path.join(root, name), self.repo_dir
+                            )
+                            found.add(rel.replace(os.sep, "/"))
+            for rel in set(self._files) - found:
+                self._index_file(rel)
+            for rel in sorted(found):
+                self._index_file(rel)
+            self._commit = head
+            self._built = True
+            self.full_scans += 1
+            logger.info(
+                f"[Catalog] Indexed {len(self._entries)} manifests in {len(found)} files"
+            )
+
+    def refresh(self):
+        """Re-index only the files changed since the last indexed commit."""
+        if not self._built:
+            return self.rebuild()
+        head = self._head()
+        with self._lock:
+            if head is not None and head == self._commit:
+                return
+            since = self._commit
+        if head is None or since is None:
+            return self.rebuild()
+        try:
+            changed = self.git.changed_paths(since, head)
+        except Exception as e:
+            # e.g. the old commit is gone after a shallow fetch
+            logger.info(f"[Catalog] Incremental refresh unavailable ({e}), rescanning")
+            return self.rebuild()
+        with self._lock:
+            changed = [rel for rel in changed if self.covers(rel)]
+            for rel in changed:
+                self._index_file(rel)
+            if changed:
+                # A patch file a kustomization references by path may be
+                # among the changes; kustomizations are few, re-read them all
+                for rel in list(self._files):
+                    if os.path.basename(rel) in KUSTOMIZATION_FILES:
+                        self._index_file(rel)
+            self._commit = head
+            self.incremental_refreshes += 1
+
+    def locate(
+        self, namespace: str, name: str, kinds: Sequence[str] = WORKLOAD_KINDS
+    ) -> Optional[Tuple[str, str]]:
+        """
+        (file, kind) of the workload; manifests may omit their namespace.
+
+        ``kinds`` are tried in order; documents a kustomization deletes are
+        never returned.
+        """
+        if not self._built:
+            self.rebuild()
+        with self._lock:
+            for kind in kinds:
+                for ns in (namespace, None):
+                    rel = self._entries.get((kind, ns, name))
+                    if rel is not None and not self._is_deleted(kind, name, rel):
+                        return rel, kind
+        return None
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "manifests": len(self._entries),
+                "files": len(self._files),
+                "kustomize_deletions": sum(len(d) for d in self._deleted.values()),
+                "indexed_commit": self._commit,
+                "full_scans": self.full_scans,
+                "incremental_refreshes": self.incremental_refreshes,
+                "files_reindexed": self.files_reindexed,
+            }
@@ -0,0 +1,335 @@
+"""
+Indexed, formatting-preserving edits of multi-document manifests.
+
+Loading a whole manifest bundle with ``yaml.safe_load_all`` and writing it
+back with ``yaml.dump_all`` costs O(file) per remediation. It also drops
+every comment and reflows every document, so a one-line replica change
+becomes a diff of the whole file.
+
+ManifestEditor keeps a ManifestIndex per file that maps (kind, name) to the
+character span of its document. The index is cached and rebuilt only when
+the file's mtime/size and then its content hash change. An edit rewrites
+only the target document, and inside it only the lines on the edited key
+path. When a document is too irregular for the line editor (flow-style
+mappings, block scalars), only that document is re-serialized.
+"""
+
+import os
+import re
+import json
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import yaml
+from loguru import logger
+
+DOC_SEPARATOR = re.compile(r"^---[ \t]*(?:#.*)?$", re.M)
+
+# (key path, value) pairs applied to one document
+Changes = Sequence[Tuple[Sequence[str], Any]]
+
+
+@dataclass
+class ManifestDocument:
+    """One document of a manifest bundle and where it lives in the file"""
+
+    kind: Optional[str]
+    namespace: Optional[str]
+    name: Optional[str]
+    start: int
+    end: int
+
+
+@dataclass
+class ManifestIndex:
+    path: str
+    text: str
+    mtime_ns: int
+    size: int
+    digest: str
+    documents: List[ManifestDocument] = field(default_factory=list)
+    by_key: Dict[tuple, int] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, path: str, text: str, stat: os.stat_result) -> "ManifestIndex":
+        index = cls(path, text, stat.st_mtime_ns, stat.st_size, _digest(text))
+        start = 0
+        for sep in DOC_SEPARATOR.finditer(text):
+            index._add(start, sep.start())
+            start = min(sep.end() + 1, len(text))
+        index._add(start, len(text))
+        return index
+
+    def _add(self, start: int, end: int):
+        try:
+            doc = yaml.safe_load(self.text[start:end])
+        except yaml.YAMLError as e:
+            logger.warning(f"[Manifest] Unparseable document in {self.path}: {e}")
+            doc = None
+        if not isinstance(doc, dict):
+            doc = {}
+        metadata = doc.get("metadata") or {}
+        entry = ManifestDocument(
+            doc.get("kind"), metadata.get("namespace"), metadata.get("name"), start, end
+        )
+        if entry.kind and entry.name:
+            self.by_key.setdefault((entry.kind, entry.name), len(self.documents))
+        self.documents.append(entry)
+
+    def find(self, kind: str, name: str) -> Optional[ManifestDocument]:
+        i = self.by_key.get((kind, name))
+        return None if i is None else self.documents[i]
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Line-level editing of block-style YAML
+# ---------------------------------------------------------------------------
+def _render_scalar(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return str(value)
+    # JSON strings are valid double-quoted YAML and never parse as timestamps
+    return json.dumps(str(value))
+
+
+def _key_pattern(key: str) -> re.Pattern:
+    quoted = re.escape(key)
+    return re.compile(
+        rf"^(?P<indent> *)(?P<q>[\"']?){quoted}(?P=q)[ \t]*:(?P<rest>[ \t].*|)$"
+    )
+
+
+def _is_content(line: str) -> bool:
+    stripped = line.strip()
+    return bool(stripped) and not stripped.startswith("#")
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip(" "))
+
+
+def _split_value(rest: str) -> Tuple[str, str]:
+    """(value, trailing comment) of the text after a key's colon"""
+    m = re.match(r"^(?P<value>.*?)(?P<comment>[ \t]+#.*)?$", rest)
+    return m.group("value").strip(), m.group("comment") or ""
+
+
+def _block_end(lines: List[str], i: int, key_indent: int, hi: int) -> int:
+    """First line after the children of the key on line ``i``"""
+    j = i + 1
+    while j < hi:
+        line = lines[j]
+        if _is_content(line):
+            indent = _indent(line)
+            if indent < key_indent or (
+                indent == key_indent and not line.lstrip().startswith("-")
+            ):
+                break
+        j += 1
+    return j
+
+
+def _nested_lines(keys: Sequence[str], value: Any, indent: int) -> List[str]:
+    out = []
+    for depth, key in enumerate(keys[:-1]):
+        out.append(" " * (indent + 2 * depth) + f"{key}:")
+    out.append(
+        " " * (indent + 2 * (len(keys) - 1)) + f"{keys[-1]}: {_render_scalar(value)}"
+    )
+    return out
+
+
+def set_path(text: str, keys: Sequence[str], value: Any) -> Optional[str]:
+    """
+    Set ``keys`` to the scalar ``value`` in a block-style YAML document,
+    touching only the lines on that path. None when the line editor
+    cannot make the change safely.
+    """
+    lines = text.split("\n")
+    lo, hi, parent_indent = 0, len(lines), -2
+    for depth, key in enumerate(keys):
+        children = [i for i in range(lo, hi) if _is_content(lines[i])]
+        if not children:
+            lines[lo:lo] = _nested_lines(keys[depth:], value, parent_indent + 2)
+            return "\n".join(lines)
+        child_indent = _indent(lines[children[0]])
+        if child_indent <= parent_indent:
+            return None
+
+        pattern = _key_pattern(key)
+        found = None
+        for i in children:
+            if _indent(lines[i]) == child_indent:
+                m = pattern.match(lines[i])
+                if m:
+                    found = (i, m)
+                    break
+        if found is None:
+            # New top-level keys go last; nested ones first in their block,
+            # where the indent is known whatever the block's last child holds
+            at = children[-1] + 1 if depth == 0 else children[0]
+            lines[at:at] = _nested_lines(keys[depth:], value, child_indent)
+            return "\n".join(lines)
+
+        i, m = found
+        current, comment = _split_value(m.group("rest"))
+        end = _block_end(lines, i, child_indent, hi)
+        has_children = any(_is_content(lines[j]) for j in range(i + 1, end))
+        if depth == len(keys) - 1:
+            if has_children or current[:1] in ("{", "[", "|", ">", "&", "*", "!"):
+                return None
+            prefix = lines[i][: m.start("rest")]
+            lines[i] = f"{prefix} {_render_scalar(value)}{comment}"
+            return "\n".join(lines)
+
+        if current and current not in ("~", "null"):
+            # Flow-style or scalar where a mapping is needed
+            return None
+        if current:
+            lines[i] = lines[i][: m.start("rest")] + comment
+        lo, hi, parent_indent = i + 1, end, child_indent
+    return None
+
+
+def _apply_changes(doc: Any, changes: Changes) -> dict:
+    doc = doc if isinstance(doc, dict) else {}
+    for keys, value in changes:
+        node = doc
+        for key in keys[:-1]:
+            if not isinstance(node.get(key), dict):
+                node[key] = {}
+            node = node[key]
+        node[keys[-1]] = value
+    return doc
+
+
+def edit_document(text: str, changes: Changes) -> Tuple[str, bool]:
+    """(new text, whether the whole document had to be re-serialized)"""
+    expected = _apply_changes(yaml.safe_load(text), changes)
+    edited = text
+    for keys, value in changes:
+        candidate = set_path(edited, keys, value)
+        if candidate is None:
+            break
+        edited = candidate
+    else:
+        try:
+            # The line edit must change exactly what a full re-dump would
+            if yaml.safe_load(edited) == expected:
+                return edited, False
+        except yaml.YAMLError:
+            pass
+    redumped = yaml.dump(expected, default_flow_style=False, sort_keys=False)
+    if text.endswith("\n\n") and not redumped.endswith("\n\n"):
+        redumped += "\n"
+    return redumped, True
+
+
+# ---------------------------------------------------------------------------
+# Editor
+# ---------------------------------------------------------------------------
+class ManifestEditor:
+    """Cached manifest indexes plus in-place document edits"""
+
+    def __init__(self):
+        self._indexes: Dict[str, ManifestIndex] = {}
+        self._lock = threading.Lock()
+        self.index_hits = 0
+        self.index_builds = 0
+        self.line_edits = 0
+        self.redumps = 0
+
+    def index(self, path: str) -> ManifestIndex:
+        """Index of ``path``, rebuilt only when its content changed."""
+        stat = os.stat(path)
+        with self._lock:
+            cached = self._indexes.get(path)
+            if (
+                cached is not None
+                and cached.mtime_ns == stat.st_mtime_ns
+                and cached.size == stat.st_size
+            ):
+                self.index_hits += 1
+                return cached
+
+        with open(path, "r") as f:
+            text = f.read()
+        with self._lock:
+            if cached is not None and cached.digest == _digest(text):
+                # Touched, not changed (checkout, copy)
+                cached.mtime_ns, cached.size = stat.st_mtime_ns, stat.st_size
+                self.index_hits += 1
+                return cached
+            index = ManifestIndex.build(path, text, stat)
+            self._indexes[path] = index
+            self.index_builds += 1
+            return index
+
+    def apply(self, path: str, edits: Sequence[Tuple[str, str, Changes]]) -> List[bool]:
+        """
+        Apply ``(kind, name, changes)`` edits to ``path`` in one write.
+        Returns one bool per edit: False when the document does not exist.
+        """
+        index = self.index(path)
+        new_texts: Dict[int, str] = {}
+        results = []
+        for kind, name, changes in edits:
+            i = index.by_key.get((kind, name))
+            if i is None:
+                results.append(False)
+                continue
+            doc = index.documents[i]
+            current = new_texts.get(i, index.text[doc.start : doc.end])
+            new_texts[i], redumped = edit_document(current, changes)
+            with self._lock:
+                if redumped:
+                    self.redumps += 1
+                else:
+                    self.line_edits += 1
+            results.append(True)
+
+        if not new_texts:
+            return results
+
+        pieces, spans, shift, cursor = [], [], 0, 0
+        for i, doc in enumerate(index.documents):
+            start = doc.start + shift
+            if i in new_texts:
+                pieces.append(index.text[cursor : doc.start])
+                pieces.append(new_texts[i])
+                cursor = doc.end
+                shift += len(new_texts[i]) - (doc.end - doc.start)
+            spans.append((start, doc.end + shift))
+        pieces.append(index.text[cursor:])
+        text = "".join(pieces)
+
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+        # Only the edited documents changed: shift spans instead of re-parsing
+        stat = os.stat(path)
+        with self._lock:
+            for doc, (start, end) in zip(index.documents, spans):
+                doc.start, doc.end = start, end
+            index.text, index.digest = text, _digest(text)
+            index.mtime_ns, index.size = stat.st_mtime_ns, stat.st_size
+        return results
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "indexed_files": len(self._indexes),
+                "index_hits": self.index_hits,
+                "index_builds": self.index_builds,
+                "line_edits": self.line_edits,
+                "redumps": self.redumps,
+            }
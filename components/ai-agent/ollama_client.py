@@ -0,0 +1,670 @@
+"""
+Ollama client for the AI Agent.
+
+All LLM calls share:
+  - an endpoint pool: with OLLAMA_ENDPOINTS listing one Ollama per GPU node,
+    each request goes to the least-loaded healthy endpoint, preferring ones
+    that already have the model resident. Every endpoint has its own
+    breaker + bulkhead; the first one uses CircuitBreakers.ollama.
+  - a retry budget: retries are capped to a fraction of successful calls
+    across every caller, so an overloaded Ollama is not hit with 3x the load
+  - optional hedging: when a call outlives the primary's p95 latency, the
+    same request is sent to OLLAMA_SECONDARY_URL and the first answer wins
+  - model residency: every request carries a keep_alive sized to the alert
+    traffic, and the model is pre-warmed at startup and ahead of alerts
+  - per-role models: specialists can run on a small fast model and the
+    Director on sre-kernel; answers failing a quality check are regenerated
+    with the fallback model
+"""
+
+import json
+import time
+import random
+import threading
+import collections
+import concurrent.futures
+from typing import Callable, Optional
+from urllib.parse import urlparse
+
+import requests
+from loguru import logger
+
+import agent_config
+from circuit_breaker import (
+    BulkheadFullError,
+    CircuitBreaker,
+    CircuitBreakerOpenError,
+    CircuitBreakers,
+    CircuitState,
+    RetryBudget,
+    ollama_circuit_breaker,
+)
+
+
+def _base_url(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+class LatencyTracker:
+    """Rolling latency percentiles over the last ``size`` successful calls."""
+
+    def __init__(self, size: int = 100):
+        self._samples = collections.deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class ModelResidency:
+    """
+    keep_alive scheduling and cold/warm accounting for Ollama models.
+
+    Ollama unloads a model keep_alive after its last request. Sizing it to
+    twice the median gap between recent alerts keeps the model resident
+    through normal traffic without pinning GPU memory through quiet spells.
+    A response whose load_duration exceeds COLD_LOAD_SECONDS was a cold start.
+    """
+
+    COLD_LOAD_SECONDS = 1.0
+
+    def __init__(self, min_keep_alive: float, max_keep_alive: float, history: int = 50):
+        self.min_keep_alive = min_keep_alive
+        self.max_keep_alive = max_keep_alive
+        self.cold = LatencyTracker()
+        self.warm = LatencyTracker()
+        self.cold_starts = 0
+        self.warm_calls = 0
+        self.prewarms = 0
+        self.last_call = 0.0
+        self._alerts = collections.deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def note_alert(self, now: Optional[float] = None):
+        with self._lock:
+            self._alerts.append(time.time() if now is None else now)
+
+    def keep_alive(self) -> int:
+        """Seconds Ollama should keep the model loaded after a request"""
+        with self._lock:
+            arrivals = list(self._alerts)
+        gaps = sorted(b - a for a, b in zip(arrivals, arrivals[1:]))
+        if len(gaps) < 3:
+            return int(self.min_keep_alive)
+        median = gaps[len(gaps) // 2]
+        return int(min(max(2 * median, self.min_keep_alive), self.max_keep_alive))
+
+    def is_resident(self) -> bool:
+        """Whether the model should still be loaded from the last call"""
+        return time.time() - self.last_call < self.keep_alive()
+
+    def mark_loaded(self):
+        with self._lock:
+            self.last_call = time.time()
+
+    def observe(self, body: dict, duration: float):
+        cold = body.get("load_duration", 0) / 1e9 >= self.COLD_LOAD_SECONDS
+        (self.cold if cold else self.warm).observe(duration)
+        with self._lock:
+            self.last_call = time.time()
+            if cold:
+                self.cold_starts += 1
+            else:
+                self.warm_calls += 1
+
+    def get_state(self) -> dict:
+        def ms(tracker, q):
+            value = tracker.percentile(q)
+            return round(value * 1000, 1) if value is not None else None
+
+        with self._lock:
+            counts = {
+                "cold_starts": self.cold_starts,
+                "warm_calls": self.warm_calls,
+                "prewarms": self.prewarms,
+            }
+        return {
+            "keep_alive_seconds": self.keep_alive(),
+            **counts,
+            "cold_p50_ms": ms(self.cold, 0.5),
+            "cold_p95_ms": ms(self.cold, 0.95),
+            "warm_p50_ms": ms(self.warm, 0.5),
+            "warm_p95_ms": ms(self.warm, 0.95),
+        }
+
+
+class RoleStats:
+    """Calls, fallbacks, latency and token usage of one model role."""
+
+    def __init__(self):
+        self.calls = 0
+        self.fallbacks = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latency = LatencyTracker()
+        self._lock = threading.Lock()
+
+    def observe(self, body: dict, duration: float):
+        self.latency.observe(duration)
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += body.get("prompt_eval_count", 0)
+            self.completion_tokens += body.get("eval_count", 0)
+
+    def record_fallback(self):
+        with self._lock:
+            self.fallbacks += 1
+
+    def get_state(self) -> dict:
+        p50, p95 = self.latency.percentile(0.5), self.latency.percentile(0.95)
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "fallbacks": self.fallbacks,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            }
+
+
+class OllamaEndpoint:
+    """One Ollama server: its breaker, current load and resident models."""
+
+    EWMA_ALPHA = 0.3
+
+    def __init__(self, base_url: str, breaker: CircuitBreaker):
+        self.base_url = base_url.rstrip("/")
+        self.breaker = breaker
+        self.outstanding = 0
+        self.requests = 0
+        self.ewma_latency: Optional[float] = None
+        self.healthy = True
+        self.loaded_models = set()
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        """Healthy and not inside an OPEN breaker's reset timeout"""
+        if not self.healthy:
+            return False
+        breaker = self.breaker
+        return not (
+            breaker.state == CircuitState.OPEN
+            and time.time() - breaker.last_failure_time < breaker.reset_timeout
+        )
+
+    def has_model(self, model: str) -> bool:
+        return any(m == model or m.split(":")[0] == model for m in self.loaded_models)
+
+    def begin(self):
+        with self._lock:
+            self.outstanding += 1
+            self.requests += 1
+
+    def end(self, model: str, duration: Optional[float]):
+        with self._lock:
+            self.outstanding -= 1
+            if duration is None:
+                return
+            # Answering at all means the model is now resident here
+            self.loaded_models.add(model)
+            self.ewma_latency = (
+                duration
+                if self.ewma_latency is None
+                else self.EWMA_ALPHA * duration
+                + (1 - self.EWMA_ALPHA) * self.ewma_latency
+            )
+
+    def probe(self, timeout: float = 2.0):
+        """Health via /api/tags, resident models via /api/ps"""
+        loaded = None
+        try:
+            healthy = (
+                requests.get(f"{self.base_url}/api/tags", timeout=timeout).status_code
+                == 200
+            )
+            if healthy:
+                res = requests.get(f"{self.base_url}/api/ps", timeout=timeout)
+                if res.status_code == 200:
+                    loaded = {m.get("name", "") for m in res.json().get("models", [])}
+        except (requests.exceptions.RequestException, ValueError):
+            healthy = False
+        with self._lock:
+            if healthy and not self.healthy:
+                logger.info(f"[+] Ollama endpoint {self.base_url} is healthy again")
+            elif not healthy and self.healthy:
+                logger.warning(f"[!] Ollama endpoint {self.base_url} failed its probe")
+            self.healthy = healthy
+            if loaded is not None or not healthy:
+                self.loaded_models = loaded or set()
+
+    def get_state(self) -> dict:
+        with self._lock:
+            return {
+                "url": self.base_url,
+                "healthy": self.healthy,
+                "circuit": self.breaker.state.value,
+                "outstanding": self.outstanding,
+                "requests": self.requests,
+                "ewma_ms": (
+                    round(self.ewma_latency * 1000, 1)
+                    if self.ewma_latency is not None
+                    else None
+                ),
+                "loaded_models": sorted(self.loaded_models),
+            }
+
+
+class EndpointPool:
+    """
+    Client-side balancer over Ollama endpoints.
+
+    Policies:
+      - least_outstanding: fewest in-flight requests, EWMA latency breaks ties
+      - ewma: EWMA latency x (in-flight + 1)
+
+    An endpoint without the model resident counts as one request busier, so
+    traffic sticks to warm GPUs until they are actually loaded.
+    """
+
+    def __init__(
+        self,
+        endpoints: list,
+        policy: str = "least_outstanding",
+        probe_interval: float = 15.0,
+    ):
+        self.endpoints = endpoints
+        self.policy = policy
+        self.probe_interval = probe_interval
+        self._last_probe = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _cost(self, endpoint: OllamaEndpoint, model: str) -> tuple:
+        busy = endpoint.outstanding + (0 if endpoint.has_model(model) else 1)
+        latency = endpoint.ewma_latency or 0.0
+        if self.policy == "ewma":
+            return (latency * (busy + 1), busy)
+        return (busy, latency)
+
+    def select(self, model: str, exclude=(), refused=()) -> Optional[OllamaEndpoint]:
+        """
+        Best endpoint for ``model``, avoiding ``exclude`` when possible.
+
+        ``refused`` endpoints are never returned; None once all of them are.
+        """
+        self._maybe_probe()
+        pool = [e for e in self.endpoints if e not in refused]
+        if not pool:
+            return None
+        candidates = [e for e in pool if e.available and e not in exclude]
+        if not candidates:
+            # Nothing known-good left: let the breakers decide
+            candidates = [e for e in pool if e not in exclude]
+        return min(candidates or pool, key=lambda e: self._cost(e, model))
+
+    def _maybe_probe(self):
+        if len(self.endpoints) < 2:
+            return
+        with self._lock:
+            if self._probing or time.time() - self._last_probe < self.probe_interval:
+                return
+            self._probing = True
+        threading.Thread(target=self.probe_all, daemon=True).start()
+
+    def probe_all(self):
+        try:
+            for endpoint in self.endpoints:
+                endpoint.probe()
+        finally:
+            with self._lock:
+                self._last_probe = time.time()
+                self._probing = False
+
+
+class OllamaClient:
+    """Balanced, budgeted and hedged requests to the Ollama HTTP API."""
+
+    def __init__(self, llm_config: Optional[agent_config.LLMConfig] = None):
+        self.config = llm_config or agent_config.config.llm
+        self.retry_budget = RetryBudget(
+            "ollama",
+            ratio=self.config.retry_budget_ratio,
+            max_tokens=self.config.retry_budget_max,
+        )
+        self.latency = LatencyTracker()
+        self.residency = ModelResidency(
+            self.config.keep_alive_min, self.config.keep_alive_max
+        )
+        self._warming = False
+        self.role_stats = {}
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self._lock = threading.Lock()
+
+        # Endpoints share the API paths of OLLAMA_URL / OLLAMA_CHAT_URL
+        self.generate_path = urlparse(self.config.url).path
+        self.chat_path = urlparse(self.config.chat_url).path
+        bases = self.config.endpoints or [_base_url(self.config.url)]
+        self.pool = EndpointPool(
+            [OllamaEndpoint(bases[0], CircuitBreakers.ollama)]
+            + [OllamaEndpoint(base, self._breaker_for(base)) for base in bases[1:]],
+            policy=self.config.lb_policy,
+            probe_interval=self.config.probe_interval,
+        )
+        self.secondary = (
+            OllamaEndpoint(
+                self.config.secondary_url, self._breaker_for(self.config.secondary_url)
+            )
+            if self.config.secondary_url
+            else None
+        )
+        self._hedge_pool = (
+            concurrent.futures.ThreadPoolExecutor(
+                max_workers=8, thread_name_prefix="ollama-hedge"
+            )
+            if self.secondary is not None
+            else None
+        )
+
+    @staticmethod
+    def _breaker_for(base_url: str) -> CircuitBreaker:
+        breaker = ollama_circuit_breaker(f"ollama@{urlparse(base_url).netloc}")
+        breaker.shared_state = CircuitBreakers.ollama.shared_state
+        return breaker
+
+    def _post(
+        self, endpoint: OllamaEndpoint, path: str, payload: dict, primary: bool = True
+    ) -> dict:
+        endpoint.begin()
+        started = time.monotonic()
+        duration = None
+        try:
+            res = requests.post(
+                endpoint.base_url + path, json=payload, timeout=self.config.timeout
+            )
+            if res.status_code != 200:
+                raise requests.exceptions.HTTPError(
+                    f"Ollama HTTP {res.status_code} from {endpoint.base_url}",
+                    response=res,
+                )
+            body = res.json()
+            duration = time.monotonic() - started
+        finally:
+            endpoint.end(payload["model"], duration)
+        if primary:
+            self.latency.observe(duration)
+            self.residency.observe(body, duration)
+        return body
+
+    def _attempt(
+        self, endpoint: OllamaEndpoint, path: str, payload: dict, primary: bool = True
+    ) -> dict:
+        """One request through the endpoint's breaker and bulkhead"""
+        return endpoint.breaker.execute(self._post, endpoint, path, payload, primary)
+
+    def hedge_delay(self) -> float:
+        """Primary p95 once enough samples exist, else the configured delay"""
+        if len(self.latency) < self.config.hedge_min_samples:
+            return self.config.hedge_delay
+        return self.latency.percentile(0.95)
+
+    def _send(self, endpoint: OllamaEndpoint, path: str, payload: dict) -> dict:
+        if self._hedge_pool is None:
+            return self._attempt(endpoint, path, payload)
+
+        primary = self._hedge_pool.submit(self._attempt, endpoint, path, payload)
+        try:
+            return primary.result(timeout=self.hedge_delay())
+        except concurrent.futures.TimeoutError:
+            pass
+
+        with self._lock:
+            self.hedges_sent += 1
+        hedge = self._hedge_pool.submit(
+            self._attempt, self.secondary, path, payload, False
+        )
+        error = None
+        for future in concurrent.futures.as_completed([primary, hedge]):
+            try:
+                result = future.result()
+            except Exception as e:
+                error = e
+                continue
+            if future is hedge:
+                with self._lock:
+                    self.hedges_won += 1
+            # The slower request is left to finish; its answer is dropped
+            return result
+        raise error
+
+    def _stats_for(self, role: Optional[str]) -> RoleStats:
+        with self._lock:
+            return self.role_stats.setdefault(role or "default", RoleStats())
+
+    def _call(
+        self,
+        path: str,
+        payload: dict,
+        parse,
+        max_retries: int,
+        base_wait: float,
+        role: Optional[str] = None,
+    ):
+        """
+        Run one request under the retry budget, retrying on other endpoints.
+
+        An endpoint whose breaker or bulkhead refuses the call is skipped
+        without spending a retry. The refusal is raised once every endpoint
+        has refused.
+        """
+        tried, refused = set(), set()
+        refusal = None
+        attempt = 0
+        while attempt < max_retries:
+            endpoint = self.pool.select(
+                payload["model"], exclude=tried, refused=refused
+            )
+            if endpoint is None:
+                if refusal is None:
+                    return None
+                raise refusal
+            tried.add(endpoint)
+            try:
+                started = time.monotonic()
+                body = self._send(endpoint, path, payload)
+                result = parse(body)
+                self.retry_budget.record_success()
+                self._stats_for(role).observe(body, time.monotonic() - started)
+                return result
+            except (CircuitBreakerOpenError, BulkheadFullError) as e:
+                # Nothing was sent: move on to the next endpoint right away
+                logger.warning(f"[!] {endpoint.base_url} refused the call: {e}")
+                refusal = e
+                refused.add(endpoint)
+                continue
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.error(
+                    f"[!] Ollama error: {e}. Attempt {attempt + 1}/{max_retries}."
+                )
+            attempt += 1
+            if attempt < max_retries:
+                if not self.retry_budget.try_spend():
+                    logger.warning("[!] Ollama retry budget exhausted; not retrying.")
+                    break
+                time.sleep(base_wait * (2 ** (attempt - 1)) + random.uniform(0, 1))
+        return None
+
+    def _routed(
+        self,
+        role: Optional[str],
+        path: str,
+        payload: dict,
+        parse,
+        quality_check,
+        max_retries: int,
+        base_wait: float,
+    ):
+        """Call the role's model; regenerate with the fallback model if it falls short"""
+        model = self.config.model_for(role)
+        try:
+            result = self._call(
+                path, {**payload, "model": model}, parse, max_retries, base_wait, role
+            )
+            fallback = self.config.model_for("fallback")
+            # No answer means Ollama itself is failing: a second model would only
+            # add load and spend attempts outside the retry budget
+            if result is None or fallback == model or quality_check(result):
+                return result
+
+            logger.warning(
+                f"[!] {role or 'default'} answer from {model} failed its quality check. "
+                f"Regenerating with {fallback}."
+            )
+            self._stats_for(role).record_fallback()
+            return self._call(
+                path,
+                {**payload, "model": fallback},
+                parse,
+                max_retries,
+                base_wait,
+                "fallback",
+            )
+        except CircuitBreakerOpenError as e:
+            # The same endpoints would refuse a fallback-model request too
+            logger.error(f"[!] {e}. Skipping Ollama call.")
+        except BulkheadFullError:
+            logger.error(
+                "[!] Ollama saturated: no inference slot within the queue wait."
+            )
+        return None
+
+    def generate(
+        self,
+        prompt: str,
+        max_retries: int = 3,
+        base_wait: float = 2.0,
+        role: Optional[str] = None,
+    ) -> str:
+        """Free-text completion (/api/generate)"""
+        payload = {
+            "prompt": prompt,
+            "stream": False,
+            "keep_alive": f"{self.residency.keep_alive()}s",
+        }
+        response = self._routed(
+            role,
+            self.generate_path,
+            payload,
+            lambda body: body.get("response", ""),
+            self._text_ok,
+            max_retries,
+            base_wait,
+        )
+        return "Error: Maximum retries exceeded." if response is None else response
+
+    def _text_ok(self, response: Optional[str]) -> bool:
+        return (
+            response is not None
+            and len(response.strip()) >= self.config.specialist_min_chars
+        )
+
+    def chat_structured(
+        self,
+        prompt: str,
+        schema: dict,
+        max_retries: int = 3,
+        base_wait: float = 1.0,
+        role: Optional[str] = None,
+        quality_check: Optional[Callable[[Optional[dict]], bool]] = None,
+    ) -> Optional[dict]:
+        """Chat completion constrained to a JSON schema (/api/chat)"""
+        payload = {
+            "stream": False,
+            "format": schema,
+            "messages": [{"role": "user", "content": prompt}],
+            "keep_alive": f"{self.residency.keep_alive()}s",
+        }
+        return self._routed(
+            role,
+            self.chat_path,
+            payload,
+            lambda body: json.loads(body.get("message", {}).get("content", "{}")),
+            quality_check or (lambda result: isinstance(result, dict)),
+            max_retries,
+            base_wait,
+        )
+
+    def warm(self, models: Optional[list] = None):
+        """Load ``models`` on every endpoint (an empty prompt only loads)"""
+        keep_alive = f"{self.residency.keep_alive()}s"
+        # The fallback model loads on demand rather than evicting these
+        models = models or sorted(
+            {self.config.model_for(r) for r in (None, "specialist", "director")}
+        )
+        for model in models:
+            payload = {"model": model, "prompt": "", "keep_alive": keep_alive}
+            for endpoint in self.pool.endpoints:
+                started = time.monotonic()
+                try:
+                    self._attempt(endpoint, self.generate_path, payload, False)
+                except Exception as e:
+                    logger.warning(
+                        f"[!] Warm-up of {model} on {endpoint.base_url} failed: {e}"
+                    )
+                    continue
+                logger.info(
+                    f"[+] {model} resident on {endpoint.base_url} "
+                    f"({time.monotonic() - started:.1f}s, keep_alive {keep_alive})"
+                )
+        self.residency.mark_loaded()
+
+    def prewarm(self) -> bool:
+        """Warm in the background unless the model should still be resident"""
+        with self._lock:
+            if self._warming or self.residency.is_resident():
+                return False
+            self._warming = True
+            self.residency.prewarms += 1
+
+        def run():
+            try:
+                self.warm()
+            finally:
+                with self._lock:
+                    self._warming = False
+
+        threading.Thread(target=run, daemon=True, name="ollama-prewarm").start()
+        return True
+
+    def get_stats(self) -> dict:
+        p95 = self.latency.percentile(0.95)
+        with self._lock:
+            return {
+                "retry_budget": self.retry_budget.get_state(),
+                "p95_seconds": round(p95, 3) if p95 is not None else None,
+                "hedging": {
+                    "enabled": self._hedge_pool is not None,
+                    "delay_seconds": round(self.hedge_delay(), 3),
+                    "sent": self.hedges_sent,
+                    "won": self.hedges_won,
+                },
+                "endpoints": [e.get_state() for e in self.pool.endpoints],
+                "residency": self.residency.get_state(),
+                "roles": {
+                    role: stats.get_state() for role, stats in self.role_stats.items()
+                },
+            }
@@ -0,0 +1,269 @@
+"""
+Background persistence of post-mortems and runbooks.
+
+Every alert used to end with synchronous writes: the post-mortem file, the
+runbook and an embedding of the post-mortem. The embedding runs model
+inference and, for FAISS, rewrites the whole index on disk. That time was
+added to every alert and held a worker thread. PersistencePipeline takes
+those jobs off the alert path.
+
+- Durable: each accepted job is journaled and fsynced to a spool
+  directory, deleted once handled and replayed by recover() after a
+  restart. A rejected job's journal entry is removed again.
+- Bounded: at most ``max_pending`` jobs are queued or in flight. submit()
+  blocks up to its timeout when the pipeline is full, then returns False so
+  the caller can persist inline. Producers therefore slow down to the
+  writer's pace instead of growing the queue without limit.
+- Batched: jobs arriving within ``window`` are handed to one handler call,
+  so the vector index is persisted once per batch.
+- Retried: a failed job is retried with exponential backoff. After
+  ``max_attempts`` failures its journal entry moves to ``spool/dead`` for
+  inspection.
+
+The handler must be idempotent, since a job may be retried or replayed
+after it was partly applied.
+"""
+
+import os
+import json
+import time
+import uuid
+import threading
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from loguru import logger
+
+
+@dataclass
+class PersistJob:
+    """One queued persistence job and its retry state"""
+
+    job_id: str
+    payload: dict
+    attempts: int = 0
+    ready_at: float = 0.0
+
+
+class PersistencePipeline:
+    """
+    Durable, bounded, batching queue in front of a persistence handler.
+
+    ``handle_batch`` receives the payloads of a batch in submission order and
+    returns one bool per payload; an exception fails the whole batch.
+    """
+
+    def __init__(
+        self,
+        handle_batch: Callable[[List[dict]], List[bool]],
+        spool_dir: str = "",
+        max_pending: int = 500,
+        max_batch: int = 32,
+        window: float = 0.5,
+        max_attempts: int = 5,
+        backoff: float = 2.0,
+    ):
+        self.handle_batch = handle_batch
+        self.spool_dir = spool_dir
+        self.max_pending = max_pending
+        self.max_batch = max_batch
+        self.window = window
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self._jobs: List[PersistJob] = []
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.submitted = 0
+        self.rejected = 0
+        self.recovered = 0
+        self.completed = 0
+        self.retries = 0
+        self.dead_lettered = 0
+        self.batches = 0
+        self.last_batch_ms = None
+
+    # -- journal --------------------------------------------------------
+    def _spool_path(self, job_id: str, dead: bool = False) -> str:
+        base = os.path.join(self.spool_dir, "dead") if dead else self.spool_dir
+        return os.path.join(base, f"{job_id}.json")
+
+    def _journal(self, job: PersistJob):
+        if not self.spool_dir:
+            return
+        try:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            path = self._spool_path(job.job_id)
+            with open(path + ".tmp", "w") as f:
+                json.dump(job.payload, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+            # The rename is only durable once the directory entry is synced
+            fd = os.open(self.spool_dir, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except (OSError, TypeError, ValueError) as e:
+            # Still handled, just not replayable after a crash
+            logger.warning(f"[Persist] Cannot journal job {job.job_id}: {e}")
+
+    def _settle(self, job: PersistJob, dead: bool = False):
+        if not self.spool_dir:
+            return
+        path = self._spool_path(job.job_id)
+        try:
+            if dead:
+                os.makedirs(os.path.join(self.spool_dir, "dead"), exist_ok=True)
+                os.replace(path, self._spool_path(job.job_id, dead=True))
+            else:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"[Persist] Cannot settle job {job.job_id}: {e}")
+
+    def recover(self) -> int:
+        """Queue the journaled jobs left over from a previous run."""
+        if not self.spool_dir or not os.path.isdir(self.spool_dir):
+            return 0
+        with self._cond:
+            known = {job.job_id for job in self._jobs}
+        jobs = []
+        for name in sorted(os.listdir(self.spool_dir)):
+            job_id = name[:-5]
+            if not name.endswith(".json") or job_id in known:
+                continue
+            try:
+                with open(os.path.join(self.spool_dir, name)) as f:
+                    jobs.append(PersistJob(job_id, json.load(f)))
+            except (OSError, ValueError) as e:
+                logger.warning(f"[Persist] Skipping unreadable journal {name}: {e}")
+        if jobs:
+            with self._cond:
+                # Replayed jobs may exceed max_pending: they were already accepted
+                self._jobs[:0] = jobs
+                self.recovered += len(jobs)
+                self._start()
+                self._cond.notify_all()
+            logger.info(f"[Persist] Recovered {len(jobs)} journaled jobs")
+        return len(jobs)
+
+    # -- queue ----------------------------------------------------------
+    def _pending(self) -> int:
+        return len(self._jobs) + self._in_flight
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="persistence-pipeline", daemon=True
+            )
+            self._thread.start()
+
+    def submit(self, payload: dict, timeout: float = 5.0) -> bool:
+        """Queue ``payload``; False if the pipeline stayed full for ``timeout``."""
+        # Sortable ids keep the replay order after a restart
+        job = PersistJob(f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}", payload)
+        # Journal before taking the lock: the fsyncs must not stall other
+        # producers or the writer thread
+        self._journal(job)
+        with self._cond:
+            accepted = self._cond.wait_for(
+                lambda: self._pending() < self.max_pending, timeout=timeout
+            )
+            if accepted:
+                self._jobs.append(job)
+                self.submitted += 1
+                self._start()
+                self._cond.notify_all()
+            else:
+                self.rejected += 1
+        if not accepted:
+            # The caller persists inline; a replay would repeat it
+            self._settle(job)
+        return accepted
+
+    def _ready(self, now: float) -> List[PersistJob]:
+        return [job for job in self._jobs if job.ready_at <= now]
+
+    def _next_batch(self) -> List[PersistJob]:
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self._ready(now):
+                    break
+                waits = [job.ready_at - now for job in self._jobs]
+                self._cond.wait(timeout=min(waits) if waits else None)
+            # Give concurrent alerts the window to join this batch
+            self._cond.wait_for(
+                lambda: len(self._ready(time.monotonic())) >= self.max_batch,
+                timeout=self.window,
+            )
+            batch = self._ready(time.monotonic())[: self.max_batch]
+            taken = {id(job) for job in batch}
+            self._jobs = [job for job in self._jobs if id(job) not in taken]
+            self._in_flight += len(batch)
+            return batch
+
+    def _run(self):
+        while True:
+            self.flush(self._next_batch())
+
+    def flush(self, batch: List[PersistJob]):
+        """Handle ``batch``, then settle, retry or dead-letter each job."""
+        start = time.monotonic()
+        try:
+            results = self.handle_batch([job.payload for job in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"{len(results)} results for {len(batch)} jobs")
+        except Exception as e:
+            logger.exception(f"[Persist] Batch of {len(batch)} failed: {e}")
+            results = [False] * len(batch)
+
+        retry = []
+        for job, ok in zip(batch, results):
+            if ok:
+                self._settle(job)
+                continue
+            job.attempts += 1
+            if job.attempts >= self.max_attempts:
+                logger.error(
+                    f"[Persist] Job {job.job_id} failed {job.attempts} times, "
+                    "moved to the dead-letter spool"
+                )
+                self._settle(job, dead=True)
+                continue
+            job.ready_at = time.monotonic() + self.backoff * 2 ** (job.attempts - 1)
+            retry.append(job)
+
+        with self._cond:
+            self.batches += 1
+            self.last_batch_ms = round((time.monotonic() - start) * 1000, 1)
+            self.completed += sum(1 for ok in results if ok)
+            self.retries += len(retry)
+            self.dead_lettered += sum(1 for ok in results if not ok) - len(retry)
+            self._in_flight -= len(batch)
+            self._jobs.extend(retry)
+            self._cond.notify_all()
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued job has been handled (or dead-lettered)."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending() == 0, timeout=timeout)
+
+    def get_stats(self) -> dict:
+        with self._cond:
+            return {
+                "pending": len(self._jobs),
+                "in_flight": self._in_flight,
+                "max_pending": self.max_pending,
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "recovered": self.recovered,
+                "completed": self.completed,
+                "retries": self.retries,
+                "dead_lettered": self.dead_lettered,
+                "batches": self.batches,
+                "last_batch_ms": self.last_batch_ms,
+            }
@@ -0,0 +1,255 @@
+"""
+Post-mortem archive: date-partitioned, compressed rollup of old reports.
+
+Every alert writes a new ``{timestamp}-{alert_name}.md`` into one flat
+post-mortems directory. After months that directory holds tens of thousands
+of small files. Listing and reading them slows down every startup and every
+training-data run, and each file adds to the git repository.
+
+PostMortemArchive keeps only the last ``retain_days`` of post-mortems as
+loose markdown files. rollup() moves older ones into one gzip-compressed
+JSONL segment per month under ``archive/``. It is idempotent: a month that
+is rolled up again is rewritten with the old and new records merged, so
+each month is always a single compacted segment. ``archive/index.json``
+lists each segment with its record count and timestamp range. Readers can
+therefore skip whole months without opening them.
+
+iter_post_mortems() is the reader API. It streams archived records month by
+month, then the loose files, oldest first. No caller holds the full history
+in memory.
+
+The archive does not touch git. ``on_rollup`` receives the paths a rollup
+changed, relative to ``root``, so the agent can commit them. The module uses
+only the standard library when loguru is missing, so
+scripts/generate_training_data.py can read the archive without the agent's
+dependencies.
+"""
+
+import os
+import re
+import gzip
+import json
+import time
+import datetime
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    from loguru import logger
+except ImportError:
+    import logging
+
+    logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = "archive"
+INDEX_FILE = "index.json"
+_NAME_RE = re.compile(r"^(\d{8}-\d{6})-(.+)\.md$")
+
+
+@dataclass(frozen=True)
+class PostMortem:
+    """One post-mortem, loose or archived"""
+
+    name: str
+    alert_name: str
+    timestamp: str
+    content: str
+
+
+def parse_name(name: str) -> Tuple[str, str]:
+    """(timestamp, alert_name) of a ``{YYYYmmdd-HHMMSS}-{alert}.md`` file name"""
+    match = _NAME_RE.match(name)
+    if match:
+        return match.group(1), match.group(2)
+    return "", name[:-3] if name.endswith(".md") else name
+
+
+def _month(timestamp: str) -> str:
+    return f"{timestamp[:4]}-{timestamp[4:6]}"
+
+
+class PostMortemArchive:
+    """Loose recent post-mortems plus monthly compressed segments"""
+
+    def __init__(
+        self,
+        root: str,
+        retain_days: int = 30,
+        on_rollup: Optional[Callable[[List[str]], None]] = None,
+    ):
+        self.root = root
+        self.archive_dir = os.path.join(root, ARCHIVE_DIR)
+        self.retain_days = retain_days
+        self.on_rollup = on_rollup
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.rollups = 0
+        self.archived = 0
+        self.last_rollup_ms = None
+
+    # -- index ----------------------------------------------------------
+    def segments(self) -> List[dict]:
+        """Index entries of the archive segments, oldest month first."""
+        try:
+            with open(os.path.join(self.archive_dir, INDEX_FILE)) as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            logger.warning(f"[Archive] Unreadable index, ignoring archive: {e}")
+            return []
+        return sorted(index.get("segments", []), key=lambda s: s["month"])
+
+    def _write_index(self, segments: List[dict]):
+        path = os.path.join(self.archive_dir, INDEX_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump({"version": 1, "segments": segments}, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    # -- readers --------------------------------------------------------
+    def _read_segment(self, segment: dict) -> Iterator[PostMortem]:
+        path = os.path.join(self.archive_dir, segment["file"])
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield PostMortem(**json.loads(line))
+
+    def _loose_names(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        # Names start with their timestamp: sorting them is chronological
+        return sorted(n for n in os.listdir(self.root) if n.endswith(".md"))
+
+    def iter_archived(self, since: str = "") -> Iterator[PostMortem]:
+        """Archived post-mortems with a timestamp >= ``since``, oldest first."""
+        for segment in self.segments():
+            if since and segment["last"] < since:
+                continue
+            for pm in self._read_segment(segment):
+                if pm.timestamp >= since:
+                    yield pm
+
+    def iter_loose(self, since: str = "") -> Iterator[PostMortem]:
+        """Post-mortems not yet rolled up, oldest first."""
+        for name in self._loose_names():
+            timestamp, alert_name = parse_name(name)
+            if since and timestamp < since:
+                continue
+            try:
+                with open(os.path.join(self.root, name), "r") as f:
+                    content = f.read()
+            except FileNotFoundError:
+                # Rolled up since the listing; it was in the archive already
+                continue
+            yield PostMortem(name, alert_name, timestamp, content)
+
+    def iter_post_mortems(self, since: str = "") -> Iterator[PostMortem]:
+        """Every post-mortem, archived and loose, oldest first."""
+        yield from self.iter_archived(since)
+        yield from self.iter_loose(since)
+
+    # -- rollup ---------------------------------------------------------
+    def rollup(self, now: Optional[datetime.datetime] = None) -> int:
+        """Move loose post-mortems older than ``retain_days`` into the archive."""
+        now = now or datetime.datetime.utcnow()
+        cutoff = (now - datetime.timedelta(days=self.retain_days)).strftime("%Y%m%d")
+        with self._lock:
+            moved = self._rollup(cutoff)
+        if moved and self.on_rollup is not None:
+            # The removed files plus the rewritten segments and index
+            self.on_rollup(moved + [ARCHIVE_DIR])
+        return len(moved)
+
+    def _rollup(self, cutoff: str) -> List[str]:
+        """Archive loose files dated before ``cutoff``; names of the moved files"""
+        start = time.monotonic()
+        by_month: Dict[str, List[str]] = {}
+        for name in self._loose_names():
+            timestamp, _ = parse_name(name)
+            # Unparseable names stay loose rather than being guessed into a month
+            if timestamp and timestamp[:8] < cutoff:
+                by_month.setdefault(_month(timestamp), []).append(name)
+        if not by_month:
+            return []
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        segments = {s["month"]: s for s in self.segments()}
+        moved = []
+        for month, names in sorted(by_month.items()):
+            segments[month] = self._merge_segment(month, names, segments.get(month))
+            # Segment and index first: a crash leaves duplicates, never a loss
+            self._write_index(list(segments.values()))
+            for name in names:
+                try:
+                    os.remove(os.path.join(self.root, name))
+                except FileNotFoundError:
+                    pass
+            moved += names
+
+        self.rollups += 1
+        self.archived += len(moved)
+        self.last_rollup_ms = round((time.monotonic() - start) * 1000, 1)
+        logger.info(
+            f"[Archive] Rolled {len(moved)} post-mortems into {len(by_month)} segments"
+        )
+        return moved
+
+    def _merge_segment(
+        self, month: str, names: List[str], existing: Optional[dict]
+    ) -> dict:
+        """Rewrite the month's segment with ``names`` merged in, deduplicated."""
+        records: Dict[str, PostMortem] = {}
+        if existing is not None:
+            for pm in self._read_segment(existing):
+                records[pm.name] = pm
+        for name in names:
+            timestamp, alert_name = parse_name(name)
+            with open(os.path.join(self.root, name), "r") as f:
+                records[name] = PostMortem(name, alert_name, timestamp, f.read())
+
+        ordered = [records[name] for name in sorted(records)]
+        file_name = f"{month}.jsonl.gz"
+        path = os.path.join(self.archive_dir, file_name)
+        with gzip.open(path + ".tmp", "wt", encoding="utf-8") as f:
+            for pm in ordered:
+                f.write(json.dumps(pm.__dict__) + "\n")
+        os.replace(path + ".tmp", path)
+        return {
+            "month": month,
+            "file": file_name,
+            "count": len(ordered),
+            "first": ordered[0].timestamp,
+            "last": ordered[-1].timestamp,
+            "bytes": os.path.getsize(path),
+        }
+
+    def start(self, interval: float):
+        """Roll up in a daemon thread every ``interval`` seconds."""
+        if self._thread is not None or interval <= 0:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.rollup()
+                except Exception as e:
+                    logger.error(f"[Archive] Rollup failed: {e}")
+
+        self._thread = threading.Thread(
+            target=run, name="post-mortem-archive", daemon=True
+        )
+        self._thread.start()
+
+    def get_stats(self) -> dict:
+        segments = self.segments()
+        return {
+            "loose": len(self._loose_names()),
+            "segments": len(segments),
+            "archived_records": sum(s["count"] for s in segments),
+            "archive_bytes": sum(s.get("bytes", 0) for s in segments),
+            "retain_days": self.retain_days,
+            "rollups": self.rollups,
+            "last_rollup_ms": self.last_rollup_ms,
+        }
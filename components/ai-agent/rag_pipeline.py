@@ -15,6 +15,9 @@ Usage:
   # Embed all existing post-mortems
   python3 rag_pipeline.py embed
 
+  # Bulk re-index a large archive (process pool, resumable)
+  python3 rag_pipeline.py reindex --source post-mortems --workers 8
+
   # Query for similar past incidents
   python3 rag_pipeline.py query "high memory usage paymentservice OOMKill"
 
@@ -26,9 +29,18 @@ import os
 import sys
 import glob
 import json
+import time
 import datetime
 import argparse
+import asyncio
 import hashlib
+import threading
+import collections
+import multiprocessing
+import concurrent.futures
+from typing import Optional
+
+from index_versioning import collection_embed_model, collection_name_for
 
 # Lazy imports — dependencies installed at container build time
 try:
@@ -64,6 +76,21 @@ CHROMA_HOST = os.getenv("CHROMA_HOST", "chromadb.observability.svc.cluster.local
 CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
 POST_MORTEMS_DIR = os.getenv("POST_MORTEMS_DIR", "post-mortems")
 EMBED_MODEL = os.getenv("EMBED_MODEL", "all-MiniLM-L6-v2")  # ~80MB, fast
+REINDEX_WORKERS = int(os.getenv("REINDEX_WORKERS", str(os.cpu_count() or 1)))
+REINDEX_BATCH_SIZE = int(os.getenv("REINDEX_BATCH_SIZE", "64"))
+DEDUP_LOOKUP_SIZE = 5000
+REINDEX_CHECKPOINT = os.getenv(
+    "REINDEX_CHECKPOINT",
+    os.path.join(
+        os.path.dirname(__file__), "..", "..", "data", "rag-reindex.checkpoint.json"
+    ),
+)
+MINIO_TRANSFER_CONCURRENCY = int(os.getenv("MINIO_TRANSFER_CONCURRENCY", "8"))
+RAG_SERVER_PORT = int(os.getenv("RAG_SERVER_PORT", "8001"))
+RAG_BATCH_WINDOW_MS = float(os.getenv("RAG_BATCH_WINDOW_MS", "5"))
+RAG_BATCH_MAX_SIZE = int(os.getenv("RAG_BATCH_MAX_SIZE", "32"))
+RAG_CACHE_SIZE = int(os.getenv("RAG_CACHE_SIZE", "1024"))
+RAG_CACHE_TTL = float(os.getenv("RAG_CACHE_TTL", "300"))
 
 # Validate required credentials
 if not MINIO_ACCESS_KEY:
@@ -96,16 +123,64 @@ class PostMortemStore:
             self.s3.create_bucket(Bucket=MINIO_BUCKET)
             print(f"[+] Created MinIO bucket: {MINIO_BUCKET}", flush=True)
 
+    @staticmethod
+    def object_key(filename: str) -> str:
+        """
+        Partition by year/month for easy lifecycle management. The date comes
+        from the YYYYMMDD-HHMMSS filename prefix so re-uploads map to the same
+        key; files without one fall back to the current month.
+        """
+        try:
+            when = datetime.datetime.strptime(filename[:8], "%Y%m%d")
+        except ValueError:
+            when = datetime.datetime.utcnow()
+        return f"{when.year}/{when.month:02d}/{filename}"
+
+    @staticmethod
+    def is_unchanged(local_path: str, obj: dict) -> bool:
+        """Compare a local file with a listed object by size, then ETag."""
+        if not os.path.exists(local_path) or os.path.getsize(local_path) != obj["size"]:
+            return False
+        etag = obj.get("etag", "")
+        if not etag or "-" in etag:
+            # Multipart ETags are not a content MD5; size match is the best signal
+            return True
+        # S3 ETags are content MD5s: a checksum, not a security control
+        md5 = hashlib.md5(usedforsecurity=False)
+        with open(local_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                md5.update(chunk)
+        return md5.hexdigest() == etag
+
+    def _transfer(self, fn, items, concurrency: int) -> list:
+        """Run fn over items on a bounded thread pool (boto3 clients are thread-safe)."""
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(fn, items))
+
     def upload(self, local_path: str) -> str:
         """Upload a post-mortem markdown file to MinIO, return the S3 key."""
-        filename = os.path.basename(local_path)
-        # Partition by year/month for easy lifecycle management
-        now = datetime.datetime.utcnow()
-        key = f"{now.year}/{now.month:02d}/{filename}"
+        key = self.object_key(os.path.basename(local_path))
         self.s3.upload_file(local_path, MINIO_BUCKET, key)
         print(f"[+] Uploaded post-mortem → s3://{MINIO_BUCKET}/{key}", flush=True)
         return key
 
+    def upload_all(
+        self, local_paths: list[str], concurrency: int = MINIO_TRANSFER_CONCURRENCY
+    ) -> list[str]:
+        """Upload local post-mortems concurrently, skipping unchanged objects."""
+        remote = {obj["key"]: obj for obj in self.list_all()}
+        changed = []
+        for path in local_paths:
+            obj = remote.get(self.object_key(os.path.basename(path)))
+            if obj is None or not self.is_unchanged(path, obj):
+                changed.append(path)
+        print(
+            f"[*] Uploading {len(changed)} post-mortems "
+            f"({len(local_paths) - len(changed)} unchanged)...",
+            flush=True,
+        )
+        return self._transfer(self.upload, changed, concurrency)
+
     def list_all(self) -> list[dict]:
         """List all post-mortems in the bucket."""
         paginator = self.s3.get_paginator("list_objects_v2")
@@ -116,20 +191,96 @@ class PostMortemStore:
                     {
                         "key": obj["Key"],
                         "size": obj["Size"],
+                        "etag": obj.get("ETag", "").strip('"'),
                         "last_modified": str(obj["LastModified"]),
                     }
                 )
         return results
 
-    def download_all(self, dest_dir: str) -> list[str]:
+    def download_all(
+        self, dest_dir: str, concurrency: int = MINIO_TRANSFER_CONCURRENCY
+    ) -> list[str]:
         """Download all post-mortems to a local directory for embedding."""
         os.makedirs(dest_dir, exist_ok=True)
-        paths = []
-        for obj in self.list_all():
+
+        def _download(obj: dict) -> str:
             local_path = os.path.join(dest_dir, os.path.basename(obj["key"]))
-            self.s3.download_file(MINIO_BUCKET, obj["key"], local_path)
-            paths.append(local_path)
-        return paths
+            if not self.is_unchanged(local_path, obj):
+                self.s3.download_file(MINIO_BUCKET, obj["key"], local_path)
+            return local_path
+
+        return self._transfer(_download, self.list_all(), concurrency)
+
+    def stream_all(self, concurrency: int = MINIO_TRANSFER_CONCURRENCY):
+        """
+        Yield (key, content) for every post-mortem straight from S3, without
+        touching local disk. At most ``concurrency`` objects are in flight.
+        """
+
+        def _read(obj: dict) -> str:
+            body = self.s3.get_object(Bucket=MINIO_BUCKET, Key=obj["key"])["Body"]
+            return body.read().decode("utf-8")
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+            pending = collections.deque()
+            for obj in self.list_all():
+                pending.append((obj["key"], pool.submit(_read, obj)))
+                if len(pending) >= concurrency:
+                    key, future = pending.popleft()
+                    yield key, future.result()
+            while pending:
+                key, future = pending.popleft()
+                yield key, future.result()
+
+
+# ---------------------------------------------------------------------------
+# Bulk re-index: embedding worker processes
+# ---------------------------------------------------------------------------
+_worker_model = None
+
+
+def _init_embed_worker(model_name: str, threads: int):
+    """Load the embedding model once per worker process."""
+    global _worker_model
+    try:
+        import torch
+
+        # Each worker gets a slice of the cores instead of all of them
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    from sentence_transformers import SentenceTransformer
+
+    _worker_model = SentenceTransformer(model_name)
+
+
+def _embed_batch(texts: list[str]) -> list[list[float]]:
+    return _worker_model.encode(texts, batch_size=len(texts)).tolist()
+
+
+def _bounded_ordered_map(executor, fn, iterable, max_in_flight: int):
+    """Like executor.map, but streams input with at most max_in_flight pending."""
+    pending = collections.deque()
+    for item in iterable:
+        pending.append((item, executor.submit(fn, item[1])))
+        if len(pending) >= max_in_flight:
+            batch, future = pending.popleft()
+            yield batch, future.result()
+    while pending:
+        batch, future = pending.popleft()
+        yield batch, future.result()
+
+
+def post_mortem_metadata(path: str) -> dict:
+    """Metadata for a post-mortem file named YYYYMMDD-HHMMSS-AlertName.md."""
+    filename = os.path.basename(path)
+    parts = filename.replace(".md", "").split("-", 2)
+    alert_name = parts[2] if len(parts) >= 3 else filename
+    return {
+        "filename": filename,
+        "alert_name": alert_name,
+        "embedded_at": datetime.datetime.utcnow().isoformat(),
+    }
 
 
 # ---------------------------------------------------------------------------
@@ -142,7 +293,8 @@ class PostMortemVectorStore:
     past incidents and their resolutions, reducing hallucination in RCA.
     """
 
-    COLLECTION = "post-mortems"
+    # One collection per embedding model (the default model keeps "post-mortems")
+    COLLECTION = collection_name_for(EMBED_MODEL)
 
     def __init__(self):
         if not CHROMA_AVAILABLE:
@@ -160,43 +312,39 @@ class PostMortemVectorStore:
                 "hnsw:M": 32,  # More connections for better recall
                 "hnsw:search_ef": 100,  # Higher accuracy during query
                 "hnsw:num_threads": 4,  # Parallel indexing
+                "embed_model": EMBED_MODEL,
             },
         )
         print(
             f"[+] ChromaDB collection '{self.COLLECTION}' ready ({self.collection.count()} docs).",
             flush=True,
         )
+        if not self.collection.count():
+            print(
+                f"[*] No embeddings for {EMBED_MODEL} yet. Run 'reindex' to build "
+                "them; the agent serves any previous model's collection meanwhile.",
+                flush=True,
+            )
 
     def embed_file(self, path: str) -> bool:
         """Embed a single post-mortem markdown file. Skip if already embedded."""
         with open(path, "r") as f:
             content = f.read()
+        return self.embed_content(content, path)
 
+    def embed_content(self, content: str, source: str) -> bool:
+        """Embed post-mortem text; ``source`` is a path or S3 key for metadata."""
         doc_id = hashlib.sha256(content.encode()).hexdigest()[:16]
 
         # Skip duplicates
         existing = self.collection.get(ids=[doc_id])
         if existing["ids"]:
-            print(f"  [=] Already embedded: {os.path.basename(path)}", flush=True)
+            print(f"  [=] Already embedded: {os.path.basename(source)}", flush=True)
             return False
 
-        filename = os.path.basename(path)
-        # Extract alert name from filename convention: YYYYMMDD-HHMMSS-AlertName.md
-        parts = filename.replace(".md", "").split("-", 2)
-        alert_name = parts[2] if len(parts) >= 3 else filename
-
-        self.collection.add(
-            ids=[doc_id],
-            documents=[content],
-            metadatas=[
-                {
-                    "filename": filename,
-                    "alert_name": alert_name,
-                    "embedded_at": datetime.datetime.utcnow().isoformat(),
-                }
-            ],
-        )
-        print(f"  [+] Embedded: {filename}", flush=True)
+        metadata = post_mortem_metadata(source)
+        self.collection.add(ids=[doc_id], documents=[content], metadatas=[metadata])
+        print(f"  [+] Embedded: {metadata['filename']}", flush=True)
         return True
 
     def embed_directory(self, directory: str):
@@ -211,34 +359,202 @@ class PostMortemVectorStore:
             flush=True,
         )
 
-    def query(self, incident_description: str, n_results: int = 3) -> list[dict]:
+    def bulk_reindex(
+        self,
+        directory: str,
+        workers: int = REINDEX_WORKERS,
+        batch_size: int = REINDEX_BATCH_SIZE,
+        checkpoint_path: str = REINDEX_CHECKPOINT,
+    ) -> int:
+        """
+        Re-embed a whole archive: files are streamed in sorted order, batches
+        are embedded by a pool of worker processes, deduplicated with one bulk
+        get per DEDUP_LOOKUP_SIZE files and written with one collection.upsert
+        per batch. Each file is read once. Progress is checkpointed after every
+        batch so an interrupted run resumes.
+        """
+        files = sorted(glob.glob(os.path.join(directory, "*.md")))
+        done = self._load_checkpoint(checkpoint_path, directory)
+        if done:
+            print(f"[*] Resuming after {done}/{len(files)} files.", flush=True)
+
+        # Ids are content hashes: they only mark a file as embedded when this
+        # model built the collection, so dedup is keyed on (model, content)
+        built_by = collection_embed_model(
+            self.collection.name, self.collection.metadata
+        )
+        if built_by != EMBED_MODEL:
+            print(
+                f"[!] Collection '{self.collection.name}' was built by {built_by}; "
+                f"re-embedding every file with {EMBED_MODEL}.",
+                flush=True,
+            )
+        print(
+            f"[*] Re-indexing {len(files) - done} of {len(files)} post-mortems "
+            f"with {workers} worker(s)...",
+            flush=True,
+        )
+        skipped = 0
+
+        def batches():
+            nonlocal skipped
+            batch, seen = [], set()
+            for start in range(done, len(files), DEDUP_LOOKUP_SIZE):
+                chunk = []
+                for path in files[start : start + DEDUP_LOOKUP_SIZE]:
+                    with open(path, "r") as f:
+                        content = f.read()
+                    doc_id = hashlib.sha256(content.encode()).hexdigest()[:16]
+                    chunk.append((path, doc_id, content))
+                # Bulk dedup: one id lookup per chunk instead of one round trip
+                # per file (sliced to stay under SQLite variable limits)
+                if built_by == EMBED_MODEL:
+                    ids = [doc_id for _, doc_id, _ in chunk]
+                    seen.update(self.collection.get(ids=ids, include=[])["ids"])
+                for position, item in enumerate(chunk, start=start + 1):
+                    if item[1] in seen:
+                        skipped += 1
+                    else:
+                        seen.add(item[1])
+                        batch.append(item)
+                    if len(batch) >= batch_size or (position == len(files) and batch):
+                        yield position, [content for _, _, content in batch], batch
+                        batch = []
+
+        added, started = 0, time.monotonic()
+        for (position, _, batch), embeddings in self._embed_batches(batches(), workers):
+            # Upsert: ids embedded by another model are overwritten, not kept
+            self.collection.upsert(
+                ids=[doc_id for _, doc_id, _ in batch],
+                documents=[content for _, _, content in batch],
+                metadatas=[post_mortem_metadata(path) for path, _, _ in batch],
+                embeddings=embeddings,
+            )
+            added += len(batch)
+            self._save_checkpoint(checkpoint_path, directory, position)
+            elapsed = time.monotonic() - started
+            print(
+                f"  [+] {position}/{len(files)} files, {added} embedded "
+                f"({added / elapsed if elapsed else 0:.1f} docs/s)",
+                flush=True,
+            )
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        elapsed = time.monotonic() - started
+        print(
+            f"[+] Re-index done. {added} new embeddings in {elapsed:.1f}s "
+            f"({skipped} already embedded). Total: {self.collection.count()}",
+            flush=True,
+        )
+        return added
+
+    def _embed_batches(self, batches, workers: int):
+        """Yield ((position, texts, batch), embeddings) in input order."""
+        if workers <= 1:
+            for item in batches:
+                yield item, [list(e) for e in self.ef(item[1])]
+            return
+
+        threads = max((os.cpu_count() or 1) // workers, 1)
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers,
+            # spawn: forked torch/tokenizer state can deadlock in children
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_embed_worker,
+            initargs=(EMBED_MODEL, threads),
+        ) as executor:
+            yield from _bounded_ordered_map(
+                executor, _embed_batch, batches, workers * 2
+            )
+
+    @staticmethod
+    def _load_checkpoint(path: str, directory: str) -> int:
+        """Number of files already processed by a previous run, or 0."""
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, "r") as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return 0
+        if (
+            state.get("directory") != os.path.abspath(directory)
+            or state.get("embed_model") != EMBED_MODEL
+        ):
+            print("[!] Checkpoint belongs to another run; starting over.", flush=True)
+            return 0
+        return int(state.get("processed", 0))
+
+    @staticmethod
+    def _save_checkpoint(path: str, directory: str, processed: int):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "directory": os.path.abspath(directory),
+                    "embed_model": EMBED_MODEL,
+                    "processed": processed,
+                    "updated_at": datetime.datetime.utcnow().isoformat(),
+                },
+                f,
+            )
+        os.replace(tmp_path, path)
+
+    def query(
+        self, incident_description: str, n_results: int = 3, where: dict = None
+    ) -> list[dict]:
         """
         Semantic search for past incidents similar to the given description.
         Returns the top-N most relevant post-mortems and their metadata.
         """
+        return self.query_batch([incident_description], n_results, where)[0]
+
+    def query_batch(
+        self,
+        queries: list[str],
+        n_results: int = 3,
+        where: dict = None,
+        embeddings: list = None,
+    ) -> list[list[dict]]:
+        """One vector search for many queries (pass embeddings to skip the model)."""
+        search = (
+            {"query_embeddings": embeddings}
+            if embeddings is not None
+            else {"query_texts": queries}
+        )
+        if where:
+            search["where"] = where
         results = self.collection.query(
-            query_texts=[incident_description],
             n_results=n_results,
             include=["documents", "metadatas", "distances"],
+            **search,
         )
-        hits = []
-        for i, doc in enumerate(results["documents"][0]):
-            hits.append(
-                {
-                    "rank": i + 1,
-                    "distance": results["distances"][0][i],
-                    "metadata": results["metadatas"][0][i],
-                    "excerpt": doc[:500] + "..." if len(doc) > 500 else doc,
-                }
-            )
-        return hits
+        batches = []
+        for q in range(len(queries)):
+            hits = []
+            for i, doc in enumerate(results["documents"][q]):
+                hits.append(
+                    {
+                        "rank": i + 1,
+                        "distance": results["distances"][q][i],
+                        "metadata": results["metadatas"][q][i],
+                        "excerpt": doc[:500] + "..." if len(doc) > 500 else doc,
+                    }
+                )
+            batches.append(hits)
+        return batches
 
     def format_context_for_llm(self, query: str, n_results: int = 3) -> str:
         """
         Returns a formatted string of past incidents for injection into the
         consensus LLM prompt, enabling context-aware, non-hallucinatory RCA.
         """
-        hits = self.query(query, n_results)
+        return self.format_hits(self.query(query, n_results))
+
+    @staticmethod
+    def format_hits(hits: list[dict]) -> str:
         if not hits:
             return "No similar past incidents found in the post-mortem database."
         ctx = "## Similar Past Incidents (from Post-Mortem Database)\n\n"
@@ -248,29 +564,339 @@ class PostMortemVectorStore:
         return ctx
 
 
+# ---------------------------------------------------------------------------
+# RAG Server: micro-batched async retrieval
+# ---------------------------------------------------------------------------
+class LatencyHistogram:
+    """Cumulative latency histogram (seconds) with Prometheus-style buckets."""
+
+    BUCKETS = (
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+        2.5,
+        5.0,
+        float("inf"),
+    )
+
+    def __init__(self):
+        self.counts = [0] * len(self.BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self.count += 1
+            self.sum += seconds
+            for i, bound in enumerate(self.BUCKETS):
+                if seconds <= bound:
+                    self.counts[i] += 1
+                    break
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(self.BUCKETS, self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return self.BUCKETS[-1]
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_ms": self.sum / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.quantile(0.5) * 1000,
+            "p95_ms": self.quantile(0.95) * 1000,
+            "p99_ms": self.quantile(0.99) * 1000,
+        }
+
+    def render(self, name: str, labels: str) -> list[str]:
+        """Prometheus text exposition lines for this histogram."""
+        lines, cumulative = [], 0
+        for bound, n in zip(self.BUCKETS, self.counts):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class QueryCache:
+    """
+    LRU cache of query results keyed on (query, n, filters). Entries expire
+    after ``ttl`` seconds so newly embedded post-mortems show up promptly.
+    Only touched from the event loop, so no locking is needed.
+    """
+
+    def __init__(self, max_size: int = RAG_CACHE_SIZE, ttl: float = RAG_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    @staticmethod
+    def key(query: str, n: int, where: dict = None) -> tuple:
+        return (query.strip(), n, json.dumps(where, sort_keys=True) if where else "")
+
+    def get(self, key: tuple):
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: tuple, value):
+        if self.max_size <= 0:
+            return
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class QueryBatcher:
+    """
+    Coalesces queries arriving within ``window_ms`` into one embedding
+    forward pass and one ChromaDB search per distinct filter. Batches run
+    one at a time in a worker thread; requests that arrive meanwhile form
+    the next batch, so batch size grows with load.
+    """
+
+    def __init__(
+        self,
+        vector_store: "PostMortemVectorStore",
+        window_ms: float = RAG_BATCH_WINDOW_MS,
+        max_size: int = RAG_BATCH_MAX_SIZE,
+    ):
+        self.vector_store = vector_store
+        self.window = window_ms / 1000
+        self.max_size = max(max_size, 1)
+        self.embed_latency = LatencyHistogram()
+        self.search_latency = LatencyHistogram()
+        self.batches = 0
+        self.batched_queries = 0
+        self._queue = None
+        self._task = None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, query: str, n: int, where: dict = None) -> list[dict]:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((query, n, where, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._dispatch(batch)
+
+    async def _dispatch(self, batch: list):
+        self.batches += 1
+        self.batched_queries += len(batch)
+        try:
+            results = await asyncio.to_thread(
+                self._search, [(q, n, where) for q, n, where, _ in batch]
+            )
+        except Exception as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (*_, future), hits in zip(batch, results):
+            if not future.done():
+                future.set_result(hits)
+
+    def _search(self, requests: list[tuple]) -> list[list[dict]]:
+        texts = list(dict.fromkeys(q for q, _, _ in requests))
+        started = time.perf_counter()
+        vectors = dict(zip(texts, self.vector_store.ef(texts)))
+        self.embed_latency.observe(time.perf_counter() - started)
+
+        # One search per distinct filter, at the largest n requested with it
+        groups = collections.defaultdict(list)
+        for i, (_, _, where) in enumerate(requests):
+            groups[QueryCache.key("", 0, where)].append(i)
+
+        results = [None] * len(requests)
+        started = time.perf_counter()
+        for indices in groups.values():
+            group_texts = list(dict.fromkeys(requests[i][0] for i in indices))
+            hits = self.vector_store.query_batch(
+                group_texts,
+                max(requests[i][1] for i in indices),
+                requests[indices[0]][2],
+                embeddings=[vectors[t] for t in group_texts],
+            )
+            by_text = dict(zip(group_texts, hits))
+            for i in indices:
+                results[i] = by_text[requests[i][0]][: requests[i][1]]
+        self.search_latency.observe(time.perf_counter() - started)
+        return results
+
+
+class RAGQueryService:
+    """Cache + batcher + per-endpoint latency histograms behind the RAG server."""
+
+    def __init__(
+        self,
+        vector_store: "PostMortemVectorStore",
+        cache: QueryCache = None,
+        batcher: QueryBatcher = None,
+    ):
+        self.vector_store = vector_store
+        self.cache = cache or QueryCache()
+        self.batcher = batcher or QueryBatcher(vector_store)
+        self.request_latency = collections.defaultdict(LatencyHistogram)
+
+    async def start(self):
+        await self.batcher.start()
+
+    async def stop(self):
+        await self.batcher.stop()
+
+    async def query(self, q: str, n: int = 3, where: dict = None) -> list[dict]:
+        key = QueryCache.key(q, n, where)
+        hits = self.cache.get(key)
+        if hits is None:
+            hits = await self.batcher.submit(q, n, where)
+            self.cache.put(key, hits)
+        return hits
+
+    async def timed(self, endpoint: str, coro):
+        started = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            self.request_latency[endpoint].observe(time.perf_counter() - started)
+
+    def stats(self) -> dict:
+        batcher = self.batcher
+        return {
+            "cache": {
+                "size": len(self.cache),
+                "hits": self.cache.hits,
+                "misses": self.cache.misses,
+            },
+            "batching": {
+                "batches": batcher.batches,
+                "queries": batcher.batched_queries,
+                "avg_batch_size": batcher.batched_queries / batcher.batches
+                if batcher.batches
+                else 0.0,
+            },
+            "latency": {
+                **{
+                    f"request_{endpoint}": h.to_dict()
+                    for endpoint, h in self.request_latency.items()
+                },
+                "embed": batcher.embed_latency.to_dict(),
+                "search": batcher.search_latency.to_dict(),
+            },
+        }
+
+    def render_metrics(self) -> str:
+        name = "rag_server_latency_seconds"
+        lines = [f"# TYPE {name} histogram"]
+        for endpoint, h in self.request_latency.items():
+            lines += h.render(name, f'stage="request",endpoint="{endpoint}"')
+        lines += self.batcher.embed_latency.render(name, 'stage="embed"')
+        lines += self.batcher.search_latency.render(name, 'stage="search"')
+        lines += [
+            "# TYPE rag_server_cache_requests_total counter",
+            f'rag_server_cache_requests_total{{result="hit"}} {self.cache.hits}',
+            f'rag_server_cache_requests_total{{result="miss"}} {self.cache.misses}',
+            "# TYPE rag_server_batches_total counter",
+            f"rag_server_batches_total {self.batcher.batches}",
+            "# TYPE rag_server_batched_queries_total counter",
+            f"rag_server_batched_queries_total {self.batcher.batched_queries}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
 # ---------------------------------------------------------------------------
 # RAG Pipeline: Full ETL (MinIO → Local → ChromaDB)
 # ---------------------------------------------------------------------------
-def run_embed_pipeline():
-    """Download all post-mortems from MinIO and embed into ChromaDB."""
+def run_embed_pipeline(stream: bool = False):
+    """Sync post-mortems with MinIO and embed into ChromaDB."""
     print("[*] Starting RAG Embed Pipeline...", flush=True)
     store = PostMortemStore()
     vector_store = PostMortemVectorStore()
 
-    # Download from MinIO
+    # Upload local post-mortems first so this run embeds them too
+    local_paths = glob.glob(os.path.join(POST_MORTEMS_DIR, "*.md"))
+    store.upload_all(local_paths)
+
+    if stream:
+        # S3 → embedding stage directly, no local copy
+        new_count = sum(
+            1
+            for key, content in store.stream_all()
+            if vector_store.embed_content(content, key)
+        )
+        print(
+            f"[+] Done. {new_count} new embeddings added. "
+            f"Total: {vector_store.collection.count()}",
+            flush=True,
+        )
+        return
+
+    # Download from MinIO (unchanged files are skipped)
     local_dir = "/tmp/rag-post-mortems"
     paths = store.download_all(local_dir)
-    print(f"[*] Downloaded {len(paths)} post-mortems from MinIO.", flush=True)
-
-    # Also include any local post-mortems not yet uploaded
-    local_paths = glob.glob(os.path.join(POST_MORTEMS_DIR, "*.md"))
-    for p in local_paths:
-        store.upload(p)
+    print(f"[*] Synced {len(paths)} post-mortems from MinIO.", flush=True)
 
     # Embed everything
     vector_store.embed_directory(local_dir)
 
 
+def run_reindex(source: str, workers: int, batch_size: int, checkpoint: str):
+    """Bulk re-embed a local post-mortem archive into ChromaDB."""
+    print("[*] Starting RAG bulk re-index...", flush=True)
+    vector_store = PostMortemVectorStore()
+    vector_store.bulk_reindex(source, workers, batch_size, checkpoint)
+
+
 def run_query(query: str):
     """Query the vector store for similar incidents."""
     vector_store = PostMortemVectorStore()
@@ -283,28 +909,52 @@ def run_query(query: str):
 
 
 def run_server():
-    """Start a simple FastAPI endpoint for the AI Agent to query the RAG store."""
+    """Start the async, micro-batched RAG query service for the AI Agents."""
     try:
         from fastapi import FastAPI
+        from fastapi.responses import PlainTextResponse
         import uvicorn
 
-        rag_app = FastAPI(title="AI4ALL-SRE RAG Server")
         vector_store = PostMortemVectorStore()
+        service = RAGQueryService(vector_store)
+        rag_app = FastAPI(
+            title="AI4ALL-SRE RAG Server",
+            on_startup=[service.start],
+            on_shutdown=[service.stop],
+        )
+
+        def filters(alert: Optional[str]) -> Optional[dict]:
+            return {"alert_name": alert} if alert else None
 
         @rag_app.get("/health")
-        def health():
-            return {"status": "ok", "total_embeddings": vector_store.collection.count()}
+        async def health():
+            count = await asyncio.to_thread(vector_store.collection.count)
+            return {"status": "ok", "total_embeddings": count}
 
         @rag_app.get("/query")
-        def query(q: str, n: int = 3):
-            return {"results": vector_store.query(q, n)}
+        async def query(q: str, n: int = 3, alert: Optional[str] = None):
+            hits = await service.timed(
+                "query", service.query(q, max(n, 1), filters(alert))
+            )
+            return {"results": hits}
 
         @rag_app.get("/context")
-        def context(q: str, n: int = 3):
-            return {"context": vector_store.format_context_for_llm(q, n)}
+        async def context(q: str, n: int = 3, alert: Optional[str] = None):
+            hits = await service.timed(
+                "context", service.query(q, max(n, 1), filters(alert))
+            )
+            return {"context": PostMortemVectorStore.format_hits(hits)}
+
+        @rag_app.get("/stats")
+        async def stats():
+            return service.stats()
 
-        print("[*] RAG Server starting on :8001...", flush=True)
-        uvicorn.run(rag_app, host="0.0.0.0", port=8001)
+        @rag_app.get("/metrics", response_class=PlainTextResponse)
+        async def metrics():
+            return service.render_metrics()
+
+        print(f"[*] RAG Server starting on :{RAG_SERVER_PORT}...", flush=True)
+        uvicorn.run(rag_app, host="0.0.0.0", port=RAG_SERVER_PORT)
     except ImportError:
         print("[!] FastAPI/uvicorn not installed.", flush=True)
 
@@ -312,15 +962,30 @@ def run_server():
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="AI4ALL-SRE RAG Pipeline")
     parser.add_argument(
-        "command", choices=["embed", "query", "serve"], help="Pipeline command"
+        "command",
+        choices=["embed", "reindex", "query", "serve"],
+        help="Pipeline command",
     )
     parser.add_argument(
         "query_text", nargs="?", default=None, help="Query text (for 'query' command)"
     )
+    parser.add_argument(
+        "--source", default=POST_MORTEMS_DIR, help="Directory to re-index"
+    )
+    parser.add_argument("--workers", type=int, default=REINDEX_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=REINDEX_BATCH_SIZE)
+    parser.add_argument("--checkpoint", default=REINDEX_CHECKPOINT)
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Embed objects straight from MinIO without writing to disk",
+    )
     args = parser.parse_args()
 
     if args.command == "embed":
-        run_embed_pipeline()
+        run_embed_pipeline(stream=args.stream)
+    elif args.command == "reindex":
+        run_reindex(args.source, args.workers, args.batch_size, args.checkpoint)
     elif args.command == "query":
         if not args.query_text:
             print("Error: provide a query string.")
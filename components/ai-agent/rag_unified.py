@@ -5,13 +5,45 @@ Supports fallback chain: ChromaDB → FAISS → In-memory
 """
 
 import os
+import re
 import abc
+import time
+import contextlib
 import hashlib
 import datetime
-from typing import List, Dict, Optional, Any
+import threading
+from typing import List, Dict, Optional, Any, Tuple
 from dataclasses import dataclass
 from loguru import logger
 
+import agent_config
+from fast_path import RECORD_RE, parse_record
+from index_versioning import (
+    LEGACY_EMBED_MODEL,
+    LEGACY_VECTOR_DIM,
+    collection_embed_model,
+    collection_name_for,
+    manifest_matches,
+    read_manifest,
+    write_manifest,
+)
+
+try:
+    from vector_quantization import (
+        QUANTIZATION_MODES,
+        FloatVectorFile,
+        build_faiss_index,
+        exact_rerank,
+        int8_scores,
+        normalize,
+        quantize_int8,
+        to_index_space,
+    )
+except ImportError:
+    # numpy is only installed with the embedding stack; without it FAISS and
+    # semantic in-memory search are unavailable anyway (keyword matching only)
+    QUANTIZATION_MODES = ("none",)
+
 
 @dataclass
 class RAGResult:
@@ -24,14 +56,121 @@ class RAGResult:
     excerpt: str
 
 
+# ---------------------------------------------------------------------------
+# Near-duplicate detection (SimHash over normalized post-mortem text)
+# ---------------------------------------------------------------------------
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4  # 4 x 16-bit bands: any pair within 3 bits shares a band
+# Flips 8 bits in every band of a verified post-mortem's fingerprint
+_VERIFIED_MASK = 0x0F0F_0F0F_0F0F_0F0F
+
+# Lines that differ between occurrences of the same recurring incident
+_VOLATILE_LINE_RE = re.compile(
+    r"^\s*[-*]*\s*\*\*(timestamp|result|verified|source)\*\*.*$", re.I | re.M
+)
+_TIMESTAMP_RE = re.compile(
+    r"\d{4}-?\d{2}-?\d{2}[T\s-]?\d{2}:?\d{2}:?\d{2}(\.\d+)?Z?|\b\d{8}-\d{6}\b"
+)
+_NUMBER_RE = re.compile(r"\d+")
+_TOKEN_RE = re.compile(r"[a-z0-9_]+")
+
+
+def normalize_post_mortem(content: str) -> str:
+    """Strip volatile fields (timestamps, outcome lines, counters) before hashing."""
+    # The machine-readable record repeats the outcome fields as JSON
+    text = RECORD_RE.sub("", content)
+    text = _VOLATILE_LINE_RE.sub("", text)
+    text = _TIMESTAMP_RE.sub(" ", text)
+    text = _NUMBER_RE.sub("0", text.lower())
+    return " ".join(_TOKEN_RE.findall(text))
+
+
+def post_mortem_fingerprint(content: str) -> int:
+    """
+    SimHash of a post-mortem, keyed on its verification outcome.
+
+    The outcome is stripped from the text but kept in the fingerprint: a
+    failed and a verified remediation of the same incident are 32 bits and
+    every band apart, so neither collapses into the other and the fast path
+    can still find the verified record.
+    """
+    fingerprint = simhash(normalize_post_mortem(content))
+    record = parse_record(content)
+    if record is not None and record.get("verified"):
+        fingerprint ^= _VERIFIED_MASK
+    return fingerprint
+
+
+def simhash(text: str, bits: int = SIMHASH_BITS) -> int:
+    """64-bit SimHash over word 3-gram shingles."""
+    tokens = text.split()
+    shingles = [" ".join(tokens[i : i + 3]) for i in range(max(len(tokens) - 2, 1))]
+    weights = [0] * bits
+    for shingle in shingles:
+        h = int.from_bytes(
+            hashlib.blake2b(shingle.encode(), digest_size=bits // 8).digest(), "big"
+        )
+        for i in range(bits):
+            weights[i] += 1 if (h >> i) & 1 else -1
+    return sum(1 << i for i in range(bits) if weights[i] > 0)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def simhash_bands(fingerprint: int, bands: int = SIMHASH_BANDS) -> List[int]:
+    """Split a fingerprint into equal bands used as exact-match lookup keys."""
+    width = SIMHASH_BITS // bands
+    mask = (1 << width) - 1
+    return [(fingerprint >> (i * width)) & mask for i in range(bands)]
+
+
+def fingerprint_metadata(fingerprint: int) -> Dict[str, Any]:
+    """Metadata fields that make a document discoverable as a near-duplicate."""
+    meta = {"simhash": f"{fingerprint:016x}"}
+    for i, band in enumerate(simhash_bands(fingerprint)):
+        meta[f"simhash_b{i}"] = band
+    return meta
+
+
+def _closest_fingerprint(
+    candidates: List[Tuple[str, Dict[str, Any]]], fingerprint: int, max_distance: int
+) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Pick the candidate whose stored SimHash is nearest to ``fingerprint``."""
+    best, best_distance = None, max_distance + 1
+    for doc_id, meta in candidates:
+        stored = meta.get("simhash")
+        if not stored:
+            continue
+        distance = hamming_distance(int(stored, 16), fingerprint)
+        if distance < best_distance:
+            best, best_distance = (doc_id, meta), distance
+    return best
+
+
+def _merge_occurrence(
+    meta: Dict[str, Any], duplicate_id: str, timestamp: str
+) -> Optional[Dict[str, Any]]:
+    """Return updated canonical metadata, or None if this duplicate was already merged."""
+    merged_ids = [i for i in meta.get("merged_ids", "").split(",") if i]
+    if duplicate_id in merged_ids:
+        return None
+    updated = dict(meta)
+    updated["merged_ids"] = ",".join(merged_ids + [duplicate_id])
+    updated["occurrences"] = int(meta.get("occurrences", 1)) + 1
+    updated["last_seen"] = timestamp
+    return updated
+
+
 class BaseRAGBackend(abc.ABC):
     """Abstract base class for RAG backends"""
 
     @abc.abstractmethod
     def embed_document(
         self, content: str, doc_id: str, metadata: Dict[str, Any]
-    ) -> bool:
-        """Embed a document into the vector store"""
+    ) -> Optional[bool]:
+        """Embed a document: True if added, False if already stored, None on failure"""
         pass
 
     @abc.abstractmethod
@@ -49,14 +188,46 @@ class BaseRAGBackend(abc.ABC):
         """Get number of documents in the store"""
         pass
 
+    def find_near_duplicate(
+        self, fingerprint: int, max_distance: int
+    ) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Return (doc_id, metadata) of the closest stored near-duplicate, if any"""
+        return None
+
+    def record_occurrence(
+        self, canonical_id: str, duplicate_id: str, timestamp: str
+    ) -> bool:
+        """Fold a near-duplicate into its canonical entry (counter + last-seen)"""
+        return False
+
+    def is_rebuilding(self) -> bool:
+        """True while a shadow index for a new embedding model is being built"""
+        return False
+
+    @contextlib.contextmanager
+    def deferred_persist(self):
+        """Persist once at the end of a block of embeds instead of after each"""
+        yield
+
 
 class ChromaDBBackend(BaseRAGBackend):
     """ChromaDB implementation with MinIO persistence"""
 
+    HNSW_METADATA = {
+        "hnsw:space": "cosine",
+        "hnsw:construction_ef": 200,
+        "hnsw:M": 32,
+        "hnsw:search_ef": 100,
+        "hnsw:num_threads": 4,
+    }
+
     def __init__(self):
         self.client = None
         self.collection = None
         self._available = False
+        self._lock = threading.RLock()
+        self._shadow = None
+        self._rebuild_thread = None
 
         try:
             import chromadb
@@ -64,49 +235,169 @@ class ChromaDBBackend(BaseRAGBackend):
 
             host = os.getenv("CHROMA_HOST", "chromadb.observability.svc.cluster.local")
             port = int(os.getenv("CHROMA_PORT", "8000"))
-            embed_model = os.getenv("EMBED_MODEL", "all-MiniLM-L6-v2")
+            embed_model = os.getenv("EMBED_MODEL", LEGACY_EMBED_MODEL)
 
+            self._embedding_functions = embedding_functions
             self.client = chromadb.HttpClient(host=host, port=port)
             self.ef = embedding_functions.SentenceTransformerEmbeddingFunction(
                 model_name=embed_model
             )
-            self.collection = self.client.get_or_create_collection(
-                name="post-mortems",
+            # One collection per embedding model; vectors never mix
+            target = self.client.get_or_create_collection(
+                name=collection_name_for(embed_model),
                 embedding_function=self.ef,
-                metadata={
-                    "hnsw:space": "cosine",
-                    "hnsw:construction_ef": 200,
-                    "hnsw:M": 32,
-                    "hnsw:search_ef": 100,
-                    "hnsw:num_threads": 4,
-                },
+                metadata={**self.HNSW_METADATA, "embed_model": embed_model},
             )
+            # Only a finished copy is served: one interrupted by a restart is
+            # non-empty but incomplete, and is resumed instead
+            complete = bool((target.metadata or {}).get("build_complete"))
+            source = None if complete else self._find_source_collection(embed_model)
+
+            if source is None:
+                self.collection = target
+                if not complete:
+                    self._mark_complete(target)
+            else:
+                # Keep answering from the old model's collection until the
+                # shadow collection has caught up, then swap
+                source_name, source_model = source
+                logger.warning(
+                    f"[!] ChromaDB collection '{target.name}' is incomplete "
+                    f"({target.count()} docs); serving '{source_name}' "
+                    f"({source_model}) while it is rebuilt"
+                )
+                self._shadow = target
+                self.ef = embedding_functions.SentenceTransformerEmbeddingFunction(
+                    model_name=source_model
+                )
+                self.collection = self.client.get_collection(
+                    name=source_name, embedding_function=self.ef
+                )
+                self._rebuild_thread = threading.Thread(
+                    target=self._shadow_rebuild,
+                    args=(embed_model,),
+                    name="chroma-shadow-rebuild",
+                    daemon=True,
+                )
+
             self._available = True
             logger.info(
                 f"[+] ChromaDB backend initialized ({self.collection.count()} docs)"
             )
+            if self._rebuild_thread is not None:
+                self._rebuild_thread.start()
 
         except Exception as e:
             logger.warning(f"[!] ChromaDB unavailable: {e}")
             self._available = False
 
+    def _find_source_collection(self, embed_model: str) -> Optional[Tuple[str, str]]:
+        """Largest post-mortem collection built with a different model, if any."""
+        best = None
+        for entry in self.client.list_collections():
+            # Older clients return Collection objects, newer ones plain names
+            name = getattr(entry, "name", entry)
+            collection = self.client.get_collection(name=name)
+            model = collection_embed_model(name, collection.metadata)
+            if model is None or model == embed_model:
+                continue
+            count = collection.count()
+            if count and (best is None or count > best[2]):
+                best = (name, model, count)
+        return best[:2] if best else None
+
+    def _mark_complete(self, collection):
+        """Record in the collection metadata that it holds every document."""
+        # modify() replaces the metadata and rejects hnsw:space, which the
+        # index segment already keeps from creation
+        metadata = {
+            k: v for k, v in (collection.metadata or {}).items() if k != "hnsw:space"
+        }
+        metadata["build_complete"] = True
+        try:
+            metadata["vector_dim"] = len(self.ef(["dimension probe"])[0])
+        except Exception as e:
+            logger.warning(f"[!] Cannot determine embedding dimension: {e}")
+        try:
+            collection.modify(metadata=metadata)
+        except Exception as e:
+            # Harmless: the next start re-checks the copy against its source
+            logger.warning(f"[!] Cannot mark '{collection.name}' complete: {e}")
+
+    def _shadow_rebuild(self, embed_model: str, page_size: int = 256):
+        """Copy every document into the new model's collection, then swap."""
+        try:
+            started = time.monotonic()
+            # Resume an interrupted copy: documents already there are skipped
+            copied = set(self._shadow.get(include=[])["ids"])
+            offset = 0
+            while True:
+                page = self.collection.get(
+                    limit=page_size, offset=offset, include=["documents", "metadatas"]
+                )
+                if not page["ids"]:
+                    break
+                todo = [i for i, id_ in enumerate(page["ids"]) if id_ not in copied]
+                if todo:
+                    # The shadow collection re-embeds with its own model
+                    self._shadow.upsert(
+                        ids=[page["ids"][i] for i in todo],
+                        documents=[page["documents"][i] for i in todo],
+                        metadatas=[page["metadatas"][i] for i in todo],
+                    )
+                offset += len(page["ids"])
+
+            with self._lock:
+                # Catch up on documents embedded while the copy was running
+                source_ids = set(self.collection.get(include=[])["ids"])
+                missing = sorted(source_ids - set(self._shadow.get(include=[])["ids"]))
+                if missing:
+                    page = self.collection.get(
+                        ids=missing, include=["documents", "metadatas"]
+                    )
+                    self._shadow.upsert(
+                        ids=page["ids"],
+                        documents=page["documents"],
+                        metadatas=page["metadatas"],
+                    )
+                self.collection, self._shadow = self._shadow, None
+                self.ef = (
+                    self._embedding_functions.SentenceTransformerEmbeddingFunction(
+                        model_name=embed_model
+                    )
+                )
+                self._mark_complete(self.collection)
+
+            logger.info(
+                f"[+] ChromaDB collection '{self.collection.name}' live "
+                f"({self.collection.count()} docs in {time.monotonic() - started:.1f}s)"
+            )
+        except Exception as e:
+            logger.error(f"[!] ChromaDB shadow rebuild failed, keeping old index: {e}")
+
+    def is_rebuilding(self) -> bool:
+        return self._rebuild_thread is not None and self._rebuild_thread.is_alive()
+
     def embed_document(
         self, content: str, doc_id: str, metadata: Dict[str, Any]
-    ) -> bool:
+    ) -> Optional[bool]:
         if not self._available:
-            return False
+            return None
 
         try:
-            # Check for duplicates
-            existing = self.collection.get(ids=[doc_id])
-            if existing["ids"]:
-                return False
+            with self._lock:
+                # Check for duplicates
+                existing = self.collection.get(ids=[doc_id])
+                if existing["ids"]:
+                    return False
 
-            self.collection.add(ids=[doc_id], documents=[content], metadatas=[metadata])
+                self.collection.add(
+                    ids=[doc_id], documents=[content], metadatas=[metadata]
+                )
             return True
         except Exception as e:
             logger.error(f"[!] ChromaDB embed error: {e}")
-            return False
+            return None
 
     def query(self, text: str, n_results: int = 3) -> List[RAGResult]:
         if not self._available:
@@ -144,6 +435,54 @@ class ChromaDBBackend(BaseRAGBackend):
             return 0
         return self.collection.count()
 
+    def find_near_duplicate(
+        self, fingerprint: int, max_distance: int
+    ) -> Optional[Tuple[str, Dict[str, Any]]]:
+        if not self._available:
+            return None
+
+        try:
+            # Band lookup narrows candidates server-side; Hamming check is local
+            where = {
+                "$or": [
+                    {f"simhash_b{i}": band}
+                    for i, band in enumerate(simhash_bands(fingerprint))
+                ]
+            }
+            found = self.collection.get(where=where, include=["metadatas"])
+            return _closest_fingerprint(
+                list(zip(found["ids"], found["metadatas"])), fingerprint, max_distance
+            )
+        except Exception as e:
+            logger.error(f"[!] ChromaDB near-duplicate lookup error: {e}")
+            return None
+
+    def record_occurrence(
+        self, canonical_id: str, duplicate_id: str, timestamp: str
+    ) -> bool:
+        if not self._available:
+            return False
+
+        try:
+            existing = self.collection.get(ids=[canonical_id], include=["metadatas"])
+            if not existing["ids"]:
+                return False
+            updated = _merge_occurrence(
+                existing["metadatas"][0], duplicate_id, timestamp
+            )
+            if updated is None:
+                return False
+            with self._lock:
+                self.collection.update(ids=[canonical_id], metadatas=[updated])
+                if self._shadow is not None:
+                    # Already-copied documents would otherwise lose the merge
+                    if self._shadow.get(ids=[canonical_id], include=[])["ids"]:
+                        self._shadow.update(ids=[canonical_id], metadatas=[updated])
+            return True
+        except Exception as e:
+            logger.error(f"[!] ChromaDB occurrence update error: {e}")
+            return False
+
 
 class FAISSBackend(BaseRAGBackend):
     """FAISS implementation with local persistence"""
@@ -153,75 +492,256 @@ class FAISSBackend(BaseRAGBackend):
         self.metadata = []
         self.embed_model = None
         self._available = False
-        self._vector_dim = 384
-
-        # Persistence paths
-        self._persist_dir = os.path.join(
-            os.path.dirname(__file__), "..", "..", "data", "vector_store"
+        self._lock = threading.RLock()
+        self._rebuild_thread = None
+        self._defer_depth = 0
+        self._persist_pending = False
+
+        vector_config = agent_config.config.vector_store
+        self._vector_dim = vector_config.vector_dim
+        self._hnsw_m = vector_config.hnsw_m
+        self._quantization = vector_config.quantization
+        if self._quantization not in QUANTIZATION_MODES:
+            self._quantization = "none"
+        self._pq_m = vector_config.pq_m
+        self._pq_train_size = vector_config.pq_train_size
+        self._rerank_factor = max(vector_config.rerank_factor, 1)
+
+        # Persistence paths (float32 index keeps its historical file name)
+        self._persist_dir = vector_config.persist_directory
+        index_name = (
+            "faiss_index.bin"
+            if self._quantization == "none"
+            else f"faiss_index_{self._quantization}.bin"
         )
-        self._index_file = os.path.join(self._persist_dir, "faiss_index.bin")
+        self._index_file = os.path.join(self._persist_dir, index_name)
         self._metadata_file = os.path.join(self._persist_dir, "metadata.pkl")
 
         try:
             import faiss
             import numpy as np
             from sentence_transformers import SentenceTransformer
-            import os
             import pickle
 
-            self.embed_model = SentenceTransformer("all-MiniLM-L6-v2")
             self.np = np
             self.faiss = faiss
             self.pickle = pickle
 
-            # Load existing index and metadata if available
-            if os.path.exists(self._index_file) and os.path.exists(self._metadata_file):
-                self.index = faiss.read_index(self._index_file)
+            # Ensure persist directory exists
+            os.makedirs(self._persist_dir, exist_ok=True)
+
+            if os.path.exists(self._metadata_file):
                 with open(self._metadata_file, "rb") as f:
                     self.metadata = pickle.load(f)
+
+            # Serve an existing index with the model that built it, even if
+            # EMBED_MODEL has changed; a shadow rebuild swaps it out later
+            manifest = read_manifest(self._persist_dir)
+            if manifest is None and self.metadata:
+                manifest = {
+                    "embed_model": LEGACY_EMBED_MODEL,
+                    "vector_dim": LEGACY_VECTOR_DIM,
+                }
+            stale = manifest is not None and not manifest_matches(
+                manifest, vector_config.embed_model, self._vector_dim
+            )
+            if stale:
+                logger.warning(
+                    f"[!] FAISS index built with {manifest['embed_model']} "
+                    f"({manifest['vector_dim']}d), config wants "
+                    f"{vector_config.embed_model} ({self._vector_dim}d). "
+                    "Serving old index while a shadow index is rebuilt."
+                )
+                serving_model = manifest["embed_model"]
+                self._vector_dim = int(manifest["vector_dim"])
+            else:
+                serving_model = vector_config.embed_model
+
+            self.embed_model = SentenceTransformer(serving_model)
+            # Exact vectors for re-ranking quantized candidates (memmapped)
+            self._vectors = FloatVectorFile(
+                os.path.join(self._persist_dir, "vectors.f32"), self._vector_dim
+            )
+
+            # Load existing index and metadata if available
+            if self.metadata and os.path.exists(self._index_file):
+                self.index = faiss.read_index(self._index_file)
+                if self._quantization != "none":
+                    self._sync_quantized_index(self.index, self._vectors)
                 logger.info(
-                    f"[+] FAISS backend loaded from disk ({len(self.metadata)} entries)"
+                    f"[+] FAISS backend loaded from disk ({len(self.metadata)} entries, "
+                    f"quantization={self._quantization})"
                 )
             else:
-                self.index = faiss.IndexHNSWFlat(self._vector_dim, 32)
-                logger.info("[+] FAISS backend initialized (new)")
+                self.index = self._new_index(self._vector_dim)
+                if self.metadata:
+                    self._rebuild_index()
+                logger.info(
+                    f"[+] FAISS backend initialized (quantization={self._quantization})"
+                )
+            if manifest is None or not stale:
+                write_manifest(self._persist_dir, serving_model, self._vector_dim)
 
-            # Ensure persist directory exists
-            os.makedirs(self._persist_dir, exist_ok=True)
             self._available = True
 
+            if stale:
+                self._rebuild_thread = threading.Thread(
+                    target=self._shadow_rebuild,
+                    args=(vector_config.embed_model, vector_config.vector_dim),
+                    name="faiss-shadow-rebuild",
+                    daemon=True,
+                )
+                self._rebuild_thread.start()
+
         except Exception as e:
             logger.warning(f"[!] FAISS unavailable: {e}")
             self._available = False
 
+    def _new_index(self, dim: int):
+        return build_faiss_index(
+            self.faiss,
+            dim,
+            self._hnsw_m,
+            self._quantization,
+            self._pq_m,
+        )
+
+    def _encode(self, texts: List[str], model=None):
+        model = model or self.embed_model
+        embeddings = model.encode(texts).astype("float32")
+        if self._quantization != "none":
+            embeddings = normalize(embeddings)
+        return embeddings
+
+    def _add_vectors(self, index, vectors: "FloatVectorFile", embeddings):
+        if self._quantization == "none":
+            index.add(embeddings)
+        else:
+            vectors.append(embeddings)
+            self._sync_quantized_index(index, vectors)
+
+    def _rebuild_index(self):
+        """Rebuild a compressed index for existing metadata (e.g. mode switch)."""
+        if self._quantization == "none":
+            embeddings = self._encode([m.get("content", "") for m in self.metadata])
+            self.index.add(embeddings)
+            return
+        if len(self._vectors) != len(self.metadata):
+            # No exact vectors on disk (first switch from float32): re-encode once
+            if os.path.exists(self._vectors.path):
+                os.remove(self._vectors.path)
+            self._vectors.append(
+                self._encode([m.get("content", "") for m in self.metadata])
+            )
+        self._sync_quantized_index(self.index, self._vectors)
+        self._persist()
+
+    def _sync_quantized_index(self, index, vectors_file: "FloatVectorFile"):
+        """Add any exact vectors not yet in the compressed index (trains PQ lazily)."""
+        vectors = vectors_file.view()
+        if not index.is_trained:
+            if len(vectors) < self._pq_train_size:
+                return
+            logger.info(f"[*] Training PQ codebooks on {len(vectors)} vectors...")
+            index.train(self.np.ascontiguousarray(vectors))
+        pending = vectors[index.ntotal :]
+        if len(pending):
+            index.add(to_index_space(pending, self._quantization))
+
+    def _shadow_rebuild(self, embed_model: str, vector_dim: int, chunk: int = 256):
+        """Re-embed every document with a new model, then swap indexes atomically."""
+        try:
+            from sentence_transformers import SentenceTransformer
+
+            started = time.monotonic()
+            model = SentenceTransformer(embed_model)
+            index = self._new_index(vector_dim)
+            shadow_vectors = FloatVectorFile(
+                f"{self._vectors.path}.rebuild", vector_dim
+            )
+            if os.path.exists(shadow_vectors.path):
+                os.remove(shadow_vectors.path)
+
+            # Bulk of the work happens without the lock; queries keep flowing
+            done = 0
+            while True:
+                with self._lock:
+                    batch = self.metadata[done : done + chunk]
+                    if not batch:
+                        # Swap under the lock so no embed lands in between
+                        self._swap_index(index, shadow_vectors, model, embed_model)
+                        break
+                contents = [m.get("content", "") for m in batch]
+                self._add_vectors(index, shadow_vectors, self._encode(contents, model))
+                done += len(batch)
+
+            logger.info(
+                f"[+] FAISS shadow index for {embed_model} live "
+                f"({done} docs in {time.monotonic() - started:.1f}s)"
+            )
+        except Exception as e:
+            logger.error(f"[!] FAISS shadow rebuild failed, keeping old index: {e}")
+
+    def _swap_index(self, index, shadow_vectors, model, embed_model: str):
+        shadow_index_file = f"{self._index_file}.rebuild"
+        self.faiss.write_index(index, shadow_index_file)
+        if os.path.exists(shadow_vectors.path):
+            os.replace(shadow_vectors.path, self._vectors.path)
+        os.replace(shadow_index_file, self._index_file)
+        write_manifest(self._persist_dir, embed_model, shadow_vectors.dim)
+
+        self.index = index
+        self.embed_model = model
+        self._vector_dim = shadow_vectors.dim
+        self._vectors = FloatVectorFile(self._vectors.path, shadow_vectors.dim)
+
+    def is_rebuilding(self) -> bool:
+        return self._rebuild_thread is not None and self._rebuild_thread.is_alive()
+
     def embed_document(
         self, content: str, doc_id: str, metadata: Dict[str, Any]
-    ) -> bool:
+    ) -> Optional[bool]:
         if not self._available:
-            return False
+            return None
 
         try:
-            # Check for duplicates by doc_id
-            for existing_meta in self.metadata:
-                if existing_meta.get("doc_id") == doc_id:
-                    return False
+            with self._lock:
+                # Check for duplicates by doc_id
+                for existing_meta in self.metadata:
+                    if existing_meta.get("doc_id") == doc_id:
+                        return False
 
-            embedding = self.embed_model.encode([content])[0].astype("float32")
-            self.index.add(self.np.array([embedding]))
+                self._add_vectors(self.index, self._vectors, self._encode([content]))
 
-            # Store metadata including content
-            full_metadata = {"doc_id": doc_id, "content": content, **metadata}
-            self.metadata.append(full_metadata)
+                # Store metadata including content
+                full_metadata = {"doc_id": doc_id, "content": content, **metadata}
+                self.metadata.append(full_metadata)
 
-            # Persist to disk
-            self._persist()
+                # Persist to disk
+                self._persist()
             return True
         except Exception as e:
             logger.error(f"[!] FAISS embed error: {e}")
-            return False
+            return None
+
+    @contextlib.contextmanager
+    def deferred_persist(self):
+        with self._lock:
+            self._defer_depth += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._defer_depth -= 1
+                if self._defer_depth == 0 and self._persist_pending:
+                    self._persist_pending = False
+                    self._persist()
 
     def _persist(self):
         """Save index and metadata to disk."""
+        if self._defer_depth:
+            self._persist_pending = True
+            return
         try:
             self.faiss.write_index(self.index, self._index_file)
             with open(self._metadata_file, "wb") as f:
@@ -229,24 +749,48 @@ class FAISSBackend(BaseRAGBackend):
         except Exception as e:
             logger.error(f"[!] FAISS persistence error: {e}")
 
+    def _search(self, query_vec, n_results: int) -> List[Tuple[int, float]]:
+        """Return (row, squared L2 distance) pairs, best first."""
+        if self._quantization == "none":
+            distances, indices = self.index.search(
+                self.np.array([query_vec]), n_results
+            )
+            return [
+                (int(idx), float(dist))
+                for idx, dist in zip(indices[0], distances[0])
+                if idx != -1
+            ]
+
+        vectors = self._vectors.view()
+        if self.index.ntotal < len(vectors):
+            # Untrained PQ (small archive): exact scan over the memmap
+            candidates = range(len(vectors))
+        else:
+            _, indices = self.index.search(
+                to_index_space(self.np.array([query_vec]), self._quantization),
+                n_results * self._rerank_factor,
+            )
+            candidates = indices[0]
+        return exact_rerank(query_vec, candidates, vectors, n_results)
+
     def query(self, text: str, n_results: int = 3) -> List[RAGResult]:
-        if not self._available or self.index.ntotal == 0:
+        if not self._available or not self.metadata:
             return []
 
         try:
-            query_vec = self.embed_model.encode([text])[0].astype("float32")
-            distances, indices = self.index.search(
-                self.np.array([query_vec]), n_results
-            )
+            # Model, index and vectors must come from the same generation
+            with self._lock:
+                query_vec = self._encode([text])[0]
+                results = self._search(query_vec, n_results)
 
             hits = []
-            for i, idx in enumerate(indices[0]):
-                if idx != -1 and idx < len(self.metadata):
+            for i, (idx, distance) in enumerate(results):
+                if idx < len(self.metadata):
                     content = self.metadata[idx].get("content", "")
                     hits.append(
                         RAGResult(
                             rank=i + 1,
-                            similarity=float(1 - distances[0][i]),
+                            similarity=float(1 - distance),
                             content=content,
                             metadata=self.metadata[idx],
                             excerpt=content[:500] + "..."
@@ -266,7 +810,34 @@ class FAISSBackend(BaseRAGBackend):
     def get_document_count(self) -> int:
         if not self._available:
             return 0
-        return self.index.ntotal
+        return len(self.metadata)
+
+    def find_near_duplicate(
+        self, fingerprint: int, max_distance: int
+    ) -> Optional[Tuple[str, Dict[str, Any]]]:
+        if not self._available:
+            return None
+        return _closest_fingerprint(
+            [(meta.get("doc_id"), meta) for meta in self.metadata],
+            fingerprint,
+            max_distance,
+        )
+
+    def record_occurrence(
+        self, canonical_id: str, duplicate_id: str, timestamp: str
+    ) -> bool:
+        if not self._available:
+            return False
+
+        for i, meta in enumerate(self.metadata):
+            if meta.get("doc_id") == canonical_id:
+                updated = _merge_occurrence(meta, duplicate_id, timestamp)
+                if updated is None:
+                    return False
+                self.metadata[i] = updated
+                self._persist()
+                return True
+        return False
 
 
 class InMemoryBackend(BaseRAGBackend):
@@ -277,28 +848,69 @@ class InMemoryBackend(BaseRAGBackend):
         self.embed_model = None
         self._available = True
 
+        vector_config = agent_config.config.vector_store
+        # No PQ training here: any compressed mode uses per-vector int8 codes
+        self._quantized = vector_config.quantization in ("int8", "pq")
+        self._rerank_factor = max(vector_config.rerank_factor, 1)
+
         try:
             from sentence_transformers import SentenceTransformer
             import numpy as np
 
-            self.embed_model = SentenceTransformer("all-MiniLM-L6-v2")
+            self.embed_model = SentenceTransformer(vector_config.embed_model)
             self.np = np
         except:
             logger.warning("[!] SentenceTransformer unavailable, using simple matching")
 
     def embed_document(
         self, content: str, doc_id: str, metadata: Dict[str, Any]
-    ) -> bool:
+    ) -> Optional[bool]:
         # Check for duplicates
         for doc in self.documents:
             if doc["doc_id"] == doc_id:
                 return False
 
-        self.documents.append(
-            {"doc_id": doc_id, "content": content, "metadata": metadata}
-        )
+        doc = {"doc_id": doc_id, "content": content, "metadata": metadata}
+        if self.embed_model:
+            # Embed once at ingest instead of re-encoding every doc per query
+            try:
+                vector = normalize(self.embed_model.encode([content]))[0]
+                if self._quantized:
+                    doc["codes"], doc["scale"] = quantize_int8(vector)
+                else:
+                    doc["vector"] = vector
+            except Exception as e:
+                logger.error(f"[!] InMemory embed error: {e}")
+        self.documents.append(doc)
         return True
 
+    def _semantic_scores(self, text: str, n_results: int) -> List[tuple]:
+        """(similarity, doc) pairs, best first, using cached embeddings."""
+        np = self.np
+        query_vec = normalize(self.embed_model.encode([text]))[0]
+        docs = [d for d in self.documents if "vector" in d or "codes" in d]
+        if not docs:
+            return []
+
+        if not self._quantized:
+            sims = np.stack([d["vector"] for d in docs]) @ query_vec
+            order = np.argsort(-sims)[:n_results]
+            return [(float(sims[i]), docs[i]) for i in order]
+
+        approx = int8_scores(
+            np.stack([d["codes"] for d in docs]),
+            np.array([d["scale"] for d in docs], dtype="float32"),
+            query_vec,
+        )
+        candidates = [
+            docs[i] for i in np.argsort(-approx)[: n_results * self._rerank_factor]
+        ]
+        # Exact re-rank: only the shortlisted documents are re-encoded
+        exact = normalize(self.embed_model.encode([d["content"] for d in candidates]))
+        sims = exact @ query_vec
+        order = np.argsort(-sims)[:n_results]
+        return [(float(sims[i]), candidates[i]) for i in order]
+
     def query(self, text: str, n_results: int = 3) -> List[RAGResult]:
         if not self.documents:
             return []
@@ -306,21 +918,10 @@ class InMemoryBackend(BaseRAGBackend):
         if self.embed_model:
             # Use semantic similarity
             try:
-                query_vec = self.embed_model.encode([text])[0]
-                scores = []
-
-                for doc in self.documents:
-                    doc_vec = self.embed_model.encode([doc["content"]])[0]
-                    similarity = self.np.dot(query_vec, doc_vec) / (
-                        self.np.linalg.norm(query_vec) * self.np.linalg.norm(doc_vec)
-                    )
-                    scores.append((similarity, doc))
-
-                # Sort by similarity
-                scores.sort(key=lambda x: x[0], reverse=True)
+                scores = self._semantic_scores(text, n_results)
 
                 hits = []
-                for i, (similarity, doc) in enumerate(scores[:n_results]):
+                for i, (similarity, doc) in enumerate(scores):
                     content = doc["content"]
                     hits.append(
                         RAGResult(
@@ -333,7 +934,8 @@ class InMemoryBackend(BaseRAGBackend):
                             else content,
                         )
                     )
-                return hits
+                if hits:
+                    return hits
 
             except Exception as e:
                 logger.error(f"[!] InMemory semantic search error: {e}")
@@ -373,6 +975,27 @@ class InMemoryBackend(BaseRAGBackend):
     def get_document_count(self) -> int:
         return len(self.documents)
 
+    def find_near_duplicate(
+        self, fingerprint: int, max_distance: int
+    ) -> Optional[Tuple[str, Dict[str, Any]]]:
+        return _closest_fingerprint(
+            [(doc["doc_id"], doc["metadata"]) for doc in self.documents],
+            fingerprint,
+            max_distance,
+        )
+
+    def record_occurrence(
+        self, canonical_id: str, duplicate_id: str, timestamp: str
+    ) -> bool:
+        for doc in self.documents:
+            if doc["doc_id"] == canonical_id:
+                updated = _merge_occurrence(doc["metadata"], duplicate_id, timestamp)
+                if updated is None:
+                    return False
+                doc["metadata"] = updated
+                return True
+        return False
+
 
 class UnifiedRAGPipeline:
     """
@@ -384,6 +1007,9 @@ class UnifiedRAGPipeline:
 
     def __init__(self):
         self.backends = [ChromaDBBackend(), FAISSBackend(), InMemoryBackend()]
+        vector_config = agent_config.config.vector_store
+        self.near_dup_enabled = vector_config.near_dup_enabled
+        self.near_dup_max_distance = vector_config.near_dup_max_distance
 
         # Find first available backend
         self.primary_backend = None
@@ -399,23 +1025,61 @@ class UnifiedRAGPipeline:
 
     def embed_post_mortem(
         self, content: str, alert_name: str, timestamp: str = None
-    ) -> bool:
-        """Embed a post-mortem document"""
+    ) -> Optional[bool]:
+        """
+        Embed a post-mortem document.
+
+        True if it was embedded, False if it is already indexed (the same
+        document, or an occurrence merged into its near-duplicate), None if
+        embedding failed and should be retried.
+        """
         if not self.primary_backend:
-            return False
+            return None
 
         if timestamp is None:
             timestamp = datetime.datetime.utcnow().isoformat()
 
         doc_id = hashlib.sha256(content.encode()).hexdigest()[:16]
+        fingerprint = post_mortem_fingerprint(content)
+
+        # Collapse recurring incidents into one canonical entry
+        if self.near_dup_enabled:
+            match = self.primary_backend.find_near_duplicate(
+                fingerprint, self.near_dup_max_distance
+            )
+            if match is not None:
+                canonical_id, canonical_meta = match
+                if canonical_id != doc_id and self.primary_backend.record_occurrence(
+                    canonical_id, doc_id, timestamp
+                ):
+                    logger.info(
+                        f"[=] Near-duplicate of {canonical_id} "
+                        f"({canonical_meta.get('alert_name', alert_name)}), "
+                        "occurrence recorded"
+                    )
+                return False
+
         metadata = {
             "alert_name": alert_name,
             "timestamp": timestamp,
             "embedded_at": datetime.datetime.utcnow().isoformat(),
+            "occurrences": 1,
+            "first_seen": timestamp,
+            "last_seen": timestamp,
+            **fingerprint_metadata(fingerprint),
         }
 
         return self.primary_backend.embed_document(content, doc_id, metadata)
 
+    def embed_post_mortems(
+        self, items: List[Tuple[str, str, str]]
+    ) -> List[Optional[bool]]:
+        """Embed (content, alert_name, timestamp) post-mortems with one persist"""
+        if not self.primary_backend:
+            return [None] * len(items)
+        with self.primary_backend.deferred_persist():
+            return [self.embed_post_mortem(c, a, t) for c, a, t in items]
+
     def query_similar_incidents(
         self, incident_description: str, n_results: int = 3
     ) -> List[RAGResult]:
@@ -437,7 +1101,11 @@ class UnifiedRAGPipeline:
         ctx = "## Similar Past Incidents (from Post-Mortem Database)\n\n"
         for hit in hits:
             ctx += f"### [{hit.rank}] {hit.metadata.get('alert_name', 'Unknown')} "
-            ctx += f"(similarity: {hit.similarity:.2%})\n"
+            ctx += f"(similarity: {hit.similarity:.2%})"
+            occurrences = int(hit.metadata.get("occurrences", 1))
+            if occurrences > 1:
+                ctx += f" — seen {occurrences}x, last {hit.metadata.get('last_seen')}"
+            ctx += "\n"
             ctx += f"{hit.excerpt}\n\n---\n\n"
 
         return ctx
@@ -454,6 +1122,9 @@ class UnifiedRAGPipeline:
             "document_count": self.primary_backend.get_document_count()
             if self.primary_backend
             else 0,
+            "rebuilding": self.primary_backend.is_rebuilding()
+            if self.primary_backend
+            else False,
         }
 
 
@@ -0,0 +1,193 @@
+"""
+Per-target locks for remediations.
+
+Remediations of the same namespace/deployment must not interleave (two
+patches or two manifest edits racing on one object), but unrelated targets
+have no reason to wait for each other. TargetLockManager hands out one lock
+per target, created on first use and dropped when nobody holds or waits for
+it. An optional RedisLease extends the exclusion across agent replicas.
+"""
+
+import time
+import uuid
+import threading
+import contextlib
+from typing import Optional
+
+from loguru import logger
+
+
+class TargetLockTimeout(Exception):
+    """Raised when a target stays locked for longer than the wait timeout"""
+
+    pass
+
+
+class RedisLease:
+    """
+    Cross-replica lease: SET NX PX with a random token, released only by its
+    owner. The TTL bounds how long a crashed replica can block a target; a
+    live holder renews it every third of the TTL, so a remediation that
+    outlasts the TTL (a GitOps commit can wait minutes) keeps its lease.
+    Redis errors degrade to local-only locking rather than blocking remediation.
+    """
+
+    RELEASE_SCRIPT = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+
+    RENEW_SCRIPT = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+
+    def __init__(
+        self,
+        client,
+        ttl: float = 60.0,
+        key_prefix: str = "remediation-lock:",
+        poll_interval: float = 0.1,
+    ):
+        self.client = client
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+        self.poll_interval = poll_interval
+        self._release_script = client.register_script(self.RELEASE_SCRIPT)
+        self._renew_script = client.register_script(self.RENEW_SCRIPT)
+        self.renewals = 0
+
+    def acquire(self, key: str, wait: float) -> Optional[str]:
+        """Lease token, "" if Redis is unavailable, or None on timeout"""
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + wait
+        while True:
+            try:
+                if self.client.set(
+                    self.key_prefix + key, token, nx=True, px=int(self.ttl * 1000)
+                ):
+                    return token
+            except Exception as e:
+                logger.warning(f"[!] Remediation lease for {key} unavailable: {e}")
+                return ""
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+
+    def renew(self, key: str, token: str) -> bool:
+        """Reset the TTL if ``token`` still owns the lease; False once it is lost."""
+        renewed = self._renew_script(
+            keys=[self.key_prefix + key], args=[token, int(self.ttl * 1000)]
+        )
+        if renewed:
+            self.renewals += 1
+        return bool(renewed)
+
+    @contextlib.contextmanager
+    def keep_alive(self, key: str, token: str):
+        """Renew the lease in the background until the block exits."""
+        stop = threading.Event()
+
+        def heartbeat():
+            while not stop.wait(self.ttl / 3):
+                try:
+                    if not self.renew(key, token):
+                        logger.warning(f"[!] Remediation lease {key} was lost")
+                        return
+                except Exception as e:
+                    # Transient: the lease stays valid until its TTL runs out
+                    logger.warning(f"[!] Could not renew remediation lease {key}: {e}")
+
+        thread = threading.Thread(target=heartbeat, name=f"lease:{key}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def release(self, key: str, token: str):
+        try:
+            self._release_script(keys=[self.key_prefix + key], args=[token])
+        except Exception as e:
+            logger.warning(f"[!] Could not release remediation lease {key}: {e}")
+
+
+class TargetLockManager:
+    """Keyed locks: same target serialized, different targets in parallel."""
+
+    def __init__(self, lease: Optional[RedisLease] = None, wait_timeout: float = 30.0):
+        self.lease = lease
+        self.wait_timeout = wait_timeout
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.contended = 0
+        self.timeouts = 0
+
+    def _checkout(self, key: str) -> threading.Lock:
+        with self._lock:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+            return entry[0]
+
+    def _checkin(self, key: str):
+        with self._lock:
+            entry = self._locks[key]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+    def _timed_out(self, message: str) -> TargetLockTimeout:
+        with self._lock:
+            self.timeouts += 1
+        return TargetLockTimeout(message)
+
+    @contextlib.contextmanager
+    def hold(self, namespace: str, name: str):
+        key = f"{namespace}/{name}"
+        lock = self._checkout(key)
+        try:
+            if not lock.acquire(blocking=False):
+                with self._lock:
+                    self.contended += 1
+                if not lock.acquire(timeout=self.wait_timeout):
+                    raise self._timed_out(
+                        f"{key} still locked after {self.wait_timeout:.0f}s"
+                    )
+            try:
+                token = None
+                if self.lease is not None:
+                    token = self.lease.acquire(key, self.wait_timeout)
+                    if token is None:
+                        raise self._timed_out(f"{key} is held by another replica")
+                with self._lock:
+                    self.acquired += 1
+                try:
+                    if token:
+                        with self.lease.keep_alive(key, token):
+                            yield
+                    else:
+                        yield
+                finally:
+                    if token:
+                        self.lease.release(key, token)
+            finally:
+                lock.release()
+        finally:
+            self._checkin(key)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "active_targets": len(self._locks),
+                "acquired": self.acquired,
+                "contended": self.contended,
+                "timeouts": self.timeouts,
+                "shared": self.lease is not None,
+                "lease_renewals": self.lease.renewals if self.lease else 0,
+            }
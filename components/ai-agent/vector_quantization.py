@@ -0,0 +1,110 @@
+"""
+Compressed vector storage for the FAISS and in-memory RAG backends.
+
+Modes (VectorStoreConfig.quantization):
+  - none: float32 vectors (HNSWFlat), the historical default
+  - int8: 8-bit scalar quantization, ~4x smaller, no training required
+  - pq:   product quantization codes, ~32x smaller, trained once enough
+          vectors have been ingested
+
+Compressed indexes only produce candidates. The top ``k * rerank_factor``
+candidates are re-scored exactly against float32 originals kept on disk
+(FloatVectorFile), so RAM holds only the codes.
+"""
+
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+QUANTIZATION_MODES = ("none", "int8", "pq")
+
+# Unit-norm components lie in [-1, 1]; scale them onto the signed int8 grid
+INT8_SCALE = 127.0
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows so int8 scaling and cosine scores are well defined."""
+    vectors = np.asarray(vectors, dtype="float32")
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def build_faiss_index(faiss, dim: int, hnsw_m: int, quantization: str, pq_m: int):
+    """Create an empty HNSW index for the requested quantization mode."""
+    if quantization == "int8":
+        # Direct signed SQ stores each component as one byte without training
+        return faiss.IndexHNSWSQ(
+            dim, faiss.ScalarQuantizer.QT_8bit_direct_signed, hnsw_m
+        )
+    if quantization == "pq":
+        if dim % pq_m:
+            raise ValueError(f"vector_dim {dim} is not divisible by pq_m {pq_m}")
+        return faiss.IndexHNSWPQ(dim, pq_m, hnsw_m)
+    return faiss.IndexHNSWFlat(dim, hnsw_m)
+
+
+def to_index_space(vectors: np.ndarray, quantization: str) -> np.ndarray:
+    """Map normalized float vectors onto the value range the index expects."""
+    if quantization == "int8":
+        return np.clip(np.round(vectors * INT8_SCALE), -128, 127).astype("float32")
+    return np.ascontiguousarray(vectors, dtype="float32")
+
+
+def quantize_int8(vector: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Per-vector symmetric int8 quantization (codes, scale)."""
+    vector = np.asarray(vector, dtype="float32")
+    scale = float(np.max(np.abs(vector))) / INT8_SCALE or 1.0
+    codes = np.clip(np.round(vector / scale), -128, 127).astype("int8")
+    return codes, scale
+
+
+def int8_scores(codes: np.ndarray, scales: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Approximate dot products between int8 rows and a float query."""
+    return (codes.astype("float32") @ query) * scales
+
+
+def exact_rerank(
+    query: np.ndarray, candidate_ids: List[int], vectors: np.ndarray, k: int
+) -> List[Tuple[int, float]]:
+    """Re-score candidates against float originals (squared L2, ascending)."""
+    ids = sorted({int(i) for i in candidate_ids if i >= 0})
+    if not ids:
+        return []
+    diffs = vectors[ids] - query
+    distances = np.einsum("ij,ij->i", diffs, diffs)
+    order = np.argsort(distances)[:k]
+    return [(ids[i], float(distances[i])) for i in order]
+
+
+class FloatVectorFile:
+    """
+    Append-only float32 matrix on disk, read back through a memmap.
+    Holds the exact vectors used to re-rank quantized candidates without
+    keeping them resident in the agent pod's memory.
+    """
+
+    def __init__(self, path: str, dim: int):
+        self.path = path
+        self.dim = dim
+        self._view: Optional[np.memmap] = None
+
+    def __len__(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        return os.path.getsize(self.path) // (4 * self.dim)
+
+    def append(self, vectors: np.ndarray) -> None:
+        with open(self.path, "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype="float32").tobytes())
+        self._view = None
+
+    def view(self) -> np.ndarray:
+        if self._view is None:
+            n = len(self)
+            if n == 0:
+                return np.empty((0, self.dim), dtype="float32")
+            self._view = np.memmap(
+                self.path, dtype="float32", mode="r", shape=(n, self.dim)
+            )
+        return self._view
@@ -0,0 +1,122 @@
+"""
+The agent's own working copy of the GitOps repository.
+
+The agent used to assume a full clone mounted at GIT_REPO_DIR. For a
+monorepo that means a large volume and a slow pod start. WorkingCopy can
+create a shallow, blob-filtered, sparse clone instead, limited to the
+directories the agent reads and writes: manifests, runbooks and
+post-mortems.
+
+It also keeps the copy current. sync() fetches the branch and rebases onto
+it. A plain fetch on a shallow clone downloads only the new commits down to
+history it already has, so the rebase always finds a merge base. Local
+edits, such as runbook updates, are autostashed across the rebase. A push
+rejected as non-fast-forward is therefore recovered by sync() and a
+retried push, rather than by dropping the commit.
+"""
+
+import os
+import time
+import threading
+import subprocess
+from typing import Sequence
+
+from loguru import logger
+
+from git_backend import GitError
+
+
+def url_with_token(url: str, token: str) -> str:
+    if not token or "://" not in url:
+        return url
+    scheme, rest = url.split("://", 1)
+    return f"{scheme}://{token}@{rest.split('@', 1)[-1]}"
+
+
+class WorkingCopy:
+    """Shallow, sparse clone of one branch, kept current by fetch + rebase"""
+
+    def __init__(
+        self,
+        repo_dir: str,
+        branch: str,
+        remote: str = "origin",
+        url: str = "",
+        token: str = "",
+        sparse_paths: Sequence[str] = (),
+        depth: int = 1,
+    ):
+        self.repo_dir = repo_dir
+        self.branch = branch
+        self.remote = remote
+        self.url = url
+        self.token = token
+        self.sparse_paths = [p.strip("/") for p in sparse_paths if p]
+        self.depth = depth
+        self._lock = threading.Lock()
+        self.clone_seconds = None
+        self.syncs = 0
+        self.sync_failures = 0
+        self.last_sync_ms = None
+
+    def _git(self, *args: str, timeout: float = 120, cwd: bool = True) -> str:
+        cmd = ["git", "-C", self.repo_dir, *args] if cwd else ["git", *args]
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+        if result.returncode != 0:
+            raise GitError(f"git {args[0]} failed: {result.stderr.strip()}")
+        return result.stdout
+
+    def exists(self) -> bool:
+        return os.path.isdir(os.path.join(self.repo_dir, ".git"))
+
+    def ensure(self):
+        """Clone the working copy if missing and apply the sparse paths."""
+        with self._lock:
+            if not self.exists():
+                if not self.url:
+                    raise GitError(f"no repository at {self.repo_dir} and no URL")
+                start = time.monotonic()
+                args = ["clone", "--branch", self.branch, "--single-branch"]
+                if self.depth > 0:
+                    args += [f"--depth={self.depth}"]
+                if self.sparse_paths:
+                    args += ["--filter=blob:none", "--sparse"]
+                args += [url_with_token(self.url, self.token), self.repo_dir]
+                self._git(*args, timeout=600, cwd=False)
+                self.clone_seconds = round(time.monotonic() - start, 2)
+                logger.info(f"[GitOps] Cloned {self.branch} in {self.clone_seconds}s")
+            if self.sparse_paths:
+                self._git("sparse-checkout", "set", *self.sparse_paths, timeout=300)
+
+    def sync(self):
+        """Fetch the branch and rebase local work onto it."""
+        with self._lock:
+            start = time.monotonic()
+            tracking = f"refs/remotes/{self.remote}/{self.branch}"
+            try:
+                self._git("fetch", self.remote, f"+refs/heads/{self.branch}:{tracking}")
+                try:
+                    self._git("rebase", "--autostash", tracking)
+                except GitError:
+                    try:
+                        self._git("rebase", "--abort")
+                    except GitError:
+                        pass
+                    raise
+            except GitError as e:
+                self.sync_failures += 1
+                logger.warning(f"[GitOps] Sync with {self.remote} failed: {e}")
+                raise
+            self.syncs += 1
+            self.last_sync_ms = round((time.monotonic() - start) * 1000, 1)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "sparse_paths": self.sparse_paths,
+                "depth": self.depth,
+                "clone_seconds": self.clone_seconds,
+                "syncs": self.syncs,
+                "sync_failures": self.sync_failures,
+                "last_sync_ms": self.last_sync_ms,
+            }
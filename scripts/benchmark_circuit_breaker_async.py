@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark the per-call overhead of the async circuit breaker paths.
+
+Runs thousands of concurrent tasks that await a trivial coroutine, bare and
+through execute_async / the decorator / guard(), and reports the added cost
+per call. A second phase keeps the circuit HALF_OPEN to show rejected calls
+fail fast without touching the dependency.
+
+Usage:
+  python3 scripts/benchmark_circuit_breaker_async.py --tasks 5000 --rounds 5
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.insert(
+    0,
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../components/ai-agent")),
+)
+
+from loguru import logger  # noqa: E402
+
+from circuit_breaker import (  # noqa: E402
+    CircuitBreaker,
+    CircuitBreakerOpenError,
+    CircuitState,
+    circuit_breaker,
+)
+
+
+async def dependency():
+    await asyncio.sleep(0)
+    return 1
+
+
+async def run_tasks(make_call, tasks: int) -> float:
+    """Seconds to run ``tasks`` concurrent calls to completion"""
+    started = time.perf_counter()
+    await asyncio.gather(*(make_call() for _ in range(tasks)), return_exceptions=True)
+    return time.perf_counter() - started
+
+
+async def main_async(args):
+    cb = CircuitBreaker(name="bench", fail_max=10**9, reset_timeout=60.0)
+    windowed = CircuitBreaker(
+        name="bench_window",
+        fail_max=10**9,
+        window_size=60.0,
+        minimum_calls=10**9,
+        slow_call_threshold=1.0,
+    )
+    decorated = circuit_breaker(name="bench_decorated", fail_max=10**9)(dependency)
+
+    async def guarded():
+        async with cb.guard():
+            return await dependency()
+
+    variants = {
+        "bare": dependency,
+        "execute_async": lambda: cb.execute_async(dependency),
+        "execute_async (window)": lambda: windowed.execute_async(dependency),
+        "decorator": decorated,
+        "guard()": guarded,
+    }
+
+    print(f"[*] {args.tasks} concurrent tasks x {args.rounds} rounds\n")
+    print("| Variant | us/call | Overhead us/call |")
+    print("|---------|---------|------------------|")
+    baseline = None
+    for name, make_call in variants.items():
+        best = min([await run_tasks(make_call, args.tasks) for _ in range(args.rounds)])
+        per_call = best / args.tasks * 1e6
+        baseline = per_call if baseline is None else baseline
+        print(f"| {name} | {per_call:.2f} | {per_call - baseline:+.2f} |")
+
+    # HALF_OPEN storm: one probe admitted, everything else rejected fast
+    probe = CircuitBreaker(name="bench_half_open", fail_max=1, reset_timeout=60.0)
+    probe.state = CircuitState.HALF_OPEN
+    calls = 0
+
+    async def slow_dependency():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(probe.execute_async(slow_dependency) for _ in range(args.tasks)),
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - started
+    rejected = sum(isinstance(r, CircuitBreakerOpenError) for r in results)
+    print(
+        f"\n[*] HALF_OPEN: {calls} probe admitted, {rejected} rejected "
+        f"in {elapsed * 1000:.1f}ms total"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Async circuit breaker benchmark")
+    parser.add_argument("--tasks", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    # State-change logging would dominate the measurement
+    logger.remove()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-remediation GitOps latency for each git backend.
+
+Each iteration does what one GitOps commit does: clean-tree check, manifest
+edit, commit and push to a local bare remote. "legacy" replays the old
+per-remediation sequence, which re-ran `git config` on every call.
+
+Usage:
+  python3 scripts/benchmark_git_backend.py --iterations 50 --manifest-docs 200
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+
+sys.path.insert(
+    0,
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../components/ai-agent")),
+)
+
+from git_backend import (  # noqa: E402
+    DulwichGitBackend,
+    SubprocessGitBackend,
+)
+
+MANIFEST = "kubernetes-manifests.yaml"
+
+
+class LegacyGitBackend(SubprocessGitBackend):
+    """The pre-backend sequence: identity set up again on every commit."""
+
+    name = "legacy"
+
+    def dirty_paths(self):
+        self.setup()
+        return super().dirty_paths()
+
+
+def make_repo(root, docs):
+    remote = os.path.join(root, "remote.git")
+    repo = os.path.join(root, "work")
+    subprocess.run(["git", "init", "-q", "--bare", remote], check=True)
+    subprocess.run(
+        ["git", "clone", "-q", remote, repo], check=True, capture_output=True
+    )
+
+    def git(*args):
+        subprocess.run(["git", "-C", repo, *args], check=True, capture_output=True)
+
+    git("checkout", "-q", "-b", "main")
+    git("config", "user.email", "bench@example.com")
+    git("config", "user.name", "Bench")
+    with open(os.path.join(repo, MANIFEST), "w") as f:
+        for i in range(docs):
+            f.write(f"---\nkind: Deployment\nmetadata:\n  name: svc{i}\n")
+            f.write("spec:\n  replicas: 1\n")
+    git("add", ".")
+    git("commit", "-q", "-m", "init")
+    git("push", "-q", "origin", "main")
+    return repo
+
+
+def run_backend(backend_class, args):
+    root = tempfile.mkdtemp()
+    try:
+        repo = make_repo(root, args.manifest_docs)
+        backend = backend_class(repo, "origin", "main")
+        backend.ensure_setup()
+        latencies = []
+        for i in range(args.iterations):
+            start = time.perf_counter()
+            if backend.dirty_paths():
+                raise RuntimeError("working copy unexpectedly dirty")
+            with open(os.path.join(repo, MANIFEST), "a") as f:
+                f.write(f"# remediation {i}\n")
+            backend.commit([MANIFEST], f"ai-remediation(scale): svc{i}")
+            backend.push()
+            latencies.append((time.perf_counter() - start) * 1000)
+        return np.percentile(latencies, 50), np.percentile(latencies, 95)
+    finally:
+        shutil.rmtree(root)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GitOps git backend benchmark")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--manifest-docs", type=int, default=50)
+    parser.add_argument("--backends", default="legacy,subprocess,dulwich")
+    args = parser.parse_args()
+
+    if shutil.which("git") is None:
+        print("[!] git not installed.")
+        sys.exit(1)
+
+    backends = {
+        "legacy": LegacyGitBackend,
+        "subprocess": SubprocessGitBackend,
+        "dulwich": DulwichGitBackend,
+    }
+
+    print("\n| Backend | p50 (ms) | p95 (ms) |")
+    print("|---------|----------|----------|")
+    for name in args.backends.split(","):
+        try:
+            p50, p95 = run_backend(backends[name], args)
+        except ImportError:
+            print(f"| {name} | not installed (pip install dulwich) | |")
+            continue
+        print(f"| {name} | {p50:.1f} | {p95:.1f} |")
+
+
+if __name__ == "__main__":
+    main()
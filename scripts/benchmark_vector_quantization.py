@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark compressed embedding storage against the float32 HNSW baseline.
+
+Reports, per VECTOR_QUANTIZATION mode: resident index bytes per vector,
+recall@k against exact brute-force search, and query latency (p50/p95)
+including the exact float re-rank step used by the FAISS backend.
+
+Usage:
+  python3 scripts/benchmark_vector_quantization.py --vectors 100000 --k 3
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(
+    0,
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../components/ai-agent")),
+)
+
+from vector_quantization import (  # noqa: E402
+    build_faiss_index,
+    exact_rerank,
+    normalize,
+    to_index_space,
+)
+
+
+def synthetic_embeddings(n, centers, noise, rng):
+    """Clustered unit vectors: recurring incidents sit close together."""
+    labels = rng.integers(0, len(centers), n)
+    jitter = rng.standard_normal((n, centers.shape[1])) / np.sqrt(centers.shape[1])
+    return normalize(centers[labels] + noise * jitter)
+
+
+def ground_truth(data, queries, k):
+    scores = queries @ data.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def run_mode(faiss, mode, data, queries, truth, args):
+    index = build_faiss_index(faiss, data.shape[1], args.hnsw_m, mode, args.pq_m)
+    if not index.is_trained:
+        sample = data[np.random.default_rng(1).permutation(len(data))[: args.train]]
+        index.train(np.ascontiguousarray(sample))
+    index.add(to_index_space(data, mode))
+
+    latencies, found = [], []
+    for q in queries:
+        start = time.perf_counter()
+        if mode == "none":
+            _, ids = index.search(q[None, :], args.k)
+            result = [int(i) for i in ids[0]]
+        else:
+            _, ids = index.search(
+                to_index_space(q[None, :], mode), args.k * args.rerank
+            )
+            result = [i for i, _ in exact_rerank(q, ids[0], data, args.k)]
+        latencies.append((time.perf_counter() - start) * 1000)
+        found.append(result)
+
+    recall = np.mean(
+        [len(set(f) & set(t)) / args.k for f, t in zip(found, truth.tolist())]
+    )
+    bytes_per_vector = faiss.serialize_index(index).nbytes / len(data)
+    return (
+        bytes_per_vector,
+        recall,
+        np.percentile(latencies, 50),
+        np.percentile(latencies, 95),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector quantization benchmark")
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--pq-m", type=int, default=48)
+    parser.add_argument("--train", type=int, default=10000)
+    parser.add_argument("--rerank", type=int, default=4, help="Re-rank factor")
+    parser.add_argument("--noise", type=float, default=1.0, help="Cluster spread")
+    parser.add_argument("--modes", default="none,int8,pq")
+    args = parser.parse_args()
+
+    try:
+        import faiss
+    except ImportError:
+        print("[!] faiss not installed. Run: pip install faiss-cpu")
+        sys.exit(1)
+
+    print(f"[*] Generating {args.vectors} x {args.dim} synthetic embeddings...")
+    rng = np.random.default_rng(0)
+    centers = normalize(rng.standard_normal((max(args.vectors // 50, 1), args.dim)))
+    data = synthetic_embeddings(args.vectors, centers, args.noise, rng)
+    queries = synthetic_embeddings(args.queries, centers, args.noise, rng)
+    truth = ground_truth(data, queries, args.k)
+
+    print(f"\n| Mode | Bytes/vector | Recall@{args.k} | p50 (ms) | p95 (ms) |")
+    print("|------|--------------|----------|----------|----------|")
+    for mode in args.modes.split(","):
+        bpv, recall, p50, p95 = run_mode(faiss, mode, data, queries, truth, args)
+        print(f"| {mode} | {bpv:.0f} | {recall:.3f} | {p50:.2f} | {p95:.2f} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,16 @@
 #!/usr/bin/env python3
 import os
+import sys
 import json
 import re
+import argparse
+
+sys.path.insert(
+    0,
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../components/ai-agent")),
+)
+
+from post_mortem_archive import PostMortemArchive  # noqa: E402
 
 # Paths
 POST_MORTEMS_DIR = "post-mortems"
@@ -37,25 +46,28 @@ def extract_qa_from_markdown(content):
     return input_text, output_text
 
 def main():
-    print(f"[*] Generating training dataset from {POST_MORTEMS_DIR} and Bootstrap Library...")
+    parser = argparse.ArgumentParser(description="Build the fine-tuning dataset")
+    parser.add_argument("--source-dir", default=POST_MORTEMS_DIR)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    args = parser.parse_args()
+
+    print(f"[*] Generating training dataset from {args.source_dir} and Bootstrap Library...")
     dataset = BOOTSTRAP_LIBRARY.copy() # Start with expert knowledge
     
-    if os.path.exists(POST_MORTEMS_DIR):
-        for filename in os.listdir(POST_MORTEMS_DIR):
-            if filename.endswith(".md"):
-                with open(os.path.join(POST_MORTEMS_DIR, filename), "r") as f:
-                    content = f.read()
-                    inp, outp = extract_qa_from_markdown(content)
-                    if inp and outp:
-                        dataset.append({"input": inp[:1000], "output": outp[:1000]})
+    if os.path.exists(args.source_dir):
+        # Streams the archived segments and the loose post-mortems
+        for pm in PostMortemArchive(args.source_dir).iter_post_mortems():
+            inp, outp = extract_qa_from_markdown(pm.content)
+            if inp and outp:
+                dataset.append({"input": inp[:1000], "output": outp[:1000]})
     else:
-        print(f"⚠️ Warning: {POST_MORTEMS_DIR} not found. Using Bootstrap Library only.")
+        print(f"⚠️ Warning: {args.source_dir} not found. Using Bootstrap Library only.")
     
     if dataset:
-        with open(OUTPUT_FILE, "w") as f:
+        with open(args.output, "w") as f:
             for entry in dataset:
                 f.write(json.dumps(entry) + "\n")
-        print(f"✅ Generated {len(dataset)} training examples in {OUTPUT_FILE}")
+        print(f"✅ Generated {len(dataset)} training examples in {args.output}")
     else:
         print("❌ No valid training pairs found in post-mortems.")
 
@@ -92,6 +92,25 @@ class TestAiAgent(unittest.TestCase):
         # Check if the body contains the correct replica count
         args, kwargs = mock_patch.call_args
         self.assertEqual(kwargs['body']['spec']['replicas'], 5)
+    @patch('ai_agent.get_target_type')
+    @patch('ai_agent.k8s_apps_v1.patch_namespaced_deployment')
+    @patch('ai_agent.gitops_remediate')
+    def test_execute_remediation_pending_gitops_commit(self, mock_gitops, mock_patch, mock_get_type):
+        """A GitOps commit still in flight must not be doubled by a direct patch."""
+        mock_gitops.return_value = None
+        mock_get_type.return_value = ('deployment', MagicMock())
+
+        action = RemediationAction(
+            rca="Test RCA",
+            action="RESTART",
+            deployment="frontend",
+            namespace="online-boutique"
+        )
+        with patch.object(ai_agent, 'GITOPS_MODE', True):
+            result = ai_agent.execute_remediation(action)
+
+        self.assertIn("still committing", result)
+        self.assertFalse(mock_patch.called)
 
 if __name__ == '__main__':
     unittest.main()
@@ -3,6 +3,7 @@ Unit tests for Circuit Breaker pattern implementation
 """
 
 import unittest
+import asyncio
 import time
 import threading
 from unittest.mock import MagicMock, patch
@@ -15,7 +16,16 @@ sys.path.insert(
     os.path.abspath(os.path.join(os.path.dirname(__file__), "../components/ai-agent")),
 )
 
-from circuit_breaker import CircuitBreaker, CircuitBreakerOpenError, CircuitState
+from circuit_breaker import (
+    Bulkhead,
+    BulkheadFullError,
+    CircuitBreaker,
+    CircuitBreakerOpenError,
+    CircuitState,
+    RedisCircuitState,
+    SlidingWindow,
+    circuit_breaker,
+)
 
 
 class TestCircuitBreaker(unittest.TestCase):
@@ -194,6 +204,573 @@ class TestCircuitBreaker(unittest.TestCase):
         self.assertEqual(state["success_count"], 5)
 
 
+class TestSlidingWindow(unittest.TestCase):
+    """Test the time-bucketed outcome ring buffer"""
+
+    def test_counts_within_window(self):
+        window = SlidingWindow(window_size=10.0, buckets=5)
+        window.record(failed=True, slow=False, now=100.0)
+        window.record(failed=False, slow=True, now=103.0)
+        window.record(failed=False, slow=False, now=109.0)
+
+        self.assertEqual(window.snapshot(now=109.0), (3, 1, 1))
+
+    def test_old_buckets_expire(self):
+        window = SlidingWindow(window_size=10.0, buckets=5)
+        window.record(failed=True, slow=True, now=100.0)
+        window.record(failed=False, slow=False, now=105.0)
+
+        # Bucket [100, 102) has left the 10s window
+        self.assertEqual(window.snapshot(now=111.0), (1, 0, 0))
+        # Slot reuse resets the stale counts
+        window.record(failed=False, slow=False, now=110.5)
+        self.assertEqual(window.snapshot(now=110.5), (2, 0, 0))
+
+
+class TestSlidingWindowCircuitBreaker(unittest.TestCase):
+    """Test failure-rate and slow-call-rate tripping"""
+
+    def _cb(self, **overrides):
+        params = dict(
+            name="window_test",
+            fail_max=100,
+            reset_timeout=1.0,
+            window_size=60.0,
+            minimum_calls=4,
+            failure_rate_threshold=0.5,
+            slow_call_threshold=1.0,
+            slow_call_rate_threshold=0.5,
+        )
+        params.update(overrides)
+        return CircuitBreaker(**params)
+
+    def setUp(self):
+        self.clock = 1000.0
+        self.monotonic = patch("circuit_breaker.time.monotonic", lambda: self.clock)
+        self.monotonic.start()
+
+    def tearDown(self):
+        self.monotonic.stop()
+
+    def _run(self, cb, duration=0.0, fail=False):
+        """Execute one call that takes ``duration`` seconds on a fake clock"""
+
+        def func():
+            self.clock += duration
+            if fail:
+                raise Exception("test error")
+            return "ok"
+
+        try:
+            cb.execute(func)
+        except Exception:
+            pass
+
+    def test_trips_on_failure_rate_without_consecutive_failures(self):
+        cb = self._cb()
+        for fail in (True, False, True, False):
+            self._run(cb, fail=fail)
+
+        self.assertEqual(cb.state, CircuitState.OPEN)
+        self.assertEqual(cb.failure_count, 0)
+
+    def test_trips_on_slow_calls_that_succeed(self):
+        cb = self._cb()
+        for duration in (0.1, 5.0, 0.1, 5.0):
+            self._run(cb, duration=duration)
+
+        self.assertEqual(cb.state, CircuitState.OPEN)
+        self.assertEqual(cb.get_state()["window"]["slow_call_rate"], 0.5)
+
+    def test_respects_minimum_calls(self):
+        cb = self._cb()
+        for _ in range(3):
+            self._run(cb, duration=5.0)
+
+        self.assertEqual(cb.state, CircuitState.CLOSED)
+
+    def test_healthy_traffic_stays_closed(self):
+        cb = self._cb()
+        for fail in (False, False, True, False, False):
+            self._run(cb, fail=fail)
+
+        self.assertEqual(cb.state, CircuitState.CLOSED)
+        self.assertEqual(cb.get_state()["window"]["calls"], 5)
+
+    def test_slow_half_open_probe_reopens(self):
+        cb = self._cb()
+        cb.state = CircuitState.HALF_OPEN
+
+        self._run(cb, duration=5.0)
+
+        self.assertEqual(cb.state, CircuitState.OPEN)
+
+    def test_recovery_clears_window(self):
+        cb = self._cb()
+        for _ in range(4):
+            self._run(cb, duration=5.0)
+        cb.state = CircuitState.HALF_OPEN
+
+        self._run(cb, duration=0.1)
+
+        self.assertEqual(cb.state, CircuitState.CLOSED)
+        self.assertEqual(cb.get_state()["window"]["calls"], 1)
+
+    def test_count_mode_has_no_window(self):
+        cb = CircuitBreaker(name="count_test", fail_max=3)
+        self.assertIsNone(cb.window)
+        self.assertNotIn("window", cb.get_state())
+
+
+class TestAsyncCircuitBreaker(unittest.TestCase):
+    """Test coroutine support (execute_async, decorator, guard)"""
+
+    def setUp(self):
+        self.cb = CircuitBreaker(name="async_test", fail_max=2, reset_timeout=60.0)
+
+    def test_execute_async_success_and_failure(self):
+        async def ok(x):
+            return x * 2
+
+        async def boom():
+            raise RuntimeError("down")
+
+        async def scenario():
+            self.assertEqual(await self.cb.execute_async(ok, 21), 42)
+            for _ in range(2):
+                with self.assertRaises(RuntimeError):
+                    await self.cb.execute_async(boom)
+            with self.assertRaises(CircuitBreakerOpenError):
+                await self.cb.execute_async(ok, 1)
+
+        asyncio.run(scenario())
+        self.assertEqual(self.cb.state, CircuitState.OPEN)
+
+    def test_async_fallback_is_awaited(self):
+        async def fallback():
+            return "cached"
+
+        cb = CircuitBreaker(name="async_fb", fail_max=1, fallback_function=fallback)
+        cb.state = CircuitState.OPEN
+        cb.last_failure_time = time.time()
+
+        result = asyncio.run(cb.execute_async(MagicMock()))
+
+        self.assertEqual(result, "cached")
+
+    def test_decorator_wraps_coroutines(self):
+        @circuit_breaker(name="decorated", fail_max=1)
+        async def call():
+            raise RuntimeError("down")
+
+        self.assertTrue(asyncio.iscoroutinefunction(call))
+        with self.assertRaises(RuntimeError):
+            asyncio.run(call())
+        self.assertEqual(call.circuit_breaker.state, CircuitState.OPEN)
+
+    def test_guard_records_outcomes(self):
+        async def scenario():
+            async with self.cb.guard():
+                await asyncio.sleep(0)
+            with self.assertRaises(RuntimeError):
+                async with self.cb.guard():
+                    raise RuntimeError("down")
+
+        asyncio.run(scenario())
+        self.assertEqual(self.cb.success_count, 0)
+        self.assertEqual(self.cb.failure_count, 1)
+
+        with self.cb.guard():
+            pass
+        self.assertEqual(self.cb.failure_count, 0)
+
+    def test_half_open_admits_one_task_at_a_time(self):
+        self.cb.state = CircuitState.OPEN
+        self.cb.last_failure_time = time.time() - 120
+        started = []
+
+        async def probe():
+            started.append(1)
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        async def scenario():
+            return await asyncio.gather(
+                *(self.cb.execute_async(probe) for _ in range(5)),
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(scenario())
+
+        self.assertEqual(len(started), 1)
+        self.assertEqual(results.count("ok"), 1)
+        self.assertEqual(
+            sum(isinstance(r, CircuitBreakerOpenError) for r in results), 4
+        )
+        self.assertEqual(self.cb.state, CircuitState.CLOSED)
+
+    def test_cancelled_probe_frees_half_open_slot(self):
+        self.cb.state = CircuitState.HALF_OPEN
+
+        async def hang():
+            await asyncio.sleep(10)
+
+        async def scenario():
+            task = asyncio.create_task(self.cb.execute_async(hang))
+            await asyncio.sleep(0)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            return await self.cb.execute_async(asyncio.sleep, 0, "ok")
+
+        self.assertEqual(asyncio.run(scenario()), "ok")
+        self.assertEqual(self.cb.state, CircuitState.CLOSED)
+
+
+class TestBulkhead(unittest.TestCase):
+    """Test concurrency limits shared by threads and tasks"""
+
+    def test_sheds_immediately_without_wait_time(self):
+        bulkhead = Bulkhead("shed", max_concurrent_calls=1, max_wait_time=0)
+        with bulkhead:
+            with self.assertRaises(BulkheadFullError):
+                bulkhead.acquire()
+        self.assertEqual(bulkhead.get_state()["rejected"], 1)
+        self.assertEqual(bulkhead.get_state()["in_flight"], 0)
+
+    def test_threads_never_exceed_limit(self):
+        bulkhead = Bulkhead("threads", max_concurrent_calls=2, max_wait_time=5.0)
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def work():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.01)
+            with lock:
+                active[0] -= 1
+
+        threads = [
+            threading.Thread(target=bulkhead.execute, args=(work,)) for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        state = bulkhead.get_state()
+        self.assertEqual(peak[0], 2)
+        self.assertEqual(state["accepted"], 8)
+        self.assertGreater(state["queued"], 0)
+        self.assertGreater(state["max_wait_ms"], 0)
+        self.assertEqual(state["in_flight"], 0)
+
+    def test_waiting_thread_times_out(self):
+        bulkhead = Bulkhead("timeout", max_concurrent_calls=1, max_wait_time=0.05)
+        with bulkhead:
+            started = time.monotonic()
+            with self.assertRaises(BulkheadFullError):
+                bulkhead.acquire()
+            self.assertGreaterEqual(time.monotonic() - started, 0.04)
+        self.assertEqual(bulkhead.get_state()["waiting"], 0)
+
+    def test_tasks_queue_and_shed(self):
+        bulkhead = Bulkhead("tasks", max_concurrent_calls=2, max_wait_time=0.05)
+
+        async def work(seconds):
+            await asyncio.sleep(seconds)
+            return seconds
+
+        async def scenario():
+            return await asyncio.gather(
+                bulkhead.execute_async(work, 0.2),
+                bulkhead.execute_async(work, 0.01),
+                bulkhead.execute_async(work, 0.01),
+                bulkhead.execute_async(work, 0.2),
+                bulkhead.execute_async(work, 0.01),
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(scenario())
+
+        # Short calls free a slot in time for the queued ones; the fifth call
+        # is still queued behind two 0.2s calls when its wait expires
+        self.assertEqual(results[:4], [0.2, 0.01, 0.01, 0.2])
+        self.assertIsInstance(results[4], BulkheadFullError)
+        self.assertEqual(bulkhead.get_state()["in_flight"], 0)
+
+    def test_threads_and_tasks_share_permits(self):
+        bulkhead = Bulkhead("mixed", max_concurrent_calls=1, max_wait_time=0.02)
+        bulkhead.acquire()
+
+        async def scenario():
+            with self.assertRaises(BulkheadFullError):
+                async with bulkhead:
+                    pass
+            threading.Timer(0.01, bulkhead.release).start()
+            bulkhead.max_wait_time = 2.0
+            async with bulkhead:
+                return bulkhead.get_state()["in_flight"]
+
+        self.assertEqual(asyncio.run(scenario()), 1)
+        self.assertEqual(bulkhead.get_state()["in_flight"], 0)
+
+    def test_cancelled_waiter_leaves_queue(self):
+        bulkhead = Bulkhead("cancel", max_concurrent_calls=1, max_wait_time=5.0)
+
+        async def scenario():
+            await bulkhead.acquire_async()
+            waiter = asyncio.create_task(bulkhead.acquire_async())
+            await asyncio.sleep(0.01)
+            waiter.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+            bulkhead.release()
+
+        asyncio.run(scenario())
+        state = bulkhead.get_state()
+        self.assertEqual((state["in_flight"], state["waiting"]), (0, 0))
+
+
+class TestCircuitBreakerWithBulkhead(unittest.TestCase):
+    """Test bulkheads attached to circuit breakers"""
+
+    def _cb(self, **kwargs):
+        return CircuitBreaker(
+            name="bulkheaded",
+            fail_max=1,
+            bulkhead=Bulkhead("bulkheaded", max_concurrent_calls=1),
+            **kwargs,
+        )
+
+    def test_shed_call_is_not_a_failure(self):
+        cb = self._cb()
+        cb.bulkhead.acquire()
+
+        with self.assertRaises(BulkheadFullError):
+            cb.execute(MagicMock())
+
+        self.assertEqual(cb.state, CircuitState.CLOSED)
+        self.assertEqual(cb.failure_count, 0)
+        self.assertEqual(cb.get_state()["bulkhead"]["rejected"], 1)
+
+    def test_shed_call_uses_fallback(self):
+        cb = self._cb(fallback_function=lambda: "fallback")
+        cb.bulkhead.acquire()
+
+        self.assertEqual(cb.execute(MagicMock()), "fallback")
+
+    def test_permit_released_after_failure(self):
+        cb = self._cb()
+
+        with self.assertRaises(RuntimeError):
+            cb.execute(MagicMock(side_effect=RuntimeError("down")))
+
+        self.assertEqual(cb.state, CircuitState.OPEN)
+        self.assertEqual(cb.bulkhead.get_state()["in_flight"], 0)
+
+    def test_shed_half_open_probe_frees_slot(self):
+        cb = self._cb()
+        cb.state = CircuitState.HALF_OPEN
+        cb.bulkhead.acquire()
+
+        with self.assertRaises(BulkheadFullError):
+            cb.execute(MagicMock())
+        cb.bulkhead.release()
+
+        self.assertEqual(cb.execute(MagicMock(return_value="ok")), "ok")
+        self.assertEqual(cb.state, CircuitState.CLOSED)
+
+    def test_async_guard_holds_permit(self):
+        cb = self._cb()
+
+        async def scenario():
+            async with cb.guard():
+                return cb.bulkhead.get_state()["in_flight"]
+
+        self.assertEqual(asyncio.run(scenario()), 1)
+        self.assertEqual(cb.bulkhead.get_state()["in_flight"], 0)
+
+
+class FakeSharedRedis:
+    """In-process Redis stand-in running the shared-state scripts in Python"""
+
+    def __init__(self):
+        self.hashes = {}
+        self.reads = 0
+        self.fail = False
+        self.on_call = None
+
+    def _round_trip(self):
+        if self.on_call is not None:
+            self.on_call()
+        if self.fail:
+            raise ConnectionError("redis down")
+
+    def hgetall(self, key):
+        self._round_trip()
+        self.reads += 1
+        return dict(self.hashes.get(key, {}))
+
+    def register_script(self, lua):
+        impl = {
+            RedisCircuitState.OPEN_SCRIPT: self._open,
+            RedisCircuitState.PROBE_SCRIPT: self._probe,
+            RedisCircuitState.CLOSE_SCRIPT: self._close,
+        }[lua]
+
+        def run(keys, args):
+            self._round_trip()
+            return impl(self.hashes.setdefault(keys[0], {}), *args)
+
+        return run
+
+    @staticmethod
+    def _open(h, opened_at, ttl):
+        if h.get("state") == "OPEN" and float(h["opened_at"]) >= opened_at:
+            return 0
+        h.update(state="OPEN", opened_at=str(opened_at), changed_at=str(opened_at))
+        h["probe_until"] = "0"
+        return 1
+
+    @staticmethod
+    def _probe(h, now, reset_timeout, lease):
+        if h.get("state") != "OPEN":
+            return 1
+        if now - float(h["opened_at"]) < reset_timeout:
+            return 0
+        if float(h.get("probe_until", 0)) > now:
+            return 0
+        h["probe_until"] = str(now + lease)
+        return 1
+
+    @staticmethod
+    def _close(h, opened_at, now, ttl):
+        if h.get("state") == "OPEN" and float(h["opened_at"]) > opened_at:
+            return 0
+        h.update(state="CLOSED", changed_at=str(now), probe_until="0")
+        return 1
+
+
+class TestSharedCircuitState(unittest.TestCase):
+    """Test circuit state shared across replicas"""
+
+    def setUp(self):
+        self.redis = FakeSharedRedis()
+        self.replicas = [self._replica() for _ in range(2)]
+
+    def _replica(self, cache_ttl=0.0):
+        shared = RedisCircuitState(self.redis, cache_ttl=cache_ttl)
+        return CircuitBreaker(
+            name="shared", fail_max=2, reset_timeout=0.05, shared_state=shared
+        )
+
+    def _trip(self, cb):
+        for _ in range(cb.fail_max):
+            with self.assertRaises(RuntimeError):
+                cb.execute(MagicMock(side_effect=RuntimeError("down")))
+
+    def test_one_replica_trips_the_fleet(self):
+        a, b = self.replicas
+        self._trip(a)
+
+        dependency = MagicMock()
+        with self.assertRaises(CircuitBreakerOpenError):
+            b.execute(dependency)
+        dependency.assert_not_called()
+        self.assertEqual(b.state, CircuitState.OPEN)
+
+    def test_only_one_replica_probes(self):
+        a, b = self.replicas
+        self._trip(a)
+        with self.assertRaises(CircuitBreakerOpenError):
+            b.execute(MagicMock())
+        time.sleep(0.06)
+
+        self.assertTrue(a._can_execute())
+        self.assertEqual(a.state, CircuitState.HALF_OPEN)
+        self.assertFalse(b._can_execute())
+        self.assertEqual(b.state, CircuitState.OPEN)
+
+    def test_recovery_propagates(self):
+        a, b = self.replicas
+        self._trip(a)
+        with self.assertRaises(CircuitBreakerOpenError):
+            b.execute(MagicMock())
+        time.sleep(0.06)
+
+        self.assertEqual(a.execute(MagicMock(return_value="ok")), "ok")
+        self.assertEqual(a.state, CircuitState.CLOSED)
+        self.assertEqual(b.execute(MagicMock(return_value="ok")), "ok")
+        self.assertEqual(b.state, CircuitState.CLOSED)
+
+    def test_failed_probe_reopens_fleet(self):
+        a, b = self.replicas
+        self._trip(a)
+        with self.assertRaises(CircuitBreakerOpenError):
+            b.execute(MagicMock())
+        time.sleep(0.06)
+
+        with self.assertRaises(RuntimeError):
+            a.execute(MagicMock(side_effect=RuntimeError("still down")))
+        self.assertEqual(a.state, CircuitState.OPEN)
+        # B adopts the newer opened_at, so its reset timer restarts too
+        self.assertFalse(b._can_execute())
+        self.assertEqual(b.last_failure_time, a.last_failure_time)
+
+    def test_reads_are_cached(self):
+        cb = self._replica(cache_ttl=60.0)
+        for _ in range(50):
+            cb.execute(MagicMock(return_value="ok"))
+
+        self.assertEqual(self.redis.reads, 1)
+
+    def test_round_trips_run_outside_the_lock(self):
+        a, b = self.replicas
+        self._trip(a)
+        time.sleep(0.06)
+        blocked = []
+
+        def check_lock():
+            # Another thread must be able to take the lock mid round trip
+            t = threading.Thread(target=b.get_state)
+            t.start()
+            t.join(timeout=1)
+            blocked.append(t.is_alive())
+
+        self.redis.on_call = check_lock
+        self.assertTrue(b._can_execute())
+        self.assertEqual(b.state, CircuitState.HALF_OPEN)
+        # One read of the shared state, one probe claim
+        self.assertEqual(blocked, [False, False])
+
+    def test_async_round_trips_run_off_the_event_loop(self):
+        a, b = self.replicas
+        self._trip(a)
+        time.sleep(0.06)
+        threads = []
+        self.redis.on_call = lambda: threads.append(threading.get_ident())
+
+        async def probe():
+            async with b.guard():
+                return threading.get_ident()
+
+        loop_thread = asyncio.run(probe())
+        self.assertEqual(b.state, CircuitState.CLOSED)
+        # Read, probe claim and the published recovery
+        self.assertEqual(len(threads), 3)
+        self.assertNotIn(loop_thread, threads)
+
+    def test_redis_outage_falls_back_to_local_state(self):
+        a, _ = self.replicas
+        self.redis.fail = True
+
+        self.assertEqual(a.execute(MagicMock(return_value="ok")), "ok")
+        self._trip(a)
+        self.assertEqual(a.state, CircuitState.OPEN)
+
+
 class TestCircuitBreakersConfig(unittest.TestCase):
     """Test pre-configured circuit breakers"""
 
@@ -220,6 +797,7 @@ class TestCircuitBreakersConfig(unittest.TestCase):
         for name, state in states.items():
             self.assertIn("state", state)
             self.assertIn("failure_count", state)
+            self.assertIn("bulkhead", state)
 
 
 if __name__ == "__main__":
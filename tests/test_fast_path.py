@@ -0,0 +1,253 @@
+"""
+Unit tests for fast-path remediation of known incidents
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(
+    0,
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../components/ai-agent")),
+)
+
+from fast_path import FastPathMatcher, parse_record, render_record, upsert_record
+
+ALERT = {
+    "alert_name": "PodCrashLooping",
+    "deployment": "cartservice",
+    "namespace": "online-boutique",
+}
+
+
+def _record(verified=True, timestamp="20260101-000000", action="RESTART"):
+    return {
+        "alert": dict(ALERT),
+        "action": {
+            "rca": "Redis connection pool exhausted",
+            "action": action,
+            "deployment": "cartservice",
+            "namespace": "online-boutique",
+        },
+        "result": "[Direct Patch ✅] RESTART applied to cartservice.",
+        "verified": verified,
+        "timestamp": timestamp,
+    }
+
+
+class TestRemediationRecord(unittest.TestCase):
+    def test_render_parse_roundtrip(self):
+        markdown = "# Post-Mortem: PodCrashLooping\n" + render_record(_record())
+        self.assertEqual(parse_record(markdown), _record())
+        self.assertIsNone(parse_record("# Runbook without a record\n"))
+
+    def test_upsert_replaces_record_and_keeps_prose(self):
+        runbook = "# Runbook: PodCrashLooping\n\n## Description\nCrash loop\n"
+        once = upsert_record(runbook, _record(timestamp="1"))
+        twice = upsert_record(once, _record(timestamp="2"))
+
+        self.assertIn("## Description\nCrash loop", twice)
+        self.assertEqual(twice.count("## Remediation Record"), 1)
+        self.assertEqual(parse_record(twice)["timestamp"], "2")
+
+
+class TestFastPathMatcher(unittest.TestCase):
+    def test_exact_match_on_verified_record(self):
+        matcher = FastPathMatcher()
+        matcher.remember(_record())
+
+        record, source = matcher.match(
+            "PodCrashLooping", "cartservice", "online-boutique", "ctx"
+        )
+        self.assertEqual(source, "record")
+        self.assertEqual(record["action"]["action"], "RESTART")
+        self.assertIsNone(
+            matcher.match("PodCrashLooping", "frontend", "online-boutique", "ctx")
+        )
+        self.assertEqual(matcher.get_stats()["misses"], 1)
+
+    def test_unverified_outcome_retires_known_fix(self):
+        matcher = FastPathMatcher()
+        matcher.remember(_record())
+        matcher.remember(_record(verified=False, timestamp="20260102-000000"))
+
+        self.assertIsNone(
+            matcher.match("PodCrashLooping", "cartservice", "online-boutique", "ctx")
+        )
+
+    def test_retired_fix_is_not_relearned_from_rag(self):
+        rag = MagicMock()
+        rag.query_similar_incidents.return_value = [
+            MagicMock(similarity=0.99, content=render_record(_record()))
+        ]
+        matcher = FastPathMatcher(rag, min_similarity=0.9)
+        matcher.remember(_record(verified=False, timestamp="20260102-000000"))
+
+        self.assertIsNone(
+            matcher.match("PodCrashLooping", "cartservice", "online-boutique", "ctx")
+        )
+        # A fix verified after the retirement is replayed again
+        self.assertTrue(matcher.remember(_record(timestamp="20260103-000000")))
+        self.assertIsNotNone(
+            matcher.match("PodCrashLooping", "cartservice", "online-boutique", "ctx")
+        )
+
+    def test_older_record_does_not_replace_newer(self):
+        matcher = FastPathMatcher()
+        matcher.remember(_record(timestamp="2", action="SCALE"))
+        matcher.remember(_record(timestamp="1", action="RESTART"))
+
+        record, _ = matcher.match(
+            "PodCrashLooping", "cartservice", "online-boutique", "ctx"
+        )
+        self.assertEqual(record["action"]["action"], "SCALE")
+
+    def test_similar_post_mortem_from_rag(self):
+        rag = MagicMock()
+        rag.query_similar_incidents.return_value = [
+            MagicMock(similarity=0.99, content="# unrelated"),
+            MagicMock(similarity=0.80, content=render_record(_record(action="SCALE"))),
+            MagicMock(similarity=0.95, content=render_record(_record())),
+        ]
+        matcher = FastPathMatcher(rag, min_similarity=0.9)
+
+        record, source = matcher.match(
+            "PodCrashLooping", "cartservice", "online-boutique", "ctx"
+        )
+        self.assertEqual(
+            (source, record["action"]["action"]), ("post_mortem", "RESTART")
+        )
+        # Cached for the next occurrence
+        self.assertEqual(matcher.get_stats()["known_incidents"], 1)
+
+    def test_load_dir_replays_in_timestamp_order(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            for name, record in (
+                (
+                    "20260102-000000-PodCrashLooping.md",
+                    _record(verified=False, timestamp="20260102-000000"),
+                ),
+                ("20260101-000000-PodCrashLooping.md", _record()),
+                ("notes.txt", _record()),
+            ):
+                with open(os.path.join(tmp, name), "w") as f:
+                    f.write("# Post-Mortem\n" + render_record(record))
+
+            matcher = FastPathMatcher()
+            self.assertEqual(matcher.load_dir(tmp), 2)
+            self.assertEqual(matcher.get_stats()["known_incidents"], 0)
+            self.assertEqual(matcher.load_dir(os.path.join(tmp, "missing")), 0)
+        finally:
+            shutil.rmtree(tmp)
+
+
+class TestAgentFastPath(unittest.TestCase):
+    def setUp(self):
+        import ai_agent
+
+        self.agent = ai_agent
+        self.matcher = FastPathMatcher()
+        self.patches = [
+            patch.object(ai_agent, "_fast_path", self.matcher),
+            patch.object(
+                ai_agent, "execute_remediation", return_value="[Direct Patch ✅] ok"
+            ),
+            patch.object(
+                ai_agent, "verify_rollout", return_value=ai_agent._resolved(True)
+            ),
+            patch.object(ai_agent, "handle_autonomous_lifecycle"),
+            patch.object(ai_agent, "_audit_executor"),
+            patch.object(
+                ai_agent,
+                "_lifecycle_executor",
+                MagicMock(submit=lambda fn, *args, **kwargs: fn(*args, **kwargs)),
+            ),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+
+    def _try(self):
+        return self.agent.try_fast_path(
+            "PodCrashLooping", {}, {}, "ctx", "cartservice", "online-boutique"
+        )
+
+    def test_known_incident_skips_llm_and_queues_audit(self):
+        self.matcher.remember(_record())
+        self.assertTrue(self._try())
+
+        self.agent.execute_remediation.assert_called_once()
+        kwargs = self.agent.handle_autonomous_lifecycle.call_args.kwargs
+        self.assertTrue(kwargs["verified"])
+        self.assertEqual(kwargs["source"], "fast-path (record)")
+        self.agent._audit_executor.submit.assert_called_once()
+
+    @patch("ai_agent.run_llm_pipeline")
+    @patch("ai_agent.set_debounce")
+    @patch("ai_agent.is_debounced", return_value=False)
+    def test_resolved_alert_is_not_remediated(self, _, set_debounce, run_llm):
+        self.matcher.remember(_record())
+        labels = {
+            "alertname": "PodCrashLooping",
+            "deployment": "cartservice",
+            "namespace": "online-boutique",
+        }
+        with patch.object(self.agent.agent_config.config.fast_path, "enabled", True):
+            self.agent.process_alert_background(
+                {"status": "resolved", "labels": labels}
+            )
+            self.agent.execute_remediation.assert_not_called()
+            run_llm.assert_not_called()
+            set_debounce.assert_not_called()
+
+            self.agent.process_alert_background({"status": "firing", "labels": labels})
+        self.agent.execute_remediation.assert_called_once()
+
+    def test_unsafe_replay_falls_back_to_llm(self):
+        record = _record()
+        record["action"]["namespace"] = "kube-system"
+        self.matcher.remember(record)
+
+        self.assertFalse(self._try())
+        self.agent.execute_remediation.assert_not_called()
+
+    @patch("ai_agent.run_llm_pipeline")
+    def test_disagreeing_audit_forgets_record(self, run_llm):
+        self.matcher.remember(_record())
+        replayed = self.agent.RemediationAction(**_record()["action"])
+        run_llm.return_value = replayed.model_copy(update={"action": "ROLLBACK"})
+
+        repo = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, repo)
+        with patch.object(self.agent, "GIT_REPO_DIR", repo), patch.object(
+            self.agent, "_persistence", None
+        ), patch.object(self.agent, "_rag_pipeline", None):
+            self.agent._audit_fast_path(
+                "PodCrashLooping", "ctx", "cartservice", "online-boutique", replayed
+            )
+        self.assertEqual(self.matcher.get_stats()["audits_disagreed"], 1)
+        self.assertFalse(self._try())
+
+        # The retirement is in the runbook: a restarted agent that reloads the
+        # old verified post-mortem and then the runbooks does not replay it
+        pm_dir = os.path.join(repo, "post-mortems")
+        os.makedirs(pm_dir, exist_ok=True)
+        with open(os.path.join(pm_dir, "20260101-000000-PodCrashLooping.md"), "w") as f:
+            f.write(render_record(_record()))
+        restarted = FastPathMatcher()
+        restarted.load_dir(pm_dir)
+        restarted.load_dir(os.path.join(repo, "runbooks"))
+        self.assertIsNone(
+            restarted.match("PodCrashLooping", "cartservice", "online-boutique", "ctx")
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,222 @@
+"""
+Unit tests for the GitOps git backends
+"""
+
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(
+    0,
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../components/ai-agent")),
+)
+
+from git_backend import (
+    DulwichGitBackend,
+    GitBackend,
+    GitError,
+    SubprocessGitBackend,
+    make_git_backend,
+)
+
+try:
+    import dulwich  # noqa: F401
+
+    DULWICH_AVAILABLE = True
+except ImportError:
+    DULWICH_AVAILABLE = False
+
+
+def _git(repo, *args):
+    return subprocess.run(
+        ["git", "-C", repo, *args], check=True, capture_output=True, text=True
+    ).stdout
+
+
+@unittest.skipUnless(shutil.which("git"), "git not installed")
+class GitBackendContract:
+    """Behaviour every backend must share; mixed into one TestCase per backend."""
+
+    backend_class = None
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.remote = os.path.join(self.tmp, "remote.git")
+        self.repo = os.path.join(self.tmp, "work")
+        subprocess.run(["git", "init", "-q", "--bare", self.remote], check=True)
+        subprocess.run(["git", "clone", "-q", self.remote, self.repo], check=True)
+        _git(self.repo, "checkout", "-q", "-b", "main")
+        _git(self.repo, "config", "user.email", "test@example.com")
+        _git(self.repo, "config", "user.name", "Test")
+        self._write("manifest.yaml", "replicas: 1\n")
+        _git(self.repo, "add", ".")
+        _git(self.repo, "commit", "-q", "-m", "init")
+        _git(self.repo, "push", "-q", "origin", "main")
+        self.backend = self.backend_class(self.repo, "origin", "main")
+        self.backend.ensure_setup()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _write(self, path, content):
+        with open(os.path.join(self.repo, path), "w") as f:
+            f.write(content)
+
+    def test_setup_sets_agent_identity(self):
+        self.assertEqual(_git(self.repo, "config", "user.name").strip(), "AI SRE Agent")
+
+    def test_dirty_paths(self):
+        self.assertEqual(self.backend.dirty_paths(), [])
+        self._write("manifest.yaml", "replicas: 2\n")
+        self._write("stray.txt", "x")
+        self.assertEqual(
+            sorted(self.backend.dirty_paths()), ["manifest.yaml", "stray.txt"]
+        )
+
+    def test_commit_and_push(self):
+        self._write("manifest.yaml", "replicas: 3\n")
+        self.backend.commit(["manifest.yaml"], "ai-remediation(scale): cart")
+        self.backend.push()
+
+        self.assertEqual(self.backend.dirty_paths(), [])
+        log = _git(self.remote, "log", "--format=%s|%an", "main").splitlines()
+        self.assertEqual(log[0], "ai-remediation(scale): cart|AI SRE Agent")
+        self.assertEqual(
+            _git(self.remote, "show", "main:manifest.yaml"), "replicas: 3\n"
+        )
+
+    def test_rejected_push_can_be_undone(self):
+        # Another writer advances the remote first
+        other = os.path.join(self.tmp, "other")
+        subprocess.run(
+            ["git", "clone", "-q", "-b", "main", self.remote, other], check=True
+        )
+        with open(os.path.join(other, "README"), "w") as f:
+            f.write("hi")
+        _git(other, "add", ".")
+        _git(other, "-c", "user.name=o", "-c", "user.email=o@x", "commit", "-qm", "o")
+        _git(other, "push", "-q", "origin", "HEAD:main")
+
+        head = _git(self.repo, "rev-parse", "HEAD")
+        self._write("manifest.yaml", "replicas: 4\n")
+        self.backend.commit(["manifest.yaml"], "ai-remediation(scale): cart")
+        with self.assertRaises(GitError):
+            self.backend.push()
+        self.backend.undo_commit()
+
+        self.assertEqual(_git(self.repo, "rev-parse", "HEAD"), head)
+        self.assertEqual(self.backend.dirty_paths(), ["manifest.yaml"])
+
+    def test_discard_restores_head_content(self):
+        self._write("manifest.yaml", "replicas: 6\n")
+        self.backend.commit(["manifest.yaml"], "ai-remediation(scale): cart")
+        self.backend.undo_commit()
+        self.backend.discard(["manifest.yaml"])
+
+        self.assertEqual(self.backend.dirty_paths(), [])
+        with open(os.path.join(self.repo, "manifest.yaml")) as f:
+            self.assertEqual(f.read(), "replicas: 1\n")
+
+    def _serve_remote(self):
+        """Serve the bare remote over git:// so its hooks run on push."""
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        daemon = subprocess.Popen(
+            [
+                "git",
+                "daemon",
+                "--export-all",
+                "--enable=receive-pack",
+                f"--base-path={self.tmp}",
+                "--listen=127.0.0.1",
+                f"--port={port}",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        self.addCleanup(daemon.wait)
+        self.addCleanup(daemon.terminate)
+        deadline = time.monotonic() + 5
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    self.skipTest("git daemon did not start")
+                time.sleep(0.05)
+        url = f"git://127.0.0.1:{port}/remote.git"
+        _git(self.repo, "remote", "set-url", "origin", url)
+
+    def test_push_declined_by_remote_hook_raises(self):
+        hook = os.path.join(self.remote, "hooks", "pre-receive")
+        with open(hook, "w") as f:
+            f.write("#!/bin/sh\necho 'protected branch' >&2\nexit 1\n")
+        os.chmod(hook, 0o755)
+        self._serve_remote()
+
+        head = _git(self.remote, "rev-parse", "main")
+        self._write("manifest.yaml", "replicas: 7\n")
+        self.backend.commit(["manifest.yaml"], "ai-remediation(scale): cart")
+        with self.assertRaises(GitError):
+            self.backend.push()
+        self.assertEqual(_git(self.remote, "rev-parse", "main"), head)
+
+    def test_head_and_changed_paths(self):
+        first = self.backend.head()
+        self._write("added.yaml", "kind: ConfigMap\n")
+        self._write("manifest.yaml", "replicas: 5\n")
+        self.backend.commit(["added.yaml", "manifest.yaml"], "two files")
+        second = self.backend.head()
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(_git(self.repo, "rev-parse", "HEAD").strip(), second)
+        self.assertEqual(
+            self.backend.changed_paths(first, second), ["added.yaml", "manifest.yaml"]
+        )
+        self.assertEqual(self.backend.changed_paths(second, second), [])
+
+
+class TestSubprocessGitBackend(GitBackendContract, unittest.TestCase):
+    backend_class = SubprocessGitBackend
+
+
+@unittest.skipUnless(DULWICH_AVAILABLE, "dulwich not installed")
+class TestDulwichGitBackend(GitBackendContract, unittest.TestCase):
+    backend_class = DulwichGitBackend
+
+    def test_rejection_reported_only_on_errstream_raises(self):
+        # dulwich < 0.22: push returns None and only writes the rejection
+        def push(repo, remote, refspec, outstream, errstream):
+            errstream.write(b"Push to origin successful.\n")
+            errstream.write(b"Push of ref refs/heads/main failed: hook declined\n")
+
+        with patch.object(self.backend._porcelain, "push", side_effect=push):
+            with self.assertRaisesRegex(GitError, "hook declined"):
+                self.backend.push()
+
+
+class TestMakeGitBackend(unittest.TestCase):
+    def test_backend_interface_is_abstract(self):
+        with self.assertRaises(TypeError):
+            GitBackend("/nonexistent", "origin", "main")
+
+    def test_explicit_subprocess(self):
+        backend = make_git_backend("subprocess", "/nonexistent", "origin", "main")
+        self.assertIsInstance(backend, SubprocessGitBackend)
+
+    def test_auto_prefers_dulwich_when_installed(self):
+        backend = make_git_backend("auto", "/nonexistent", "origin", "main")
+        expected = "dulwich" if DULWICH_AVAILABLE else "subprocess"
+        self.assertEqual(backend.name, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,292 @@
+"""
+Unit tests for batched GitOps commits
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import yaml
+
+sys.path.insert(
+    0,
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../components/ai-agent")),
+)
+
+import agent_config
+import ai_agent
+from ai_agent import RemediationAction
+from git_backend import GitError, SubprocessGitBackend
+from gitops_queue import GitOpsCommitQueue, PendingEdit
+from manifest_catalog import ManifestCatalog
+from manifest_editor import ManifestEditor
+from working_copy import WorkingCopy
+
+NS = "online-boutique"
+
+MANIFEST = """apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: cartservice
+spec:
+  replicas: 1
+---
+apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: paymentservice
+spec:
+  replicas: 1
+"""
+
+
+def _action(kind, name, replicas=None):
+    return RemediationAction(
+        rca="test", action=kind, deployment=name, namespace=NS, replicas=replicas
+    )
+
+
+class TestGitOpsCommitQueue(unittest.TestCase):
+    def test_concurrent_submissions_share_one_batch(self):
+        batches = []
+        queue = GitOpsCommitQueue(
+            lambda edits: batches.append(edits) or [True] * len(edits), window=0.2
+        )
+        futures = []
+        threads = [
+            threading.Thread(
+                target=lambda n=n: futures.append(queue.submit(n, NS, "SCALE"))
+            )
+            for n in ("cart", "payment", "frontend")
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertTrue(all(f.result(timeout=2) for f in futures))
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(
+            sorted(e.dep_name for e in batches[0]), ["cart", "frontend", "payment"]
+        )
+        self.assertEqual(queue.get_stats()["largest_batch"], 3)
+
+    def test_max_batch_splits(self):
+        sizes = []
+        queue = GitOpsCommitQueue(
+            lambda edits: sizes.append(len(edits)) or [True] * len(edits),
+            window=5,
+            max_batch=2,
+        )
+        futures = [queue.submit(f"dep{i}", NS, "RESTART") for i in range(4)]
+        for f in futures:
+            self.assertTrue(f.result(timeout=2))
+        self.assertEqual(sizes, [2, 2])
+
+    def test_per_action_outcomes_and_failures(self):
+        queue = GitOpsCommitQueue(
+            lambda edits: [e.dep_name != "missing" for e in edits]
+        )
+        ok = queue.submit("cart", NS, "SCALE")
+        missing = queue.submit("missing", NS, "SCALE")
+        self.assertTrue(ok.result(timeout=2))
+        self.assertFalse(missing.result(timeout=2))
+
+        def boom(edits):
+            raise RuntimeError("git exploded")
+
+        queue.commit_batch = boom
+        self.assertFalse(queue.submit("cart", NS, "SCALE").result(timeout=2))
+        self.assertEqual(queue.get_stats()["failed"], 2)
+
+    def test_cancelled_edits_are_not_committed(self):
+        started, release = threading.Event(), threading.Event()
+        batches = []
+
+        def commit(edits):
+            batches.append([e.dep_name for e in edits])
+            started.set()
+            release.wait()
+            return [True] * len(edits)
+
+        queue = GitOpsCommitQueue(commit, window=0)
+        in_flight = queue.submit("cart", NS, "SCALE")
+        self.assertTrue(started.wait(timeout=2))
+        abandoned = queue.submit("payment", NS, "SCALE")
+        kept = queue.submit("frontend", NS, "SCALE")
+
+        # Queued edits can be withdrawn, the one being committed cannot
+        self.assertTrue(abandoned.cancel())
+        self.assertFalse(in_flight.cancel())
+        release.set()
+
+        self.assertTrue(in_flight.result(timeout=2))
+        self.assertTrue(kept.result(timeout=2))
+        self.assertEqual(batches, [["cart"], ["frontend"]])
+        self.assertEqual(queue.get_stats()["cancelled"], 1)
+
+    def test_timed_out_remediation_withdraws_or_reports_unknown(self):
+        release = threading.Event()
+        queue = GitOpsCommitQueue(
+            lambda edits: release.wait() and [True] * len(edits), window=0
+        )
+        with patch.object(ai_agent, "_gitops_queue", queue), patch.object(
+            agent_config.config.gitops, "commit_timeout", 0.2
+        ):
+            # The first edit is taken into a commit, the second is still queued
+            self.assertIsNone(
+                ai_agent.gitops_remediate("cart", NS, _action("RESTART", "cart"))
+            )
+            self.assertFalse(
+                ai_agent.gitops_remediate("payment", NS, _action("RESTART", "payment"))
+            )
+        release.set()
+
+    def test_live_target_kind_reaches_the_batch(self):
+        kinds = []
+        queue = GitOpsCommitQueue(
+            lambda edits: kinds.extend(e.kind for e in edits) or [True] * len(edits),
+            window=0,
+        )
+        with patch.object(ai_agent, "_gitops_queue", queue):
+            ai_agent.gitops_remediate(
+                "frontend", NS, _action("RESTART", "frontend"), "rollout"
+            )
+            ai_agent.gitops_remediate("cart", NS, _action("RESTART", "cart"))
+        self.assertEqual(kinds, ["Rollout", None])
+
+
+@unittest.skipUnless(shutil.which("git"), "git not installed")
+class TestGitOpsCommitBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.remote = os.path.join(self.tmp, "remote.git")
+        self.repo = os.path.join(self.tmp, "work")
+        subprocess.run(["git", "init", "-q", "--bare", self.remote], check=True)
+        subprocess.run(["git", "clone", "-q", self.remote, self.repo], check=True)
+        self._git("checkout", "-q", "-b", "main")
+        self._git("config", "user.email", "test@example.com")
+        self._git("config", "user.name", "Test")
+        os.makedirs(os.path.join(self.repo, "apps"))
+        with open(os.path.join(self.repo, "apps", "manifests.yaml"), "w") as f:
+            f.write(MANIFEST)
+        self._git("add", ".")
+        self._git("commit", "-q", "-m", "init")
+        self._git("push", "-q", "origin", "main")
+
+        backend = SubprocessGitBackend(self.repo, "origin", "main")
+        self.patches = [
+            patch.object(ai_agent, "GIT_REPO_DIR", self.repo),
+            patch.object(ai_agent, "_git_backend", backend),
+            patch.object(
+                ai_agent,
+                "_manifest_catalog",
+                ManifestCatalog(self.repo, ["apps"], ManifestEditor(), backend),
+            ),
+            patch.object(ai_agent, "_working_copy", WorkingCopy(self.repo, "main")),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        shutil.rmtree(self.tmp)
+
+    def _git(self, *args, cwd=None):
+        return subprocess.run(
+            ["git", "-C", cwd or self.repo, *args],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+
+    def test_one_commit_for_the_whole_batch(self):
+        queue = GitOpsCommitQueue(ai_agent.gitops_commit_batch)
+        edits = [
+            queue.submit("cartservice", NS, _action("SCALE", "cartservice", 3)),
+            queue.submit("paymentservice", NS, _action("RESTART", "paymentservice")),
+            queue.submit("ghost", NS, _action("RESTART", "ghost")),
+        ]
+        self.assertEqual([f.result(timeout=30) for f in edits], [True, True, False])
+
+        log = self._git("log", "--format=%s", "main", cwd=self.remote).splitlines()
+        self.assertEqual(log, ["ai-remediation: 2 actions", "init"])
+        with open(os.path.join(self.repo, "apps", "manifests.yaml")) as f:
+            docs = {d["metadata"]["name"]: d for d in yaml.safe_load_all(f)}
+        self.assertEqual(docs["cartservice"]["spec"]["replicas"], 3)
+        self.assertIn(
+            "kubectl.kubernetes.io/restartedAt",
+            docs["paymentservice"]["spec"]["template"]["metadata"]["annotations"],
+        )
+
+    def test_dirty_manifest_fails_batch(self):
+        with open(os.path.join(self.repo, "apps", "manifests.yaml"), "a") as f:
+            f.write("# uncommitted\n")
+        edits = [PendingEdit("cartservice", NS, _action("SCALE", "cartservice", 2))]
+        self.assertEqual(ai_agent.gitops_commit_batch(edits), [False])
+
+    def test_post_mortems_in_the_tree_do_not_block_commits(self):
+        os.makedirs(os.path.join(self.repo, "post-mortems"))
+        with open(os.path.join(self.repo, "post-mortems", "pm.md"), "w") as f:
+            f.write("# Post-Mortem")
+        edits = [PendingEdit("cartservice", NS, _action("SCALE", "cartservice", 2))]
+        self.assertEqual(ai_agent.gitops_commit_batch(edits), [True])
+
+    def test_rejected_push_is_rebased_and_retried(self):
+        # Another writer pushes after our pre-commit sync
+        other = os.path.join(self.tmp, "other")
+        subprocess.run(
+            ["git", "clone", "-q", "-b", "main", self.remote, other], check=True
+        )
+        with open(os.path.join(other, "README.md"), "w") as f:
+            f.write("docs")
+        self._git("add", ".", cwd=other)
+        self._git(
+            "-c",
+            "user.name=o",
+            "-c",
+            "user.email=o@x",
+            "commit",
+            "-qm",
+            "docs",
+            cwd=other,
+        )
+        self._git("push", "-q", "origin", "main", cwd=other)
+
+        edits = [PendingEdit("cartservice", NS, _action("SCALE", "cartservice", 4))]
+        with patch.object(
+            ai_agent._working_copy, "sync", wraps=ai_agent._working_copy.sync
+        ) as sync, patch.object(
+            agent_config.config.gitops, "sync_before_commit", False
+        ):
+            self.assertEqual(ai_agent.gitops_commit_batch(edits), [True])
+        self.assertEqual(sync.call_count, 1)
+
+        log = self._git("log", "--format=%s", "main", cwd=self.remote).splitlines()
+        self.assertEqual(
+            log,
+            ["ai-remediation(scale): cartservice in online-boutique", "docs", "init"],
+        )
+
+    def test_failed_push_leaves_manifests_clean(self):
+        edits = [PendingEdit("cartservice", NS, _action("SCALE", "cartservice", 5))]
+        with patch.object(
+            ai_agent._git_backend, "push", side_effect=GitError("rejected")
+        ), patch.object(agent_config.config.gitops, "push_retries", 0):
+            self.assertEqual(ai_agent.gitops_commit_batch(edits), [False])
+
+        self.assertEqual(ai_agent._git_backend.dirty_paths(), [])
+        log = self._git("log", "--format=%s", "main").splitlines()
+        self.assertEqual(log, ["init"])
+        # The next batch is not blocked by leftovers of the failed one
+        self.assertEqual(ai_agent.gitops_commit_batch(edits), [True])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,299 @@
+"""
+Unit tests for embedding-model versioning and shadow index rebuilds
+"""
+
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+sys.path.insert(
+    0,
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../components/ai-agent")),
+)
+
+import agent_config
+from index_versioning import (
+    LEGACY_EMBED_MODEL,
+    collection_embed_model,
+    collection_name_for,
+    manifest_matches,
+    read_manifest,
+    write_manifest,
+)
+
+try:
+    import faiss  # noqa: F401
+
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+MODEL_DIMS = {"model-a": 64, "model-b": 32}
+
+
+class FakeSentenceTransformer:
+    """Bag-of-words embedder whose dimension and hashing depend on the model."""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.dim = MODEL_DIMS.get(model_name, 64)
+
+    def encode(self, texts):
+        out = np.zeros((len(texts), self.dim), dtype="float32")
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                salted = f"{self.model_name}:{word}".encode()
+                h = int(hashlib.md5(salted, usedforsecurity=False).hexdigest(), 16)
+                out[row, h % self.dim] += 1.0 if (h >> 8) & 1 else -1.0
+        return out
+
+
+class TestIndexVersioningHelpers(unittest.TestCase):
+    def test_legacy_model_keeps_original_collection(self):
+        self.assertEqual(collection_name_for(LEGACY_EMBED_MODEL), "post-mortems")
+
+    def test_collection_name_is_stable_and_chroma_safe(self):
+        name = collection_name_for("BAAI/bge-small-en-v1.5")
+        self.assertEqual(name, collection_name_for("BAAI/bge-small-en-v1.5"))
+        self.assertTrue(name.startswith("post-mortems-baai-bge-small-en-v1-5-"))
+        self.assertLessEqual(len(name), 63)
+        self.assertNotEqual(name, collection_name_for("BAAI/bge-base-en-v1.5"))
+
+    def test_collection_embed_model(self):
+        self.assertEqual(
+            collection_embed_model("post-mortems", None), LEGACY_EMBED_MODEL
+        )
+        self.assertEqual(
+            collection_embed_model("anything", {"embed_model": "model-b"}), "model-b"
+        )
+        self.assertIsNone(collection_embed_model("unrelated", {}))
+
+    def test_manifest_roundtrip(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            self.assertIsNone(read_manifest(tmp))
+            write_manifest(tmp, "model-a", 64)
+            manifest = read_manifest(tmp)
+            self.assertTrue(manifest_matches(manifest, "model-a", 64))
+            self.assertFalse(manifest_matches(manifest, "model-a", 32))
+            self.assertFalse(manifest_matches(manifest, "model-b", 64))
+        finally:
+            shutil.rmtree(tmp)
+
+
+@unittest.skipUnless(FAISS_AVAILABLE, "faiss not installed")
+class TestFAISSShadowRebuild(unittest.TestCase):
+    DOCS = [
+        "paymentservice OOMKilled memory leak in grpc handler",
+        "cartservice redis connection refused crash loop",
+        "checkoutservice certificate expired mtls handshake failure",
+    ]
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        module = types.ModuleType("sentence_transformers")
+        module.SentenceTransformer = FakeSentenceTransformer
+        self.modules = patch.dict(sys.modules, {"sentence_transformers": module})
+        self.modules.start()
+
+    def tearDown(self):
+        self.modules.stop()
+        shutil.rmtree(self.tmp)
+
+    def _backend(self, embed_model, quantization="none"):
+        from rag_unified import FAISSBackend
+
+        vector_config = agent_config.config.vector_store.model_copy(
+            update={
+                "embed_model": embed_model,
+                "vector_dim": MODEL_DIMS[embed_model],
+                "persist_directory": self.tmp,
+                "quantization": quantization,
+            }
+        )
+        with patch.object(agent_config.config, "vector_store", vector_config):
+            backend = FAISSBackend()
+        self.assertTrue(backend.is_available())
+        return backend
+
+    def _seed(self, embed_model, quantization="none"):
+        backend = self._backend(embed_model, quantization)
+        for i, doc in enumerate(self.DOCS):
+            self.assertTrue(backend.embed_document(doc, f"doc{i}", {"i": i}))
+        return backend
+
+    def test_matching_manifest_does_not_rebuild(self):
+        self._seed("model-a")
+
+        backend = self._backend("model-a")
+        self.assertFalse(backend.is_rebuilding())
+        self.assertIsNone(backend._rebuild_thread)
+
+    def test_model_change_serves_old_index_then_swaps(self):
+        self._seed("model-a")
+
+        with patch("rag_unified.threading.Thread") as thread:
+            backend = self._backend("model-b")
+        # Until the shadow index is ready, queries use the old model
+        self.assertEqual(backend.embed_model.model_name, "model-a")
+        self.assertEqual(backend.index.d, 64)
+        hit = backend.query("redis connection refused", n_results=1)[0]
+        self.assertEqual(hit.metadata["doc_id"], "doc1")
+
+        # A document arriving mid-rebuild must make it into the new index
+        backend.embed_document("frontend ingress latency", "doc3", {"i": 3})
+        thread.call_args.kwargs["target"](*thread.call_args.kwargs["args"])
+
+        self.assertEqual(backend.embed_model.model_name, "model-b")
+        self.assertEqual(backend.index.d, 32)
+        self.assertEqual(backend.index.ntotal, 4)
+        self.assertTrue(manifest_matches(read_manifest(self.tmp), "model-b", 32))
+        hit = backend.query("frontend ingress latency", n_results=1)[0]
+        self.assertEqual(hit.metadata["doc_id"], "doc3")
+
+        reloaded = self._backend("model-b")
+        self.assertFalse(reloaded.is_rebuilding())
+        self.assertEqual(reloaded.index.ntotal, 4)
+
+    def test_quantized_rebuild_replaces_exact_vectors(self):
+        self._seed("model-a", quantization="int8")
+
+        backend = self._backend("model-b", quantization="int8")
+        backend._rebuild_thread.join(timeout=10)
+
+        self.assertEqual(backend._vectors.dim, 32)
+        self.assertEqual(len(backend._vectors), len(self.DOCS))
+        self.assertFalse(os.path.exists(backend._vectors.path + ".rebuild"))
+        hit = backend.query("certificate expired", n_results=1)[0]
+        self.assertEqual(hit.metadata["doc_id"], "doc2")
+
+    def test_unversioned_index_is_treated_as_legacy(self):
+        self._seed("model-a")
+        os.remove(os.path.join(self.tmp, "index_manifest.json"))
+
+        with patch("rag_unified.threading.Thread"):
+            backend = self._backend("model-a")
+        self.assertEqual(backend.embed_model.model_name, LEGACY_EMBED_MODEL)
+
+
+class TestChromaShadowRebuild(unittest.TestCase):
+    def _collection(self, name, metadata, docs):
+        collection = MagicMock()
+        collection.name = name
+        collection.metadata = metadata
+        collection.docs = dict(docs)
+        collection.count.side_effect = lambda: len(collection.docs)
+
+        def get(ids=None, limit=None, offset=0, include=None, where=None):
+            keys = sorted(collection.docs) if ids is None else ids
+            keys = [k for k in keys if k in collection.docs]
+            if limit is not None:
+                keys = keys[offset : offset + limit]
+            return {
+                "ids": keys,
+                "documents": [collection.docs[k][0] for k in keys],
+                "metadatas": [collection.docs[k][1] for k in keys],
+            }
+
+        def upsert(ids, documents, metadatas):
+            for i, d, m in zip(ids, documents, metadatas):
+                collection.docs[i] = (d, m)
+
+        def add(ids, documents, metadatas):
+            upsert(ids, documents, metadatas)
+
+        collection.get.side_effect = get
+        collection.upsert.side_effect = upsert
+        collection.add.side_effect = add
+        return collection
+
+    def _backend(self, target):
+        from rag_unified import ChromaDBBackend
+
+        self.legacy = self._collection(
+            "post-mortems",
+            {"hnsw:space": "cosine"},
+            {f"doc{i}": (f"body {i}", {"i": i}) for i in range(5)},
+        )
+        client = MagicMock()
+        client.get_or_create_collection.return_value = target
+        client.list_collections.return_value = ["post-mortems", target.name]
+        client.get_collection.side_effect = lambda name, **kw: {
+            "post-mortems": self.legacy,
+            target.name: target,
+        }[name]
+        chromadb = types.ModuleType("chromadb")
+        chromadb.HttpClient = MagicMock(return_value=client)
+        chromadb_utils = types.ModuleType("chromadb.utils")
+        chromadb_utils.embedding_functions = MagicMock()
+        ef = chromadb_utils.embedding_functions.SentenceTransformerEmbeddingFunction
+        ef.return_value.side_effect = lambda texts: [[0.0] * 8 for _ in texts]
+        chromadb.utils = chromadb_utils
+
+        with patch.dict(
+            sys.modules, {"chromadb": chromadb, "chromadb.utils": chromadb_utils}
+        ), patch.dict(os.environ, {"EMBED_MODEL": "model-b"}), patch(
+            "rag_unified.threading.Thread"
+        ) as thread:
+            backend = ChromaDBBackend()
+        self.rebuild = lambda: thread.call_args.kwargs["target"](
+            *thread.call_args.kwargs["args"], page_size=2
+        )
+        return backend
+
+    def test_serves_legacy_collection_until_copy_completes(self):
+        target = self._collection(
+            "post-mortems-model-b",
+            {"hnsw:space": "cosine", "embed_model": "model-b"},
+            {},
+        )
+        backend = self._backend(target)
+
+        self.assertIs(backend.collection, self.legacy)
+        backend.embed_document("late arrival", "doc5", {"i": 5})
+        self.rebuild()
+
+        self.assertIs(backend.collection, target)
+        self.assertIsNone(backend._shadow)
+        self.assertEqual(sorted(target.docs), sorted(self.legacy.docs))
+        target.modify.assert_called_once_with(
+            metadata={"embed_model": "model-b", "build_complete": True, "vector_dim": 8}
+        )
+
+    def test_interrupted_copy_is_resumed_not_promoted(self):
+        # A restart stopped the copy after two documents
+        target = self._collection(
+            "post-mortems-model-b",
+            {"embed_model": "model-b"},
+            {"doc0": ("body 0", {"i": 0}), "doc1": ("body 1", {"i": 1})},
+        )
+        backend = self._backend(target)
+        self.assertIs(backend.collection, self.legacy)
+
+        self.rebuild()
+        self.assertIs(backend.collection, target)
+        self.assertEqual(sorted(target.docs), sorted(self.legacy.docs))
+        upserted = [i for c in target.upsert.call_args_list for i in c.kwargs["ids"]]
+        self.assertEqual(sorted(upserted), ["doc2", "doc3", "doc4"])
+
+    def test_completed_collection_is_served_directly(self):
+        target = self._collection(
+            "post-mortems-model-b",
+            {"embed_model": "model-b", "build_complete": True, "vector_dim": 8},
+            {"doc0": ("body 0", {"i": 0})},
+        )
+        backend = self._backend(target)
+        self.assertIs(backend.collection, target)
+        self.assertIsNone(backend._shadow)
+        target.modify.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
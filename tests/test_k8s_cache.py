@@ -0,0 +1,336 @@
+"""
+Unit tests for the informer-backed Deployment/Rollout cache
+"""
+
+import concurrent.futures
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+from kubernetes import client
+
+sys.path.insert(
+    0,
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../components/ai-agent")),
+)
+
+from k8s_cache import ClusterCache, ResourceInformer, RolloutVerifier, rollout_converged
+
+NS = "online-boutique"
+
+
+def _rollout(name, version):
+    return {"metadata": {"name": name, "resourceVersion": version}, "spec": {}}
+
+
+def _deployment(name, version):
+    dep = MagicMock()
+    dep.metadata.name = name
+    dep.metadata.resource_version = version
+    return dep
+
+
+class FakeWatch:
+    """Replays scripted event batches, one per stream() call."""
+
+    def __init__(self, batches, informer):
+        self.batches = batches
+        self.informer = informer
+        self.calls = []
+
+    def __call__(self):
+        return self
+
+    def stream(self, func, **kwargs):
+        self.calls.append(kwargs)
+        if not self.batches:
+            self.informer.stop()
+            return iter(())
+        batch = self.batches.pop(0)
+        if isinstance(batch, Exception):
+            raise batch
+        return iter(batch)
+
+
+class TestResourceInformer(unittest.TestCase):
+    def _informer(self, list_result, batches, **kwargs):
+        list_func = MagicMock(return_value=list_result)
+        informer = ResourceInformer("rollouts", list_func, [NS], **kwargs)
+        informer.watch_factory = FakeWatch(batches, informer)
+        informer.RETRY_SECONDS = 0
+        return informer, list_func
+
+    def test_list_then_watch_resumes_from_last_version(self):
+        listed = {
+            "metadata": {"resourceVersion": "100"},
+            "items": [_rollout("cart", "90")],
+        }
+        informer, list_func = self._informer(
+            listed,
+            [
+                [
+                    {"type": "ADDED", "object": _rollout("frontend", "101")},
+                    {
+                        "type": "BOOKMARK",
+                        "object": {"metadata": {"resourceVersion": "150"}},
+                    },
+                ],
+                [{"type": "DELETED", "object": _rollout("cart", "151")}],
+            ],
+            group="argoproj.io",
+        )
+        informer._run(NS)
+
+        self.assertTrue(informer.is_synced(NS))
+        self.assertIsNotNone(informer.get(NS, "frontend"))
+        self.assertIsNone(informer.get(NS, "cart"))
+        versions = [c["resource_version"] for c in informer.watch_factory.calls]
+        self.assertEqual(versions, ["100", "150", "151"])
+        # Reconnects resume the watch instead of relisting
+        list_func.assert_called_once_with(namespace=NS, group="argoproj.io")
+
+    def test_gone_triggers_relist(self):
+        listed = {"metadata": {"resourceVersion": "1"}, "items": []}
+        informer, list_func = self._informer(listed, [client.ApiException(status=410)])
+        informer._run(NS)
+        self.assertEqual(list_func.call_count, 2)
+        self.assertEqual(informer.relists, 2)
+
+    def test_error_event_with_410_relists(self):
+        listed = {"metadata": {"resourceVersion": "1"}, "items": []}
+        informer, list_func = self._informer(
+            listed, [[{"type": "ERROR", "object": {"code": 410, "message": "too old"}}]]
+        )
+        informer._run(NS)
+        self.assertEqual(list_func.call_count, 2)
+
+    def test_missing_crd_is_synced_empty(self):
+        list_func = MagicMock(side_effect=client.ApiException(status=404))
+        informer = ResourceInformer("rollouts", list_func, [NS])
+        informer.ABSENT_RETRY_SECONDS = 0
+        informer._stop.wait = lambda timeout: informer.stop()
+
+        informer._run(NS)
+        self.assertTrue(informer.is_synced(NS))
+        self.assertIsNone(informer.get(NS, "frontend"))
+
+
+class TestClusterCache(unittest.TestCase):
+    def setUp(self):
+        apps, custom = MagicMock(), MagicMock()
+        custom.list_namespaced_custom_object.return_value = {
+            "metadata": {"resourceVersion": "5"},
+            "items": [_rollout("frontend", "4")],
+        }
+        deployments = MagicMock()
+        deployments.metadata.resource_version = "7"
+        deployments.items = [_deployment("cartservice", "6")]
+        apps.list_namespaced_deployment.return_value = deployments
+        self.cache = ClusterCache(apps, custom, [NS])
+
+    def test_unsynced_namespace_falls_back_to_live(self):
+        self.assertIsNone(self.cache.get_target("frontend", NS))
+        self.assertEqual(self.cache.get_stats()["fallbacks"], 1)
+
+    def test_lookups_served_from_memory(self):
+        self.cache.rollouts._relist(NS)
+        self.assertIsNone(self.cache.get_target("frontend", NS))  # deployments pending
+        self.cache.deployments._relist(NS)
+
+        kind, obj = self.cache.get_target("frontend", NS)
+        self.assertEqual(kind, "rollout")
+        self.assertEqual(self.cache.get_target("cartservice", NS)[0], "deployment")
+        self.assertEqual(self.cache.get_target("ghost", NS), (None, None))
+        self.assertEqual(self.cache.get_stats()["hits"], 3)
+
+
+def _rollout_status(generation, observed, phase=None, **status):
+    obj = {
+        "metadata": {"name": "frontend", "generation": generation},
+        "spec": {"replicas": 3},
+        "status": {"observedGeneration": str(observed), **status},
+    }
+    if phase:
+        obj["status"]["phase"] = phase
+    return obj
+
+
+def _deployment_status(generation, observed, updated, total, ready, desired=3):
+    dep = _deployment("cartservice", "1")
+    dep.metadata.generation = generation
+    dep.spec.replicas = desired
+    dep.status.observed_generation = observed
+    dep.status.updated_replicas = updated
+    dep.status.replicas = total
+    dep.status.ready_replicas = ready
+    return dep
+
+
+class TestRolloutConverged(unittest.TestCase):
+    def test_deployment_waits_for_old_replicas_to_go(self):
+        self.assertFalse(
+            rollout_converged("deployments", _deployment_status(2, 1, 3, 3, 3))
+        )
+        self.assertFalse(
+            rollout_converged("deployments", _deployment_status(2, 2, 3, 4, 3))
+        )
+        self.assertFalse(
+            rollout_converged("deployments", _deployment_status(2, 2, 3, 3, 2))
+        )
+        self.assertTrue(
+            rollout_converged("deployments", _deployment_status(2, 2, 3, 3, 3))
+        )
+
+    def test_min_generation_rejects_pre_remediation_state(self):
+        healthy = _deployment_status(4, 4, 3, 3, 3)
+        self.assertFalse(rollout_converged("deployments", healthy, min_generation=5))
+        self.assertTrue(rollout_converged("deployments", healthy, min_generation=4))
+
+    def test_rollout_uses_phase_and_string_generation(self):
+        self.assertFalse(
+            rollout_converged("rollouts", _rollout_status(7, 6, "Healthy"))
+        )
+        self.assertFalse(
+            rollout_converged("rollouts", _rollout_status(7, 7, "Progressing"))
+        )
+        self.assertTrue(rollout_converged("rollouts", _rollout_status(7, 7, "Healthy")))
+        self.assertTrue(
+            rollout_converged(
+                "rollouts",
+                _rollout_status(7, 7, updatedReplicas=3, replicas=3, readyReplicas=3),
+            )
+        )
+
+
+class TestRolloutVerifier(unittest.TestCase):
+    def setUp(self):
+        self.cache = ClusterCache(MagicMock(), MagicMock(), [NS])
+        self.cache.deployments.synced.add(NS)
+        self.cache.rollouts.synced.add(NS)
+        self.verifier = RolloutVerifier(self.cache)
+
+    def _event(self, obj):
+        self.cache.deployments._apply(NS, {"type": "MODIFIED", "object": obj})
+
+    def test_resolves_when_watch_reports_convergence(self):
+        self._event(_deployment_status(5, 4, 1, 4, 3))
+        future = self.verifier.verify("cartservice", NS, timeout=30, min_generation=5)
+        self.assertFalse(future.done())
+
+        self._event(_deployment_status(5, 5, 3, 4, 3))
+        self.assertFalse(future.done())
+        self._event(_deployment_status(5, 5, 3, 3, 3))
+        self.assertTrue(future.result(timeout=1))
+        self.assertEqual(self.verifier.get_stats()["converged"], 1)
+
+    def test_already_converged_target_resolves_immediately(self):
+        self._event(_deployment_status(2, 2, 3, 3, 3))
+        self.assertTrue(self.verifier.verify("cartservice", NS).result(timeout=1))
+
+    def test_deadline_resolves_false(self):
+        future = self.verifier.verify("cartservice", NS, timeout=0.05)
+        self.assertFalse(future.result(timeout=5))
+        self.assertEqual(self.verifier.get_stats()["timed_out"], 1)
+        self.assertEqual(self.verifier.get_stats()["pending"], 0)
+
+    def test_many_verifications_share_one_event(self):
+        futures = [
+            self.verifier.verify("cartservice", NS, timeout=30) for _ in range(1000)
+        ]
+        self.assertEqual(self.verifier.get_stats()["pending"], 1000)
+        self._event(_deployment_status(3, 3, 3, 3, 3))
+        self.assertTrue(all(f.result(timeout=1) for f in futures))
+
+
+class TestGetTargetTypeUsesCache(unittest.TestCase):
+    def test_cached_target_skips_api(self):
+        import ai_agent
+
+        cache = MagicMock()
+        cache.get_target.return_value = ("deployment", "obj")
+        with patch.object(ai_agent, "_cluster_cache", cache), patch.object(
+            ai_agent.k8s_custom_api, "get_namespaced_custom_object"
+        ) as live:
+            self.assertEqual(
+                ai_agent.get_target_type("cartservice", NS), ("deployment", "obj")
+            )
+        live.assert_not_called()
+
+
+class TestVerifyRolloutTarget(unittest.TestCase):
+    def setUp(self):
+        import ai_agent
+
+        self.agent = ai_agent
+        self.generations = {}
+        self.patches = [
+            patch.object(ai_agent, "_patched_generations", self.generations),
+            patch.object(ai_agent, "_rollout_verifier", MagicMock()),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def test_without_target_generation_is_unverified(self):
+        self.assertFalse(self.agent.verify_rollout("cartservice", NS).result())
+        self.agent._rollout_verifier.verify.assert_not_called()
+
+    def test_alert_path_does_not_wait_for_convergence(self):
+        pending = concurrent.futures.Future()
+        self.agent._rollout_verifier.verify.return_value = pending
+        self.generations[(NS, "cartservice")] = 5
+        action = self.agent.RemediationAction(
+            rca="test", action="RESTART", deployment="cartservice", namespace=NS
+        )
+        recorded = concurrent.futures.Future()
+        with patch.object(
+            self.agent._cluster_cache, "is_synced", return_value=True
+        ), patch.object(
+            self.agent,
+            "handle_autonomous_lifecycle",
+            side_effect=lambda *a, **kw: recorded.set_result(kw["verified"]),
+        ):
+            self.agent.record_when_verified(
+                "HighMemory", {}, {}, action, "[GitOps ✅] committed", target=None
+            )
+            self.assertFalse(recorded.done())
+
+            pending.set_result(True)
+            self.assertTrue(recorded.result(timeout=5))
+
+    def test_failed_remediation_is_recorded_unverified(self):
+        action = self.agent.RemediationAction(
+            rca="test", action="RESTART", deployment="cartservice", namespace=NS
+        )
+        recorded = concurrent.futures.Future()
+        with patch.object(
+            self.agent,
+            "handle_autonomous_lifecycle",
+            side_effect=lambda *a, **kw: recorded.set_result(kw["verified"]),
+        ):
+            self.agent.record_when_verified(
+                "HighMemory", {}, {}, action, "Remediation failed"
+            )
+            self.assertFalse(recorded.result(timeout=5))
+        self.agent._rollout_verifier.verify.assert_not_called()
+
+    def test_gitops_remediation_waits_for_the_next_generation(self):
+        action = self.agent.RemediationAction(
+            rca="test", action="RESTART", deployment="cartservice", namespace=NS
+        )
+        current = {"metadata": {"name": "cartservice", "generation": 4}}
+        with patch.object(self.agent, "GITOPS_MODE", True), patch.object(
+            self.agent, "get_target_type", return_value=("rollout", current)
+        ), patch.object(self.agent, "gitops_remediate", return_value=True):
+            result = self.agent.execute_remediation(action)
+
+        self.assertIn("[GitOps ✅]", result)
+        self.assertEqual(self.generations, {(NS, "cartservice"): 5})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+"""
+Unit tests for the multi-file manifest catalog
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(
+    0,
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../components/ai-agent")),
+)
+
+from git_backend import SubprocessGitBackend
+from manifest_catalog import ManifestCatalog
+from manifest_editor import ManifestEditor
+
+NS = "online-boutique"
+
+
+def _deployment(name, namespace=None, kind="Deployment"):
+    ns = f"\n  namespace: {namespace}" if namespace else ""
+    return f"kind: {kind}\nmetadata:\n  name: {name}{ns}\nspec:\n  replicas: 1\n"
+
+
+@unittest.skipUnless(shutil.which("git"), "git not installed")
+class TestManifestCatalog(unittest.TestCase):
+    def setUp(self):
+        self.repo = tempfile.mkdtemp()
+        self._git("init", "-q")
+        self._git("config", "user.email", "test@example.com")
+        self._git("config", "user.name", "Test")
+        self._write(
+            "apps/online-boutique/kubernetes-manifests.yaml", _deployment("cart")
+        )
+        self._write(
+            "apps/online-boutique/rollouts/frontend.yaml",
+            _deployment("frontend", NS, kind="Rollout"),
+        )
+        self._write("other/payment.yaml", _deployment("payment"))
+        self._commit("init")
+        self.catalog = ManifestCatalog(
+            self.repo,
+            ["apps/online-boutique"],
+            ManifestEditor(),
+            SubprocessGitBackend(self.repo, "origin", "main"),
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.repo)
+
+    def _git(self, *args):
+        subprocess.run(["git", "-C", self.repo, *args], check=True, capture_output=True)
+
+    def _write(self, rel, content):
+        path = os.path.join(self.repo, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+
+    def _commit(self, message):
+        self._git("add", "-A")
+        self._git("commit", "-q", "-m", message)
+
+    def test_locates_workloads_across_files(self):
+        self.assertEqual(
+            self.catalog.locate(NS, "cart"),
+            ("apps/online-boutique/kubernetes-manifests.yaml", "Deployment"),
+        )
+        self.assertEqual(
+            self.catalog.locate(NS, "frontend"),
+            ("apps/online-boutique/rollouts/frontend.yaml", "Rollout"),
+        )
+        # Outside the search directories
+        self.assertIsNone(self.catalog.locate(NS, "payment"))
+        # Namespaced manifests only match their own namespace
+        self.assertIsNone(self.catalog.locate("staging", "frontend"))
+
+    def test_prefers_the_live_rollout_over_a_deleted_deployment(self):
+        # Upstream bundle keeps its Deployment; kustomize deletes it and the
+        # Rollout next to it is what runs
+        self._write(
+            "apps/online-boutique/kubernetes-manifests.yaml",
+            _deployment("cart") + "---\n" + _deployment("frontend"),
+        )
+        self._write(
+            "apps/online-boutique/kustomization.yaml",
+            "resources:\n  - kubernetes-manifests.yaml\n"
+            "patches:\n"
+            "  - target:\n      kind: Deployment\n      name: frontend\n"
+            "    patch: |-\n      $patch: delete\n      kind: Deployment\n"
+            "      metadata:\n        name: frontend\n",
+        )
+        self._commit("upstream frontend deployment")
+
+        rollout = ("apps/online-boutique/rollouts/frontend.yaml", "Rollout")
+        self.assertEqual(self.catalog.locate(NS, "frontend"), rollout)
+        self.assertEqual(self.catalog.locate(NS, "frontend", ("Rollout",)), rollout)
+        self.assertIsNone(self.catalog.locate(NS, "frontend", ("Deployment",)))
+        self.assertEqual(self.catalog.get_stats()["kustomize_deletions"], 1)
+
+        # Dropping the delete patch brings the Deployment back on refresh
+        os.remove(os.path.join(self.repo, "apps/online-boutique/kustomization.yaml"))
+        self._commit("keep the deployment")
+        self.catalog.refresh()
+        self.assertEqual(
+            self.catalog.locate(NS, "frontend", ("Deployment",)),
+            ("apps/online-boutique/kubernetes-manifests.yaml", "Deployment"),
+        )
+
+    def test_delete_patch_files_are_not_workloads(self):
+        self._write(
+            "apps/online-boutique/delete-cart.yaml",
+            "$patch: delete\nkind: Deployment\nmetadata:\n  name: checkout\n",
+        )
+        self._write(
+            "apps/online-boutique/kustomization.yaml",
+            "patchesStrategicMerge:\n  - delete-cart.yaml\n",
+        )
+        self._commit("delete patch file")
+        self.assertIsNone(self.catalog.locate(NS, "checkout"))
+        self.assertEqual(self.catalog.get_stats()["kustomize_deletions"], 1)
+
+    def test_refresh_reindexes_only_changed_files(self):
+        self.catalog.rebuild()
+        reindexed = self.catalog.get_stats()["files_reindexed"]
+
+        self._write("apps/online-boutique/checkout.yaml", _deployment("checkout"))
+        os.remove(
+            os.path.join(self.repo, "apps/online-boutique/rollouts/frontend.yaml")
+        )
+        self._commit("add checkout, drop frontend")
+        self.catalog.refresh()
+
+        stats = self.catalog.get_stats()
+        self.assertEqual(stats["full_scans"], 1)
+        self.assertEqual(stats["incremental_refreshes"], 1)
+        # The deleted file is only dropped, not re-read
+        self.assertEqual(stats["files_reindexed"], reindexed + 1)
+        self.assertEqual(
+            self.catalog.locate(NS, "checkout"),
+            ("apps/online-boutique/checkout.yaml", "Deployment"),
+        )
+        self.assertIsNone(self.catalog.locate(NS, "frontend"))
+
+    def test_refresh_is_free_when_head_is_unchanged(self):
+        self.catalog.rebuild()
+        self.catalog.refresh()
+        self.assertEqual(self.catalog.get_stats()["incremental_refreshes"], 0)
+
+    def test_without_git_falls_back_to_full_scan(self):
+        catalog = ManifestCatalog(self.repo, ["apps/online-boutique"], ManifestEditor())
+        catalog.rebuild()
+        self._write("apps/online-boutique/checkout.yaml", _deployment("checkout"))
+        catalog.refresh()
+        self.assertEqual(catalog.get_stats()["full_scans"], 2)
+        self.assertIsNotNone(catalog.locate(NS, "checkout"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+"""
+Unit tests for the indexed, formatting-preserving manifest editor
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import yaml
+
+sys.path.insert(
+    0,
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../components/ai-agent")),
+)
+
+from manifest_editor import ManifestEditor, edit_document, set_path
+
+RESTARTED_AT = ("spec", "template", "metadata", "annotations", "restartedAt")
+
+BUNDLE = """# Online Boutique bundle
+apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: cartservice  # owned by team-cart
+spec:
+  replicas: 1   # keep low in dev
+  selector:
+    matchLabels:
+      app: cartservice
+  template:
+    metadata:
+      labels:
+        app: cartservice
+    spec:
+      containers:
+      - name: server
+        image: "cart:1"
+---
+apiVersion: v1
+kind: Service
+metadata:
+  name: cartservice
+---
+apiVersion: apps/v1
+kind: Deployment
+metadata: {name: paymentservice}
+spec: {replicas: 1, template: {metadata: {labels: {app: payment}}}}
+"""
+
+
+class TestSetPath(unittest.TestCase):
+    def test_replaces_scalar_and_keeps_comment(self):
+        text = set_path("spec:\n  replicas: 1   # low\n", ("spec", "replicas"), 4)
+        self.assertEqual(text, "spec:\n  replicas: 4   # low\n")
+
+    def test_creates_missing_nested_keys(self):
+        text = set_path(
+            "spec:\n  template:\n    spec: {}\n", RESTARTED_AT, "2026-01-01T00:00:00Z"
+        )
+        doc = yaml.safe_load(text)
+        self.assertEqual(
+            doc["spec"]["template"]["metadata"]["annotations"]["restartedAt"],
+            "2026-01-01T00:00:00Z",
+        )
+        self.assertIn("    spec: {}", text)
+
+    def test_refuses_flow_style(self):
+        self.assertIsNone(set_path("spec: {replicas: 1}\n", ("spec", "replicas"), 2))
+
+    def test_flow_style_document_is_redumped(self):
+        text, redumped = edit_document(
+            "spec: {replicas: 1}\n", [(("spec", "replicas"), 2)]
+        )
+        self.assertTrue(redumped)
+        self.assertEqual(yaml.safe_load(text), {"spec": {"replicas": 2}})
+
+
+class TestManifestEditor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "kubernetes-manifests.yaml")
+        with open(self.path, "w") as f:
+            f.write(BUNDLE)
+        self.editor = ManifestEditor()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _read(self):
+        with open(self.path) as f:
+            return f.read()
+
+    def test_index_maps_kind_and_name(self):
+        index = self.editor.index(self.path)
+        doc = index.find("Deployment", "paymentservice")
+        self.assertIn("paymentservice", index.text[doc.start : doc.end])
+        self.assertIsNotNone(index.find("Service", "cartservice"))
+        self.assertIsNone(index.find("Deployment", "ghost"))
+
+    def test_index_is_cached_until_content_changes(self):
+        self.editor.index(self.path)
+        self.editor.index(self.path)
+        os.utime(self.path, ns=(1, 1))
+        self.editor.index(self.path)
+        self.assertEqual(self.editor.get_stats()["index_builds"], 1)
+
+        with open(self.path, "a") as f:
+            f.write("---\nkind: ConfigMap\nmetadata:\n  name: extra\n")
+        self.assertIsNotNone(self.editor.index(self.path).find("ConfigMap", "extra"))
+        self.assertEqual(self.editor.get_stats()["index_builds"], 2)
+
+    def test_edit_touches_only_target_lines(self):
+        results = self.editor.apply(
+            self.path,
+            [
+                ("Deployment", "cartservice", [(("spec", "replicas"), 3)]),
+                ("Deployment", "ghost", [(("spec", "replicas"), 3)]),
+            ],
+        )
+        self.assertEqual(results, [True, False])
+        self.assertEqual(
+            self._read(),
+            BUNDLE.replace("replicas: 1   # keep low", "replicas: 3   # keep low"),
+        )
+
+    def test_irregular_document_is_redumped_alone(self):
+        self.editor.apply(
+            self.path,
+            [("Deployment", "paymentservice", [(("spec", "replicas"), 2)])],
+        )
+        text = self._read()
+        # The cartservice document keeps its comments and layout
+        self.assertTrue(text.startswith(BUNDLE.split("---")[0]))
+        docs = [d for d in yaml.safe_load_all(text) if d]
+        self.assertEqual(docs[2]["spec"]["replicas"], 2)
+        self.assertEqual(self.editor.get_stats()["redumps"], 1)
+
+    def test_spans_follow_edits_without_reindexing(self):
+        self.editor.apply(
+            self.path,
+            [("Deployment", "cartservice", [(RESTARTED_AT, "2026-01-01T00:00:00Z")])],
+        )
+        self.editor.apply(
+            self.path,
+            [("Deployment", "paymentservice", [(("spec", "replicas"), 5)])],
+        )
+        self.assertEqual(self.editor.get_stats()["index_builds"], 1)
+
+        docs = [d for d in yaml.safe_load_all(self._read()) if d]
+        annotations = docs[0]["spec"]["template"]["metadata"]["annotations"]
+        self.assertEqual(annotations["restartedAt"], "2026-01-01T00:00:00Z")
+        self.assertEqual(docs[1]["kind"], "Service")
+        self.assertEqual(docs[2]["spec"]["replicas"], 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
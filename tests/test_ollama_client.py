@@ -0,0 +1,494 @@
+"""
+Unit tests for the Ollama client: shared retry budget and hedged requests
+"""
+
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+import requests
+
+sys.path.insert(
+    0,
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../components/ai-agent")),
+)
+
+import agent_config
+from circuit_breaker import CircuitBreaker, RetryBudget
+from ollama_client import (
+    EndpointPool,
+    LatencyTracker,
+    ModelResidency,
+    OllamaClient,
+    OllamaEndpoint,
+)
+
+PRIMARY = "http://ollama:11434/api/generate"
+SECONDARY = "http://ollama-2:11434"
+
+
+def _response(status=200, body=None):
+    res = MagicMock()
+    res.status_code = status
+    res.json.return_value = body if body is not None else {"response": "ok"}
+    return res
+
+
+class TestRetryBudget(unittest.TestCase):
+    def test_retries_capped_by_successes(self):
+        budget = RetryBudget("test", ratio=0.5, max_tokens=2)
+        self.assertTrue(budget.try_spend())
+        self.assertTrue(budget.try_spend())
+        self.assertFalse(budget.try_spend())
+
+        budget.record_success()
+        budget.record_success()
+        self.assertTrue(budget.try_spend())
+        self.assertEqual(
+            budget.get_state(),
+            {"tokens": 0.0, "retries_spent": 3, "retries_denied": 1},
+        )
+
+    def test_tokens_do_not_exceed_max(self):
+        budget = RetryBudget("test", ratio=1.0, max_tokens=3)
+        for _ in range(10):
+            budget.record_success()
+        self.assertEqual(budget.get_state()["tokens"], 3)
+
+
+class TestLatencyTracker(unittest.TestCase):
+    def test_percentile(self):
+        tracker = LatencyTracker(size=100)
+        self.assertIsNone(tracker.percentile(0.95))
+        for i in range(1, 101):
+            tracker.observe(float(i))
+        self.assertEqual(tracker.percentile(0.95), 96.0)
+        self.assertEqual(len(tracker), 100)
+
+
+class TestOllamaClient(unittest.TestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker("ollama-test", fail_max=100)
+        self.breakers = patch("ollama_client.CircuitBreakers.ollama", self.breaker)
+        self.breakers.start()
+        self.sleep = patch("ollama_client.time.sleep")
+        self.sleep.start()
+
+    def tearDown(self):
+        self.breakers.stop()
+        self.sleep.stop()
+
+    def _client(self, **overrides):
+        llm = agent_config.config.llm.model_copy(
+            update={
+                "url": PRIMARY,
+                "retry_budget_ratio": 0.1,
+                "retry_budget_max": 2,
+                **overrides,
+            }
+        )
+        return OllamaClient(llm)
+
+    @patch("ollama_client.requests.post")
+    def test_retry_then_success_feeds_breaker(self, mock_post):
+        mock_post.side_effect = [_response(503), _response()]
+        client = self._client()
+
+        with patch.object(
+            self.breaker, "_on_failure", wraps=self.breaker._on_failure
+        ) as on_failure:
+            self.assertEqual(client.generate("hi"), "ok")
+        self.assertEqual(mock_post.call_count, 2)
+        on_failure.assert_called_once()
+        self.assertEqual(client.retry_budget.get_state()["retries_spent"], 1)
+
+    @patch("ollama_client.requests.post")
+    def test_exhausted_budget_stops_retries(self, mock_post):
+        mock_post.side_effect = requests.exceptions.ConnectionError("down")
+        client = self._client()
+
+        # Two tokens: the first caller retries twice, the second not at all
+        self.assertEqual(client.generate("a"), "Error: Maximum retries exceeded.")
+        self.assertEqual(client.generate("b"), "Error: Maximum retries exceeded.")
+        self.assertEqual(mock_post.call_count, 4)
+        self.assertEqual(client.retry_budget.get_state()["retries_denied"], 1)
+
+    @patch("ollama_client.requests.post")
+    def test_open_circuit_returns_without_calling(self, mock_post):
+        self.breaker.fail_max = 1
+        mock_post.side_effect = requests.exceptions.ConnectionError("down")
+        client = self._client()
+
+        client.generate("a", max_retries=1)
+        client.generate("b", max_retries=1)
+        self.assertEqual(mock_post.call_count, 1)
+
+    @patch("ollama_client.requests.post")
+    def test_structured_parses_schema_output(self, mock_post):
+        mock_post.return_value = _response(
+            body={"message": {"content": '{"action": "restart"}'}}
+        )
+        client = self._client()
+
+        self.assertEqual(client.chat_structured("x", {}), {"action": "restart"})
+
+    @patch("ollama_client.requests.post")
+    def test_hedge_wins_when_primary_is_slow(self, mock_post):
+        release = threading.Event()
+
+        def post(url, json, timeout):
+            if url.startswith(SECONDARY):
+                return _response(body={"response": "hedged"})
+            release.wait(5)
+            return _response(body={"response": "primary"})
+
+        mock_post.side_effect = post
+        client = self._client(secondary_url=SECONDARY, hedge_delay=0.01)
+        try:
+            self.assertEqual(client.generate("hi"), "hedged")
+        finally:
+            release.set()
+        self.assertEqual(
+            mock_post.call_args_list[1].args[0], SECONDARY + "/api/generate"
+        )
+        hedging = client.get_stats()["hedging"]
+        self.assertEqual((hedging["sent"], hedging["won"]), (1, 1))
+
+    @patch("ollama_client.requests.post")
+    def test_fast_primary_is_not_hedged(self, mock_post):
+        mock_post.return_value = _response()
+        client = self._client(secondary_url=SECONDARY, hedge_delay=5)
+
+        self.assertEqual(client.generate("hi"), "ok")
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(client.get_stats()["hedging"]["sent"], 0)
+
+    def test_hedge_delay_follows_p95_once_warm(self):
+        client = self._client(hedge_delay=60, hedge_min_samples=5)
+        self.assertEqual(client.hedge_delay(), 60)
+        for seconds in (1.0, 2.0, 3.0, 4.0, 5.0):
+            client.latency.observe(seconds)
+        self.assertEqual(client.hedge_delay(), 5.0)
+
+
+class TestEndpointPool(unittest.TestCase):
+    def _endpoints(self, n):
+        return [
+            OllamaEndpoint(f"http://ollama-{i}:11434", CircuitBreaker(f"ollama-{i}"))
+            for i in range(n)
+        ]
+
+    def test_least_outstanding_spreads_load(self):
+        endpoints = self._endpoints(3)
+        for e in endpoints:
+            e.loaded_models = {"sre-kernel:latest"}
+        pool = EndpointPool(endpoints, probe_interval=3600)
+        pool._last_probe = float("inf")
+
+        chosen = []
+        for _ in range(3):
+            endpoint = pool.select("sre-kernel")
+            endpoint.begin()
+            chosen.append(endpoint)
+        self.assertEqual(set(chosen), set(endpoints))
+
+    def test_model_affinity_prefers_warm_endpoint(self):
+        cold, warm = self._endpoints(2)
+        warm.loaded_models = {"sre-kernel:latest"}
+        pool = EndpointPool([cold, warm])
+        pool._last_probe = float("inf")
+
+        self.assertIs(pool.select("sre-kernel"), warm)
+        # Cold counts as one request busier: a second in-flight call spills over
+        warm.begin()
+        warm.begin()
+        self.assertIs(pool.select("sre-kernel"), cold)
+
+    def test_ewma_policy_prefers_faster_endpoint(self):
+        slow, fast = self._endpoints(2)
+        slow.ewma_latency, fast.ewma_latency = 20.0, 5.0
+        pool = EndpointPool([slow, fast], policy="ewma")
+        pool._last_probe = float("inf")
+
+        self.assertIs(pool.select("m"), fast)
+        fast.outstanding = 8
+        self.assertIs(pool.select("m"), slow)
+
+    def test_open_breaker_and_failed_probe_are_skipped(self):
+        a, b, c = self._endpoints(3)
+        a.breaker.fail_max = 1
+        a.breaker._on_failure(RuntimeError("down"))
+        b.healthy = False
+        pool = EndpointPool([a, b, c])
+        pool._last_probe = float("inf")
+
+        self.assertIs(pool.select("m"), c)
+        self.assertIs(pool.select("m", exclude={c}), a)
+
+    @patch("ollama_client.requests.get")
+    def test_probe_reads_health_and_resident_models(self, mock_get):
+        endpoint = self._endpoints(1)[0]
+        mock_get.side_effect = [
+            _response(body={"models": []}),
+            _response(body={"models": [{"name": "sre-kernel:latest"}]}),
+        ]
+        endpoint.probe()
+        self.assertTrue(endpoint.healthy)
+        self.assertTrue(endpoint.has_model("sre-kernel"))
+        self.assertEqual(
+            mock_get.call_args_list[0].args[0], endpoint.base_url + "/api/tags"
+        )
+
+        mock_get.side_effect = requests.exceptions.ConnectionError("down")
+        endpoint.probe()
+        self.assertFalse(endpoint.healthy)
+        self.assertEqual(endpoint.loaded_models, set())
+
+
+class TestBalancedOllamaClient(unittest.TestCase):
+    def setUp(self):
+        self.sleep = patch("ollama_client.time.sleep")
+        self.sleep.start()
+
+    def tearDown(self):
+        self.sleep.stop()
+
+    @patch("ollama_client.requests.post")
+    def test_retry_moves_to_another_endpoint(self, mock_post):
+        llm = agent_config.config.llm.model_copy(
+            update={
+                "endpoints": ["http://gpu-a:11434", "http://gpu-b:11434"],
+                "probe_interval": 3600,
+            }
+        )
+        with patch("ollama_client.CircuitBreakers.ollama", CircuitBreaker("gpu-a")):
+            client = OllamaClient(llm)
+        client.pool._last_probe = float("inf")
+        mock_post.side_effect = [_response(500), _response()]
+
+        self.assertEqual(client.generate("hi"), "ok")
+        hosts = [c.args[0].split("/api/")[0] for c in mock_post.call_args_list]
+        self.assertEqual(set(hosts), {"http://gpu-a:11434", "http://gpu-b:11434"})
+        stats = {e["url"]: e for e in client.get_stats()["endpoints"]}
+        self.assertEqual(stats[hosts[1]]["loaded_models"], [llm.model])
+        self.assertEqual(stats[hosts[1]]["outstanding"], 0)
+
+    @patch("ollama_client.requests.post")
+    def test_refused_endpoint_is_skipped_without_a_retry(self, mock_post):
+        llm = agent_config.config.llm.model_copy(
+            update={
+                "endpoints": ["http://gpu-a:11434", "http://gpu-b:11434"],
+                "probe_interval": 3600,
+            }
+        )
+        with patch("ollama_client.CircuitBreakers.ollama", CircuitBreaker("gpu-a")):
+            client = OllamaClient(llm)
+        client.pool._last_probe = float("inf")
+        a, b = client.pool.endpoints
+        a.breaker.fail_max = 1
+        a.breaker._on_failure(RuntimeError("down"))
+        # The pool still picks A first when B looks no better
+        a.healthy = b.healthy = False
+        mock_post.return_value = _response()
+
+        self.assertEqual(client.generate("hi", max_retries=1), "ok")
+        self.assertEqual(mock_post.call_args.args[0], b.base_url + "/api/generate")
+        self.assertEqual(client.retry_budget.get_state()["retries_spent"], 0)
+
+    @patch("ollama_client.requests.post")
+    def test_refusal_by_every_endpoint_skips_the_fallback_model(self, mock_post):
+        llm = agent_config.config.llm.model_copy(
+            update={
+                "url": PRIMARY,
+                "model": "sre-kernel",
+                "specialist_model": "qwen2.5:1.5b",
+                "fallback_model": "sre-kernel",
+            }
+        )
+        breaker = CircuitBreaker("ollama-test", fail_max=1)
+        breaker._on_failure(RuntimeError("down"))
+        with patch("ollama_client.CircuitBreakers.ollama", breaker):
+            client = OllamaClient(llm)
+
+        with patch.object(client, "_call", wraps=client._call) as call:
+            answer = client.generate("analyse", role="specialist")
+        self.assertEqual(answer, "Error: Maximum retries exceeded.")
+        mock_post.assert_not_called()
+        # No fallback-model request was attempted
+        self.assertEqual(call.call_count, 1)
+
+
+class TestModelResidency(unittest.TestCase):
+    def test_keep_alive_follows_alert_gaps(self):
+        residency = ModelResidency(min_keep_alive=300, max_keep_alive=3600)
+        self.assertEqual(residency.keep_alive(), 300)
+
+        for t in (0, 600, 1200, 1800):
+            residency.note_alert(now=t)
+        self.assertEqual(residency.keep_alive(), 1200)
+
+        for t in (10000, 20000, 30000, 40000):
+            residency.note_alert(now=t)
+        self.assertEqual(residency.keep_alive(), 3600)
+
+    def test_cold_and_warm_calls_are_split(self):
+        residency = ModelResidency(min_keep_alive=300, max_keep_alive=3600)
+        residency.observe({"load_duration": 6_000_000_000}, 9.0)
+        residency.observe({"load_duration": 20_000_000}, 2.0)
+        residency.observe({}, 3.0)
+
+        state = residency.get_state()
+        self.assertEqual((state["cold_starts"], state["warm_calls"]), (1, 2))
+        self.assertEqual(state["cold_p50_ms"], 9000.0)
+        self.assertEqual(state["warm_p95_ms"], 3000.0)
+        self.assertTrue(residency.is_resident())
+
+
+class TestWarmKeeping(unittest.TestCase):
+    def setUp(self):
+        self.breakers = patch(
+            "ollama_client.CircuitBreakers.ollama", CircuitBreaker("ollama-test")
+        )
+        self.breakers.start()
+        self.client = OllamaClient(
+            agent_config.config.llm.model_copy(update={"url": PRIMARY})
+        )
+
+    def tearDown(self):
+        self.breakers.stop()
+
+    @patch("ollama_client.requests.post")
+    def test_requests_carry_keep_alive(self, mock_post):
+        mock_post.return_value = _response()
+        self.client.generate("hi")
+        self.assertEqual(mock_post.call_args.kwargs["json"]["keep_alive"], "300s")
+
+    @patch("ollama_client.requests.post")
+    def test_warm_loads_model_with_empty_prompt(self, mock_post):
+        mock_post.return_value = _response(body={"load_duration": 5_000_000_000})
+        self.client.warm()
+
+        payload = mock_post.call_args.kwargs["json"]
+        self.assertEqual(payload["prompt"], "")
+        self.assertEqual(payload["model"], agent_config.config.llm.model)
+        # Warm-ups are not counted as user-facing cold starts
+        self.assertEqual(self.client.residency.cold_starts, 0)
+        self.assertTrue(self.client.residency.is_resident())
+
+    @patch("ollama_client.threading.Thread")
+    def test_prewarm_skips_resident_model(self, thread):
+        self.assertTrue(self.client.prewarm())
+        self.assertFalse(self.client.prewarm())  # already warming
+
+        with patch.object(self.client, "warm") as warm:
+            thread.call_args.kwargs["target"]()
+        warm.assert_called_once()
+        self.client.residency.mark_loaded()
+        self.assertFalse(self.client.prewarm())
+        self.assertEqual(self.client.residency.prewarms, 1)
+
+
+class TestRoleRouting(unittest.TestCase):
+    def setUp(self):
+        self.breakers = patch(
+            "ollama_client.CircuitBreakers.ollama", CircuitBreaker("ollama-test")
+        )
+        self.breakers.start()
+        self.client = OllamaClient(
+            agent_config.config.llm.model_copy(
+                update={
+                    "url": PRIMARY,
+                    "model": "sre-kernel",
+                    "specialist_model": "qwen2.5:1.5b",
+                    "fallback_model": "sre-kernel",
+                    "specialist_min_chars": 10,
+                }
+            )
+        )
+
+    def tearDown(self):
+        self.breakers.stop()
+
+    def test_model_for_defaults_to_main_model(self):
+        llm = self.client.config
+        self.assertEqual(llm.model_for("specialist"), "qwen2.5:1.5b")
+        self.assertEqual(llm.model_for("director"), "sre-kernel")
+        self.assertEqual(llm.model_for(None), "sre-kernel")
+
+    @patch("ollama_client.requests.post")
+    def test_specialist_uses_small_model(self, mock_post):
+        mock_post.return_value = _response(
+            body={
+                "response": "Linkerd mTLS handshake failures on cartservice.",
+                "prompt_eval_count": 120,
+                "eval_count": 30,
+            }
+        )
+        self.client.generate("analyse", role="specialist")
+
+        self.assertEqual(mock_post.call_args.kwargs["json"]["model"], "qwen2.5:1.5b")
+        stats = self.client.get_stats()["roles"]["specialist"]
+        self.assertEqual((stats["calls"], stats["fallbacks"]), (1, 0))
+        self.assertEqual(
+            (stats["prompt_tokens"], stats["completion_tokens"]), (120, 30)
+        )
+
+    @patch("ollama_client.requests.post")
+    def test_short_answer_falls_back_to_big_model(self, mock_post):
+        mock_post.side_effect = [
+            _response(body={"response": "n/a"}),
+            _response(body={"response": "Memory leak in the gRPC handler."}),
+        ]
+        answer = self.client.generate("analyse", role="specialist")
+
+        self.assertEqual(answer, "Memory leak in the gRPC handler.")
+        models = [c.kwargs["json"]["model"] for c in mock_post.call_args_list]
+        self.assertEqual(models, ["qwen2.5:1.5b", "sre-kernel"])
+        roles = self.client.get_stats()["roles"]
+        self.assertEqual(roles["specialist"]["fallbacks"], 1)
+        self.assertEqual(roles["fallback"]["calls"], 1)
+
+    @patch("ollama_client.requests.post")
+    def test_failed_call_does_not_retry_with_fallback_model(self, mock_post):
+        mock_post.side_effect = requests.exceptions.ConnectionError("refused")
+        with patch.object(self.client, "_call", wraps=self.client._call) as call:
+            answer = self.client.generate(
+                "analyse", role="specialist", max_retries=2, base_wait=0
+            )
+
+        self.assertEqual(answer, "Error: Maximum retries exceeded.")
+        self.assertEqual(call.call_count, 1)
+        models = {c.kwargs["json"]["model"] for c in mock_post.call_args_list}
+        self.assertEqual(models, {"qwen2.5:1.5b"})
+        self.assertNotIn("fallback", self.client.get_stats()["roles"])
+
+    @patch("ollama_client.requests.post")
+    def test_structured_quality_check_triggers_fallback(self, mock_post):
+        self.client.config = self.client.config.model_copy(
+            update={"director_model": "llama3.2:3b"}
+        )
+        mock_post.side_effect = [
+            _response(body={"message": {"content": '{"action": "REBOOT"}'}}),
+            _response(body={"message": {"content": '{"action": "RESTART"}'}}),
+        ]
+        result = self.client.chat_structured(
+            "plan",
+            {},
+            role="director",
+            quality_check=lambda r: r is not None and r.get("action") == "RESTART",
+        )
+        self.assertEqual(result, {"action": "RESTART"})
+        self.assertEqual(mock_post.call_args.kwargs["json"]["model"], "sre-kernel")
+
+    @patch("ollama_client.requests.post")
+    def test_warm_loads_each_role_model_once(self, mock_post):
+        mock_post.return_value = _response()
+        self.client.warm()
+        models = sorted(c.kwargs["json"]["model"] for c in mock_post.call_args_list)
+        self.assertEqual(models, ["qwen2.5:1.5b", "sre-kernel"])
+
+
+if __name__ == "__main__":
+    unittest.main()
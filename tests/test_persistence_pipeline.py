@@ -0,0 +1,257 @@
+"""
+Unit tests for the background post-mortem and runbook persistence pipeline
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(
+    0,
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../components/ai-agent")),
+)
+
+import ai_agent
+from ai_agent import RemediationAction
+from persistence_pipeline import PersistencePipeline
+
+
+class TestPersistencePipeline(unittest.TestCase):
+    def setUp(self):
+        self.spool = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.spool)
+
+    def _spooled(self, *sub):
+        path = os.path.join(self.spool, *sub)
+        return sorted(n for n in os.listdir(path) if n.endswith(".json"))
+
+    def test_concurrent_jobs_share_one_batch(self):
+        batches = []
+        pipeline = PersistencePipeline(
+            lambda jobs: batches.append(jobs) or [True] * len(jobs),
+            spool_dir=self.spool,
+            window=0.2,
+        )
+        threads = [
+            threading.Thread(target=pipeline.submit, args=({"n": i},)) for i in range(5)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertTrue(pipeline.drain(timeout=5))
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(sorted(job["n"] for job in batches[0]), list(range(5)))
+        self.assertEqual(self._spooled(), [])
+        self.assertEqual(pipeline.get_stats()["completed"], 5)
+
+    def test_failed_jobs_are_retried(self):
+        calls = []
+
+        def handle(jobs):
+            calls.append(jobs)
+            return [len(calls) > 1] * len(jobs)
+
+        pipeline = PersistencePipeline(handle, window=0, backoff=0.05)
+        pipeline.submit({"n": 1})
+
+        self.assertTrue(pipeline.drain(timeout=5))
+        self.assertEqual(len(calls), 2)
+        stats = pipeline.get_stats()
+        self.assertEqual((stats["retries"], stats["completed"]), (1, 1))
+
+    def test_exhausted_jobs_are_dead_lettered(self):
+        def handle(jobs):
+            raise OSError("disk full")
+
+        pipeline = PersistencePipeline(
+            handle, spool_dir=self.spool, window=0, max_attempts=2, backoff=0.01
+        )
+        pipeline.submit({"n": 1})
+
+        self.assertTrue(pipeline.drain(timeout=5))
+        self.assertEqual(self._spooled(), [])
+        self.assertEqual(len(self._spooled("dead")), 1)
+        self.assertEqual(pipeline.get_stats()["dead_lettered"], 1)
+
+    def test_full_pipeline_pushes_back(self):
+        release = threading.Event()
+        pipeline = PersistencePipeline(
+            lambda jobs: release.wait() and [True] * len(jobs),
+            spool_dir=self.spool,
+            max_pending=1,
+            window=0,
+        )
+        self.assertTrue(pipeline.submit({"n": 1}))
+        self.assertFalse(pipeline.submit({"n": 2}, timeout=0.1))
+        self.assertEqual(pipeline.get_stats()["rejected"], 1)
+        # The rejected job is persisted inline by the caller, never replayed
+        self.assertEqual(len(self._spooled()), 1)
+
+        release.set()
+        self.assertTrue(pipeline.drain(timeout=5))
+        self.assertTrue(pipeline.submit({"n": 3}, timeout=1))
+
+    def test_journal_is_written_outside_the_lock(self):
+        pipeline = PersistencePipeline(lambda jobs: [True] * len(jobs), window=0)
+        pipeline.spool_dir = self.spool
+        held = []
+        journal = pipeline._journal
+
+        def probe():
+            acquired = pipeline._cond.acquire(blocking=False)
+            if acquired:
+                pipeline._cond.release()
+            held.append(not acquired)
+
+        def record(job):
+            # Another thread can take the condition while a job is journaled
+            t = threading.Thread(target=probe)
+            t.start()
+            t.join()
+            journal(job)
+
+        with patch.object(pipeline, "_journal", side_effect=record):
+            self.assertTrue(pipeline.submit({"n": 1}))
+        self.assertEqual(held, [False])
+        self.assertTrue(pipeline.drain(timeout=5))
+
+    def test_journaled_jobs_are_replayed_after_restart(self):
+        stuck = PersistencePipeline(
+            lambda jobs: threading.Event().wait(),
+            spool_dir=self.spool,
+            window=0,
+        )
+        stuck.submit({"n": 1})
+        stuck.submit({"n": 2})
+        self.assertEqual(len(self._spooled()), 2)
+
+        # A new process finds the journal
+        handled = []
+        pipeline = PersistencePipeline(
+            lambda jobs: handled.extend(jobs) or [True] * len(jobs),
+            spool_dir=self.spool,
+        )
+        self.assertEqual(pipeline.recover(), 2)
+        self.assertTrue(pipeline.drain(timeout=5))
+        self.assertEqual(handled, [{"n": 1}, {"n": 2}])
+        self.assertEqual(self._spooled(), [])
+
+
+class TestLifecyclePersistence(unittest.TestCase):
+    def setUp(self):
+        self.repo = tempfile.mkdtemp()
+        self.rag = MagicMock()
+        self.patches = [
+            patch.object(ai_agent, "GIT_REPO_DIR", self.repo),
+            patch.object(ai_agent, "_rag_pipeline", self.rag),
+            patch.object(ai_agent, "_fast_path", MagicMock()),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        shutil.rmtree(self.repo)
+
+    def _handle(self, verified=True):
+        action = RemediationAction(
+            rca="OOM", action="RESTART", deployment="cartservice", namespace="ob"
+        )
+        ai_agent.handle_autonomous_lifecycle(
+            "HighMemory",
+            {"alertname": "HighMemory"},
+            {"description": "memory"},
+            action,
+            "restarted",
+            verified=verified,
+        )
+
+    def test_lifecycle_returns_before_persisting(self):
+        handled = threading.Event()
+        pipeline = PersistencePipeline(
+            lambda jobs: handled.wait() and ai_agent.persist_lifecycle_batch(jobs),
+            window=0,
+        )
+        with patch.object(ai_agent, "_persistence", pipeline):
+            self._handle()
+            self.assertFalse(os.path.exists(os.path.join(self.repo, "runbooks")))
+            ai_agent._fast_path.remember.assert_called_once()
+
+            handled.set()
+            self.assertTrue(pipeline.drain(timeout=5))
+
+        self.assertEqual(len(os.listdir(os.path.join(self.repo, "post-mortems"))), 1)
+        with open(os.path.join(self.repo, "runbooks", "HighMemory.md")) as f:
+            runbook = f.read()
+        self.assertIn("# Runbook: HighMemory", runbook)
+        self.assertIn("cartservice", runbook)
+        ((items,), _) = self.rag.embed_post_mortems.call_args
+        self.assertEqual([item[1] for item in items], ["HighMemory"])
+
+    def test_persists_inline_without_pipeline(self):
+        with patch.object(ai_agent, "_persistence", None):
+            self._handle(verified=False)
+        self.assertTrue(
+            os.path.exists(os.path.join(self.repo, "runbooks", "HighMemory.md"))
+        )
+        self.rag.embed_post_mortems.assert_called_once()
+
+    def test_embedding_failure_fails_the_batch(self):
+        self.rag.embed_post_mortems.side_effect = RuntimeError("model unavailable")
+        job = {
+            "alert_name": "HighMemory",
+            "timestamp": "20260101-000000",
+            "post_mortem": "# Post-Mortem",
+            "runbook": "# Runbook: HighMemory\n",
+            "record": None,
+        }
+        pipeline = PersistencePipeline(
+            ai_agent.persist_lifecycle_batch, window=0, max_attempts=1
+        )
+        pipeline.submit(job)
+        self.assertTrue(pipeline.drain(timeout=5))
+        self.assertEqual(pipeline.get_stats()["dead_lettered"], 1)
+
+    def test_failed_embedding_is_retried_then_dead_lettered(self):
+        def embed(items):
+            # HighMemory is already indexed; PodCrashLooping fails to embed
+            return [
+                None if alert == "PodCrashLooping" else False for _, alert, _ in items
+            ]
+
+        self.rag.embed_post_mortems.side_effect = embed
+        jobs = [
+            {
+                "alert_name": name,
+                "timestamp": "20260101-000000",
+                "post_mortem": f"# Post-Mortem: {name}",
+                "runbook": f"# Runbook: {name}\n",
+                "record": None,
+            }
+            for name in ("HighMemory", "PodCrashLooping")
+        ]
+        self.assertEqual(ai_agent.persist_lifecycle_batch(jobs), [True, False])
+
+        pipeline = PersistencePipeline(
+            ai_agent.persist_lifecycle_batch, window=0, max_attempts=2, backoff=0.01
+        )
+        for job in jobs:
+            pipeline.submit(job)
+        self.assertTrue(pipeline.drain(timeout=5))
+        stats = pipeline.get_stats()
+        self.assertEqual(
+            (stats["completed"], stats["retries"], stats["dead_lettered"]), (1, 1, 1)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
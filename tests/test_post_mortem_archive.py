@@ -0,0 +1,232 @@
+"""
+Unit tests for the post-mortem archive rollup and reader
+"""
+
+import datetime
+import gzip
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(
+    0,
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../components/ai-agent")),
+)
+
+from post_mortem_archive import PostMortemArchive, parse_name
+
+NOW = datetime.datetime(2026, 3, 15, 12, 0, 0)
+
+
+class TestPostMortemArchive(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.archive = PostMortemArchive(self.root, retain_days=30)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def _write(self, timestamp, alert_name, body=None):
+        name = f"{timestamp}-{alert_name}.md"
+        with open(os.path.join(self.root, name), "w") as f:
+            f.write(body or f"# Post-Mortem: {alert_name}\n{timestamp}\n")
+        return name
+
+    def _loose(self):
+        return sorted(n for n in os.listdir(self.root) if n.endswith(".md"))
+
+    def test_parse_name(self):
+        self.assertEqual(
+            parse_name("20260101-101010-HighMemory.md"),
+            ("20260101-101010", "HighMemory"),
+        )
+        self.assertEqual(parse_name("notes.md"), ("", "notes"))
+
+    def test_rollup_partitions_old_post_mortems_by_month(self):
+        self._write("20260105-080000", "HighMemory")
+        self._write("20260120-080000", "PodCrashLooping")
+        self._write("20260203-080000", "HighMemory")
+        recent = self._write("20260310-080000", "HighLatency")
+        self._write("notes", "x")  # unparseable names stay loose
+
+        self.assertEqual(self.archive.rollup(now=NOW), 3)
+
+        self.assertEqual(self._loose(), [recent, "notes-x.md"])
+        segments = self.archive.segments()
+        self.assertEqual([s["month"] for s in segments], ["2026-01", "2026-02"])
+        self.assertEqual(segments[0]["count"], 2)
+        self.assertEqual(
+            (segments[0]["first"], segments[0]["last"]),
+            ("20260105-080000", "20260120-080000"),
+        )
+        path = os.path.join(self.root, "archive", segments[0]["file"])
+        with gzip.open(path, "rt") as f:
+            self.assertEqual(len(f.readlines()), 2)
+
+        # Nothing left to roll up
+        self.assertEqual(self.archive.rollup(now=NOW), 0)
+
+    def test_reader_streams_archive_then_loose_in_order(self):
+        self._write("20260203-080000", "HighMemory")
+        self._write("20260105-080000", "PodCrashLooping")
+        self.archive.rollup(now=NOW)
+        self._write("20260310-080000", "HighLatency")
+
+        stream = list(self.archive.iter_post_mortems())
+        self.assertEqual(
+            [pm.timestamp for pm in stream],
+            ["20260105-080000", "20260203-080000", "20260310-080000"],
+        )
+        self.assertEqual(stream[0].alert_name, "PodCrashLooping")
+        self.assertIn("# Post-Mortem: PodCrashLooping", stream[0].content)
+
+        since = list(self.archive.iter_post_mortems(since="20260201"))
+        self.assertEqual(len(since), 2)
+
+    def test_late_rollup_compacts_into_existing_segment(self):
+        self._write("20260105-080000", "HighMemory")
+        self.archive.rollup(now=NOW)
+        # Written late (e.g. restored from a backup), and a crash left a duplicate
+        self._write("20260125-080000", "PodCrashLooping")
+        self._write("20260105-080000", "HighMemory")
+
+        self.assertEqual(self.archive.rollup(now=NOW), 2)
+
+        segments = self.archive.segments()
+        self.assertEqual(len(segments), 1)
+        self.assertEqual(segments[0]["count"], 2)
+        self.assertEqual(
+            [pm.alert_name for pm in self.archive.iter_archived()],
+            ["HighMemory", "PodCrashLooping"],
+        )
+        self.assertFalse(
+            any(n.endswith(".tmp") for n in os.listdir(self.archive.archive_dir))
+        )
+
+    def test_stats(self):
+        self._write("20260105-080000", "HighMemory")
+        self._write("20260310-080000", "HighLatency")
+        self.archive.rollup(now=NOW)
+
+        stats = self.archive.get_stats()
+        self.assertEqual((stats["loose"], stats["segments"]), (1, 1))
+        self.assertEqual(stats["archived_records"], 1)
+        self.assertGreater(stats["archive_bytes"], 0)
+
+    def test_missing_directory(self):
+        archive = PostMortemArchive(os.path.join(self.root, "missing"))
+        self.assertEqual(list(archive.iter_post_mortems()), [])
+        self.assertEqual(archive.rollup(now=NOW), 0)
+
+    def test_rollup_reports_changed_paths(self):
+        self.archive.on_rollup = MagicMock()
+        self.assertEqual(self.archive.rollup(now=NOW), 0)
+        self.archive.on_rollup.assert_not_called()
+
+        old = self._write("20260105-080000", "HighMemory")
+        self._write("20260310-080000", "HighLatency")
+        self.archive.rollup(now=NOW)
+        self.archive.on_rollup.assert_called_once_with([old, "archive"])
+
+    def test_imports_without_loguru(self):
+        # scripts/generate_training_data.py runs with the standard library only
+        self._write("20260105-080000", "HighMemory")
+        code = (
+            "import sys, datetime; sys.modules['loguru'] = None\n"
+            f"sys.path.insert(0, {sys.path[0]!r})\n"
+            "from post_mortem_archive import PostMortemArchive\n"
+            f"archive = PostMortemArchive({self.root!r})\n"
+            "assert archive.rollup(now=datetime.datetime(2026, 3, 15)) == 1\n"
+            "assert len(list(archive.iter_post_mortems())) == 1\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
+@unittest.skipUnless(shutil.which("git"), "git not installed")
+class TestRollupCommit(unittest.TestCase):
+    def setUp(self):
+        import ai_agent
+        from git_backend import SubprocessGitBackend
+        from working_copy import WorkingCopy
+
+        self.agent = ai_agent
+        self.tmp = tempfile.mkdtemp()
+        self.remote = os.path.join(self.tmp, "remote.git")
+        self.repo = os.path.join(self.tmp, "work")
+        subprocess.run(["git", "init", "-q", "--bare", self.remote], check=True)
+        subprocess.run(["git", "clone", "-q", self.remote, self.repo], check=True)
+        self._git("checkout", "-q", "-b", "main")
+        self._git("config", "user.email", "test@example.com")
+        self._git("config", "user.name", "Test")
+        self.root = os.path.join(self.repo, "post-mortems")
+        os.makedirs(self.root)
+        for name in ("20260105-080000-HighMemory.md", "20260310-080000-HighLatency.md"):
+            with open(os.path.join(self.root, name), "w") as f:
+                f.write(f"# Post-Mortem: {name}\n")
+        self._git("add", ".")
+        self._git("commit", "-q", "-m", "init")
+        self._git("push", "-q", "origin", "main")
+
+        self.patches = [
+            patch.object(ai_agent, "GITOPS_MODE", True),
+            patch.object(ai_agent, "GIT_REPO_DIR", self.repo),
+            patch.object(ai_agent, "POST_MORTEMS_DIR", "post-mortems"),
+            patch.object(
+                ai_agent,
+                "_git_backend",
+                SubprocessGitBackend(self.repo, "origin", "main"),
+            ),
+            patch.object(ai_agent, "_working_copy", WorkingCopy(self.repo, "main")),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        shutil.rmtree(self.tmp)
+
+    def _git(self, *args, cwd=None):
+        return subprocess.run(
+            ["git", "-C", cwd or self.repo, *args],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+
+    def test_rollup_is_committed_and_pushed(self):
+        # Written after the last commit: never tracked, so nothing to delete
+        with open(os.path.join(self.root, "20260120-080000-PodCrash.md"), "w") as f:
+            f.write("# Post-Mortem: PodCrash\n")
+        archive = PostMortemArchive(
+            self.root, on_rollup=self.agent.commit_post_mortem_rollup
+        )
+        self.assertEqual(archive.rollup(now=NOW), 2)
+
+        self.assertEqual(self._git("status", "--porcelain"), "")
+        log = self._git("log", "--format=%s", "main", cwd=self.remote).splitlines()
+        self.assertEqual(
+            log[0], "post-mortems: roll 2 reports into the monthly archive"
+        )
+        files = self._git(
+            "ls-tree", "-r", "--name-only", "main", cwd=self.remote
+        ).split()
+        self.assertEqual(
+            files,
+            [
+                "post-mortems/20260310-080000-HighLatency.md",
+                "post-mortems/archive/2026-01.jsonl.gz",
+                "post-mortems/archive/index.json",
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
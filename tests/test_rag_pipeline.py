@@ -0,0 +1,391 @@
+"""
+Unit tests for the ChromaDB/MinIO RAG pipeline (rag_pipeline.py)
+"""
+
+import asyncio
+import datetime
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(
+    0,
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../components/ai-agent")),
+)
+
+# rag_pipeline refuses to import without MinIO credentials
+os.environ.setdefault("MINIO_ACCESS_KEY", "test-access-key")
+os.environ.setdefault("MINIO_SECRET_KEY", "test-secret-key")
+
+import rag_pipeline
+from rag_pipeline import (
+    LatencyHistogram,
+    PostMortemStore,
+    PostMortemVectorStore,
+    QueryBatcher,
+    QueryCache,
+    RAGQueryService,
+)
+
+
+def _object_store(objects):
+    """PostMortemStore over an in-memory bucket {key: bytes}."""
+    store = PostMortemStore.__new__(PostMortemStore)
+    store.s3 = MagicMock()
+    store.s3.get_paginator.return_value.paginate.return_value = [
+        {
+            "Contents": [
+                {
+                    "Key": key,
+                    "Size": len(body),
+                    "ETag": f'"{hashlib.md5(body, usedforsecurity=False).hexdigest()}"',
+                    "LastModified": datetime.datetime(2026, 1, 1),
+                }
+                for key, body in objects.items()
+            ]
+        }
+    ]
+    store.s3.get_object.side_effect = lambda Bucket, Key: {
+        "Body": io.BytesIO(objects[Key])
+    }
+    return store
+
+
+def _vector_store(existing_ids=()):
+    """PostMortemVectorStore wired to a mocked collection and embedder."""
+    store = PostMortemVectorStore.__new__(PostMortemVectorStore)
+    store.collection = MagicMock()
+    store.collection.name = PostMortemVectorStore.COLLECTION
+    store.collection.metadata = {"embed_model": rag_pipeline.EMBED_MODEL}
+    store.collection.get.side_effect = lambda ids, include=None: {
+        "ids": [i for i in ids if i in existing_ids]
+    }
+    store.collection.count.return_value = 0
+    store.ef = MagicMock(side_effect=lambda texts: [[0.1, 0.2] for _ in texts])
+    return store
+
+
+class TestBulkReindex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.archive = os.path.join(self.tmp, "post-mortems")
+        os.makedirs(self.archive)
+        for i in range(5):
+            path = os.path.join(self.archive, f"20260101-00000{i}-Alert{i}.md")
+            with open(path, "w") as f:
+                f.write(f"# Post-Mortem: Alert{i}\nbody {i}\n")
+        self.checkpoint = os.path.join(self.tmp, "checkpoint.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _added_ids(self, store):
+        return [
+            doc_id
+            for call in store.collection.upsert.call_args_list
+            for doc_id in call.kwargs["ids"]
+        ]
+
+    def test_batches_adds_and_single_dedup_lookup(self):
+        store = _vector_store()
+
+        added = store.bulk_reindex(
+            self.archive, workers=1, batch_size=2, checkpoint_path=self.checkpoint
+        )
+
+        self.assertEqual(added, 5)
+        self.assertEqual(store.collection.get.call_count, 1)
+        self.assertEqual(store.collection.upsert.call_count, 3)
+        first = store.collection.upsert.call_args_list[0].kwargs
+        self.assertEqual(first["metadatas"][0]["alert_name"], "Alert0")
+        self.assertEqual(len(first["embeddings"]), 2)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_skips_already_embedded_ids(self):
+        probe = _vector_store()
+        probe.bulk_reindex(self.archive, 1, 10, self.checkpoint)
+        all_ids = self._added_ids(probe)
+
+        store = _vector_store(existing_ids=set(all_ids[:3]))
+        added = store.bulk_reindex(self.archive, 1, 10, self.checkpoint)
+
+        self.assertEqual(added, 2)
+        self.assertEqual(self._added_ids(store), all_ids[3:])
+
+    def test_resumes_from_checkpoint(self):
+        with open(self.checkpoint, "w") as f:
+            json.dump(
+                {
+                    "directory": os.path.abspath(self.archive),
+                    "embed_model": rag_pipeline.EMBED_MODEL,
+                    "processed": 4,
+                },
+                f,
+            )
+        store = _vector_store()
+
+        added = store.bulk_reindex(self.archive, 1, 2, self.checkpoint)
+
+        self.assertEqual(added, 1)
+        metadata = store.collection.upsert.call_args.kwargs["metadatas"][0]
+        self.assertEqual(metadata["alert_name"], "Alert4")
+
+    def test_checkpoint_for_other_model_is_ignored(self):
+        with open(self.checkpoint, "w") as f:
+            json.dump(
+                {
+                    "directory": os.path.abspath(self.archive),
+                    "embed_model": "some-other-model",
+                    "processed": 4,
+                },
+                f,
+            )
+        store = _vector_store()
+
+        self.assertEqual(store.bulk_reindex(self.archive, 1, 2, self.checkpoint), 5)
+
+    def test_ids_from_another_model_are_re_embedded(self):
+        probe = _vector_store()
+        probe.bulk_reindex(self.archive, 1, 10, self.checkpoint)
+        all_ids = self._added_ids(probe)
+
+        # Same content hashes, but the vectors came from a different model
+        store = _vector_store(existing_ids=set(all_ids))
+        store.collection.metadata = {"embed_model": "some-other-model"}
+        added = store.bulk_reindex(self.archive, 1, 10, self.checkpoint)
+
+        self.assertEqual(added, 5)
+        self.assertEqual(self._added_ids(store), all_ids)
+        store.collection.get.assert_not_called()
+
+    def test_each_file_is_read_once(self):
+        store = _vector_store()
+        with patch("builtins.open", wraps=open) as opened:
+            store.bulk_reindex(self.archive, 1, 2, self.checkpoint)
+        reads = [c.args[0] for c in opened.call_args_list if c.args[0].endswith(".md")]
+        self.assertEqual(len(reads), 5)
+        self.assertEqual(len(set(reads)), 5)
+
+
+class TestPostMortemStoreTransfers(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.objects = {
+            "2026/01/20260101-000000-HighMemory.md": b"memory",
+            "2026/02/20260201-000000-PodCrashLooping.md": b"crash loop",
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_object_key_uses_filename_date(self):
+        self.assertEqual(
+            PostMortemStore.object_key("20250307-101010-HighCPU.md"),
+            "2025/03/20250307-101010-HighCPU.md",
+        )
+
+    def test_download_skips_unchanged_objects(self):
+        with open(os.path.join(self.tmp, "20260101-000000-HighMemory.md"), "wb") as f:
+            f.write(b"memory")
+        store = _object_store(self.objects)
+
+        paths = store.download_all(self.tmp, concurrency=4)
+
+        self.assertEqual(len(paths), 2)
+        store.s3.download_file.assert_called_once_with(
+            rag_pipeline.MINIO_BUCKET,
+            "2026/02/20260201-000000-PodCrashLooping.md",
+            os.path.join(self.tmp, "20260201-000000-PodCrashLooping.md"),
+        )
+
+    def test_upload_skips_unchanged_objects(self):
+        unchanged = os.path.join(self.tmp, "20260101-000000-HighMemory.md")
+        modified = os.path.join(self.tmp, "20260201-000000-PodCrashLooping.md")
+        new = os.path.join(self.tmp, "20260301-000000-HighCPU.md")
+        for path, body in [(unchanged, b"memory"), (modified, b"crash"), (new, b"c")]:
+            with open(path, "wb") as f:
+                f.write(body)
+        store = _object_store(self.objects)
+
+        keys = store.upload_all([unchanged, modified, new], concurrency=2)
+
+        self.assertEqual(
+            sorted(keys),
+            [
+                "2026/02/20260201-000000-PodCrashLooping.md",
+                "2026/03/20260301-000000-HighCPU.md",
+            ],
+        )
+
+    def test_stream_all_yields_contents_in_listing_order(self):
+        store = _object_store(self.objects)
+
+        streamed = list(store.stream_all(concurrency=1))
+
+        self.assertEqual(
+            streamed,
+            [(k, v.decode()) for k, v in self.objects.items()],
+        )
+        self.assertEqual(os.listdir(self.tmp), [])
+
+
+class TestBoundedOrderedMap(unittest.TestCase):
+    def test_preserves_input_order(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        items = [(i, [i], None) for i in range(10)]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(
+                rag_pipeline._bounded_ordered_map(
+                    executor, lambda texts: texts[0] * 2, iter(items), 3
+                )
+            )
+        self.assertEqual([r for _, r in results], [i * 2 for i in range(10)])
+
+
+def _search_store():
+    """Vector store whose collection echoes one hit per query embedding."""
+    store = PostMortemVectorStore.__new__(PostMortemVectorStore)
+    store.ef = MagicMock(side_effect=lambda texts: [[float(len(t))] for t in texts])
+    store.collection = MagicMock()
+
+    def query(query_embeddings, n_results, include, where=None):
+        return {
+            "documents": [
+                [f"doc-{e[0]}-{i}" for i in range(n_results)] for e in query_embeddings
+            ],
+            "metadatas": [
+                [{"alert_name": (where or {}).get("alert_name", "any")}] * n_results
+                for _ in query_embeddings
+            ],
+            "distances": [[0.1] * n_results for _ in query_embeddings],
+        }
+
+    store.collection.query.side_effect = query
+    return store
+
+
+class TestRAGQueryService(unittest.TestCase):
+    def _run(self, service, calls):
+        async def scenario():
+            await service.start()
+            try:
+                return await asyncio.gather(*calls(service))
+            finally:
+                await service.stop()
+
+        return asyncio.run(scenario())
+
+    def test_concurrent_queries_share_one_batch(self):
+        store = _search_store()
+        service = RAGQueryService(store, batcher=QueryBatcher(store, window_ms=50))
+
+        results = self._run(
+            service, lambda s: [s.query(f"q{'x' * i}", n=1 + i % 2) for i in range(8)]
+        )
+
+        store.ef.assert_called_once()
+        self.assertEqual(store.collection.query.call_count, 1)
+        self.assertEqual([len(r) for r in results], [1 + i % 2 for i in range(8)])
+        self.assertEqual(results[3][0]["excerpt"], "doc-4.0-0")
+        self.assertEqual(service.stats()["batching"]["avg_batch_size"], 8)
+
+    def test_filters_are_searched_separately(self):
+        store = _search_store()
+        service = RAGQueryService(store, batcher=QueryBatcher(store, window_ms=50))
+
+        results = self._run(
+            service,
+            lambda s: [
+                s.query("oom", 1, {"alert_name": "HighMemory"}),
+                s.query("oom", 1, None),
+            ],
+        )
+
+        store.ef.assert_called_once_with(["oom"])
+        self.assertEqual(store.collection.query.call_count, 2)
+        self.assertEqual(results[0][0]["metadata"]["alert_name"], "HighMemory")
+        self.assertEqual(results[1][0]["metadata"]["alert_name"], "any")
+
+    def test_cache_hit_skips_search(self):
+        store = _search_store()
+        service = RAGQueryService(store, batcher=QueryBatcher(store, window_ms=1))
+
+        async def scenario():
+            await service.start()
+            try:
+                first = await service.query("redis down", 2)
+                second = await service.query(" redis down ", 2)
+                await service.query("redis down", 3)
+                return first, second
+            finally:
+                await service.stop()
+
+        first, second = asyncio.run(scenario())
+
+        self.assertEqual(first, second)
+        self.assertEqual(store.collection.query.call_count, 2)
+        self.assertEqual((service.cache.hits, service.cache.misses), (1, 2))
+
+    def test_search_errors_reach_every_caller(self):
+        store = _search_store()
+        store.ef.side_effect = RuntimeError("model not loaded")
+        service = RAGQueryService(store, batcher=QueryBatcher(store, window_ms=20))
+
+        async def scenario():
+            await service.start()
+            try:
+                return await asyncio.gather(
+                    service.query("a"), service.query("b"), return_exceptions=True
+                )
+            finally:
+                await service.stop()
+
+        errors = asyncio.run(scenario())
+        self.assertTrue(all(isinstance(e, RuntimeError) for e in errors))
+        self.assertEqual(len(service.cache), 0)
+
+
+class TestQueryCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = QueryCache(max_size=2, ttl=60)
+        for q in ("a", "b"):
+            cache.put(QueryCache.key(q, 3), [q])
+        cache.get(QueryCache.key("a", 3))
+        cache.put(QueryCache.key("c", 3), ["c"])
+
+        self.assertIsNone(cache.get(QueryCache.key("b", 3)))
+        self.assertEqual(cache.get(QueryCache.key("a", 3)), ["a"])
+
+    def test_expired_entries_miss(self):
+        cache = QueryCache(max_size=2, ttl=0)
+        cache.put(QueryCache.key("a", 3), ["a"])
+        self.assertIsNone(cache.get(QueryCache.key("a", 3)))
+
+    def test_key_includes_filters(self):
+        self.assertNotEqual(
+            QueryCache.key("a", 3, {"alert_name": "X"}), QueryCache.key("a", 3)
+        )
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_quantiles_and_render(self):
+        histogram = LatencyHistogram()
+        for seconds in [0.002] * 90 + [0.2] * 10:
+            histogram.observe(seconds)
+
+        self.assertEqual(histogram.quantile(0.5), 0.0025)
+        self.assertEqual(histogram.quantile(0.95), 0.25)
+        lines = histogram.render("rag_latency_seconds", 'stage="search"')
+        self.assertIn('rag_latency_seconds_bucket{stage="search",le="+Inf"} 100', lines)
+        self.assertIn('rag_latency_seconds_count{stage="search"} 100', lines)
+
+
+if __name__ == "__main__":
+    unittest.main()
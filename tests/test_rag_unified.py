@@ -4,6 +4,8 @@ import unittest
 from unittest.mock import patch, MagicMock, Mock
 import tempfile
 import shutil
+import subprocess
+import threading
 
 # Add parent directory to path to import rag_unified
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -12,7 +14,34 @@ sys.path.insert(
     os.path.abspath(os.path.join(os.path.dirname(__file__), "../components/ai-agent")),
 )
 
-from rag_unified import UnifiedRAGPipeline, RAGResult, InMemoryBackend
+from rag_unified import (
+    UnifiedRAGPipeline,
+    RAGResult,
+    FAISSBackend,
+    InMemoryBackend,
+    hamming_distance,
+    normalize_post_mortem,
+    post_mortem_fingerprint,
+    simhash,
+    simhash_bands,
+)
+
+
+def _post_mortem(timestamp, alert_name, deployment, rca, result):
+    """Render a post-mortem in the same layout ai_agent writes."""
+    return (
+        f"# Post-Mortem: {alert_name}\n\n"
+        f"**Timestamp**: {timestamp} UTC\n"
+        "**Status**: Resolved (Self-Healed)\n\n"
+        "## Alert\n"
+        f"- **Summary**: Memory pressure on {deployment}\n"
+        "- **Description**: Container memory above 90% for 5 minutes\n\n"
+        f"## AI Root Cause Analysis\n{rca}\n\n"
+        "## Remediation Executed\n"
+        "- **Action**: `RESTART`\n"
+        f"- **Deployment**: `{deployment}` in `online-boutique`\n"
+        f"- **Result**: {result}\n"
+    )
 
 
 class TestRAGBackends(unittest.TestCase):
@@ -159,5 +188,281 @@ class TestInMemoryBackend(unittest.TestCase):
         self.assertEqual(self.backend.get_document_count(), 1)
 
 
+class TestNearDuplicateCollapsing(unittest.TestCase):
+    """Recurring post-mortems collapse into one canonical entry."""
+
+    def setUp(self):
+        with (
+            patch("rag_unified.ChromaDBBackend") as MockChroma,
+            patch("rag_unified.FAISSBackend") as MockFAISS,
+            patch("rag_unified.InMemoryBackend") as MockInMemory,
+        ):
+            MockChroma.return_value.is_available.return_value = False
+            MockFAISS.return_value.is_available.return_value = False
+            self.backend = InMemoryBackend()
+            MockInMemory.return_value = self.backend
+            self.pipeline = UnifiedRAGPipeline()
+
+    def test_simhash_ignores_volatile_fields(self):
+        first = _post_mortem(
+            "20260101-101010",
+            "HighMemory",
+            "paymentservice",
+            "Leak in gRPC handler.",
+            "ok",
+        )
+        second = _post_mortem(
+            "20260302-121314",
+            "HighMemory",
+            "paymentservice",
+            "Leak in gRPC handler.",
+            "[GitOps] committed",
+        )
+        other = _post_mortem(
+            "20260302-121314",
+            "PodCrashLooping",
+            "cartservice",
+            "Redis connection refused during startup.",
+            "ok",
+        )
+        fp = simhash(normalize_post_mortem(first))
+        self.assertEqual(fp, simhash(normalize_post_mortem(second)))
+        self.assertGreater(
+            hamming_distance(fp, simhash(normalize_post_mortem(other))), 3
+        )
+
+    def test_simhash_ignores_agent_outcome_fields(self):
+        """Post-mortems in the exact format handle_autonomous_lifecycle writes."""
+        import ai_agent
+
+        def render(timestamp, result, verified, source):
+            jobs = []
+            now = MagicMock()
+            now.strftime.return_value = timestamp
+            action = ai_agent.RemediationAction(
+                rca="Leak in gRPC handler.",
+                action="RESTART",
+                deployment="paymentservice",
+                namespace="online-boutique",
+            )
+            with (
+                patch.object(ai_agent, "_persist_job", jobs.append),
+                patch.object(ai_agent, "_fast_path", MagicMock()),
+                patch.object(ai_agent.datetime, "datetime") as clock,
+            ):
+                clock.utcnow.return_value = now
+                ai_agent.handle_autonomous_lifecycle(
+                    "HighMemory",
+                    {"alertname": "HighMemory"},
+                    {"summary": "Memory pressure", "description": "Above 90%"},
+                    action,
+                    result,
+                    verified=verified,
+                    source=source,
+                )
+            return post_mortem_fingerprint(jobs[0]["post_mortem"])
+
+        base = render("20260101-101010", "[GitOps ✅] committed", True, "llm")
+        for variant in (
+            render("20260302-121314", "[GitOps ✅] committed", True, "fast-path"),
+            render("20260101-101010", "[Direct Patch ✅] applied", True, "llm"),
+        ):
+            self.assertLessEqual(hamming_distance(base, variant), 3)
+
+        # A failed outcome must not merge into a verified one, or the reverse
+        failed = render("20260101-101010", "[GitOps ✅] committed", False, "llm")
+        self.assertGreater(hamming_distance(base, failed), 3)
+        for band, other in zip(simhash_bands(base), simhash_bands(failed)):
+            self.assertNotEqual(band, other)
+        retried = render("20260302-121314", "[Direct Patch ✅] applied", False, "llm")
+        self.assertLessEqual(hamming_distance(failed, retried), 3)
+
+    def test_recurring_incident_merges_into_canonical(self):
+        rca = "Leak in gRPC handler."
+        self.assertTrue(
+            self.pipeline.embed_post_mortem(
+                _post_mortem(
+                    "20260101-101010", "HighMemory", "paymentservice", rca, "ok"
+                ),
+                "HighMemory",
+                "20260101-101010",
+            )
+        )
+        for ts, result in [("20260102-101010", "retry"), ("20260103-101010", "done")]:
+            self.assertFalse(
+                self.pipeline.embed_post_mortem(
+                    _post_mortem(ts, "HighMemory", "paymentservice", rca, result),
+                    "HighMemory",
+                    ts,
+                )
+            )
+
+        self.assertEqual(self.backend.get_document_count(), 1)
+        meta = self.backend.documents[0]["metadata"]
+        self.assertEqual(meta["occurrences"], 3)
+        self.assertEqual(meta["first_seen"], "20260101-101010")
+        self.assertEqual(meta["last_seen"], "20260103-101010")
+        self.assertIn("seen 3x", self.pipeline.format_context_for_llm("gRPC leak"))
+
+    def test_verified_outcome_is_not_collapsed_into_a_failed_one(self):
+        from fast_path import parse_record, render_record
+
+        def post_mortem(ts, verified):
+            record = {
+                "alert": {
+                    "alert_name": "HighMemory",
+                    "deployment": "paymentservice",
+                    "namespace": "online-boutique",
+                },
+                "verified": verified,
+                "timestamp": ts,
+            }
+            body = _post_mortem(
+                ts, "HighMemory", "paymentservice", "Leak in gRPC handler.", "ok"
+            )
+            return body + render_record(record)
+
+        self.assertTrue(
+            self.pipeline.embed_post_mortem(
+                post_mortem("20260101-101010", False), "HighMemory"
+            )
+        )
+        self.assertTrue(
+            self.pipeline.embed_post_mortem(
+                post_mortem("20260102-101010", True), "HighMemory"
+            )
+        )
+        # Later occurrences still merge into the entry with their outcome
+        self.assertFalse(
+            self.pipeline.embed_post_mortem(
+                post_mortem("20260103-101010", True), "HighMemory", "20260103-101010"
+            )
+        )
+
+        self.assertEqual(self.backend.get_document_count(), 2)
+        outcomes = {
+            parse_record(d["content"])["verified"]: d["metadata"]["occurrences"]
+            for d in self.backend.documents
+        }
+        self.assertEqual(outcomes, {False: 1, True: 2})
+
+    def test_reindexing_same_files_does_not_inflate_counter(self):
+        rca = "Leak in gRPC handler."
+        canonical = _post_mortem(
+            "20260101-101010", "HighMemory", "paymentservice", rca, "a"
+        )
+        duplicate = _post_mortem(
+            "20260102-101010", "HighMemory", "paymentservice", rca, "b"
+        )
+
+        # Simulates index_post_mortems running on two agent restarts
+        for _ in range(2):
+            self.pipeline.embed_post_mortem(canonical, "HighMemory", "20260101-101010")
+            self.pipeline.embed_post_mortem(duplicate, "HighMemory", "20260102-101010")
+
+        self.assertEqual(self.backend.get_document_count(), 1)
+        self.assertEqual(self.backend.documents[0]["metadata"]["occurrences"], 2)
+
+    def test_distinct_incidents_are_kept(self):
+        self.pipeline.embed_post_mortem(
+            _post_mortem(
+                "20260101-101010", "HighMemory", "paymentservice", "Leak.", "ok"
+            ),
+            "HighMemory",
+        )
+        self.pipeline.embed_post_mortem(
+            _post_mortem(
+                "20260101-101010",
+                "PodCrashLooping",
+                "cartservice",
+                "Redis connection refused during startup.",
+                "ok",
+            ),
+            "PodCrashLooping",
+        )
+        self.assertEqual(self.backend.get_document_count(), 2)
+
+
+class TestWithoutNumpy(unittest.TestCase):
+    """The agent image ships without numpy; the pipeline must still load."""
+
+    def test_import_falls_back_to_keyword_matching(self):
+        code = (
+            "import sys; sys.modules['numpy'] = None\n"
+            "import rag_unified\n"
+            "p = rag_unified.UnifiedRAGPipeline()\n"
+            "assert p.embed_post_mortem('OOM on cart', 'HighMemory', '1')\n"
+            "assert p.query_similar_incidents('OOM')\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=os.path.join(os.path.dirname(__file__), "../components/ai-agent"),
+            capture_output=True,
+            text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
+class TestBatchedEmbedding(unittest.TestCase):
+    """Post-mortems embedded as a batch persist the vector index once."""
+
+    def test_faiss_persists_once_per_deferred_block(self):
+        backend = FAISSBackend.__new__(FAISSBackend)
+        backend._lock = threading.RLock()
+        backend._defer_depth = 0
+        backend._persist_pending = False
+        backend.faiss = Mock()
+        backend.pickle = Mock()
+        backend.index = Mock()
+        backend.metadata = []
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        backend._index_file = os.path.join(tmp, "faiss_index.bin")
+        backend._metadata_file = os.path.join(tmp, "metadata.pkl")
+
+        with backend.deferred_persist():
+            with backend.deferred_persist():
+                backend._persist()
+            backend._persist()
+            backend.faiss.write_index.assert_not_called()
+        backend.faiss.write_index.assert_called_once()
+
+        with backend.deferred_persist():
+            pass
+        backend.faiss.write_index.assert_called_once()
+
+    def test_embed_post_mortems(self):
+        with (
+            patch("rag_unified.ChromaDBBackend") as MockChroma,
+            patch("rag_unified.FAISSBackend") as MockFAISS,
+            patch("rag_unified.InMemoryBackend") as MockInMemory,
+        ):
+            MockChroma.return_value.is_available.return_value = False
+            MockFAISS.return_value.is_available.return_value = False
+            MockInMemory.return_value = InMemoryBackend()
+            pipeline = UnifiedRAGPipeline()
+
+        results = pipeline.embed_post_mortems(
+            [
+                (
+                    _post_mortem("1", "HighMemory", "cart", "leak", "RESTART"),
+                    "HighMemory",
+                    "1",
+                ),
+                ("Disk pressure on node", "DiskFull", "2"),
+            ]
+        )
+        self.assertEqual(results, [True, True])
+        self.assertEqual(pipeline.primary_backend.get_document_count(), 2)
+
+        # Already indexed is not a failure; no backend is
+        self.assertEqual(
+            pipeline.embed_post_mortems([("Disk pressure on node", "DiskFull", "2")]),
+            [False],
+        )
+        pipeline.primary_backend = None
+        self.assertIsNone(pipeline.embed_post_mortem("Disk full", "DiskFull", "3"))
+
+
 if __name__ == "__main__":
     unittest.main()
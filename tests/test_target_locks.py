@@ -0,0 +1,180 @@
+"""
+Unit tests for per-target remediation locks
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(
+    0,
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../components/ai-agent")),
+)
+
+from target_locks import RedisLease, TargetLockManager, TargetLockTimeout
+
+NS = "online-boutique"
+
+
+class FakeLeaseRedis:
+    """SET NX, compare-and-delete and compare-and-pexpire over a shared dict."""
+
+    def __init__(self, store=None):
+        self.store = {} if store is None else store
+        self.ttls = {}
+        self.fail = False
+
+    def set(self, key, value, nx=False, px=None):
+        if self.fail:
+            raise ConnectionError("redis down")
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        self.ttls[key] = px
+        return True
+
+    def register_script(self, lua):
+        def release(keys, args):
+            if self.store.get(keys[0]) == args[0]:
+                del self.store[keys[0]]
+                return 1
+            return 0
+
+        def renew(keys, args):
+            if self.fail:
+                raise ConnectionError("redis down")
+            if self.store.get(keys[0]) == args[0]:
+                self.ttls[keys[0]] = args[1]
+                return 1
+            return 0
+
+        return renew if "PEXPIRE" in lua else release
+
+
+class TestTargetLockManager(unittest.TestCase):
+    def test_different_targets_run_in_parallel(self):
+        locks = TargetLockManager(wait_timeout=1)
+        inside = threading.Barrier(2, timeout=1)
+
+        def remediate(name):
+            with locks.hold(NS, name):
+                inside.wait()
+
+        threads = [
+            threading.Thread(target=remediate, args=(n,)) for n in ("cart", "payment")
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertFalse(inside.broken)
+        self.assertEqual(locks.get_stats()["contended"], 0)
+        self.assertEqual(locks.get_stats()["active_targets"], 0)
+
+    def test_same_target_is_serialized(self):
+        locks = TargetLockManager(wait_timeout=1)
+        active = []
+        overlaps = []
+
+        def remediate():
+            with locks.hold(NS, "cart"):
+                active.append(1)
+                overlaps.append(len(active))
+                time.sleep(0.02)
+                active.pop()
+
+        threads = [threading.Thread(target=remediate) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(overlaps, [1, 1, 1, 1])
+        self.assertEqual(locks.get_stats()["acquired"], 4)
+        self.assertEqual(locks.get_stats()["active_targets"], 0)
+
+    def test_wait_timeout(self):
+        locks = TargetLockManager(wait_timeout=0.05)
+        held = threading.Event()
+        release = threading.Event()
+
+        def holder():
+            with locks.hold(NS, "cart"):
+                held.set()
+                release.wait(1)
+
+        t = threading.Thread(target=holder)
+        t.start()
+        held.wait(1)
+        with self.assertRaises(TargetLockTimeout):
+            with locks.hold(NS, "cart"):
+                pass
+        release.set()
+        t.join()
+        self.assertEqual(locks.get_stats()["timeouts"], 1)
+        self.assertEqual(locks.get_stats()["active_targets"], 0)
+
+
+class TestRedisLease(unittest.TestCase):
+    def test_lease_excludes_other_replicas(self):
+        store = {}
+        replica_a = TargetLockManager(RedisLease(FakeLeaseRedis(store)), 1)
+        replica_b = TargetLockManager(
+            RedisLease(FakeLeaseRedis(store), poll_interval=0.01), 0.05
+        )
+
+        with replica_a.hold(NS, "cart"):
+            self.assertIn(f"remediation-lock:{NS}/cart", store)
+            with self.assertRaises(TargetLockTimeout):
+                with replica_b.hold(NS, "cart"):
+                    pass
+            with replica_b.hold(NS, "payment"):
+                pass
+        self.assertEqual(store, {})
+
+        with replica_b.hold(NS, "cart"):
+            pass
+
+    def test_release_only_removes_own_lease(self):
+        redis = FakeLeaseRedis()
+        lease = RedisLease(redis)
+        token = lease.acquire("ns/cart", wait=0)
+        # The lease expired and another replica took it over
+        redis.store["remediation-lock:ns/cart"] = "other"
+        lease.release("ns/cart", token)
+        self.assertEqual(redis.store["remediation-lock:ns/cart"], "other")
+
+    def test_lease_is_renewed_while_held(self):
+        redis = FakeLeaseRedis()
+        lease = RedisLease(redis, ttl=0.06)
+        locks = TargetLockManager(lease, 1)
+        with locks.hold(NS, "cart"):
+            time.sleep(0.1)
+            self.assertGreaterEqual(lease.renewals, 2)
+        renewals = lease.renewals
+        time.sleep(0.05)
+        # The heartbeat stops with the lease
+        self.assertEqual(lease.renewals, renewals)
+        self.assertEqual(redis.store, {})
+
+    def test_renewal_stops_once_lease_is_lost(self):
+        redis = FakeLeaseRedis()
+        lease = RedisLease(redis, ttl=30)
+        token = lease.acquire("ns/cart", wait=0)
+        self.assertTrue(lease.renew("ns/cart", token))
+        redis.store["remediation-lock:ns/cart"] = "other"
+        self.assertFalse(lease.renew("ns/cart", token))
+        self.assertEqual(redis.ttls["remediation-lock:ns/cart"], 30000)
+
+    def test_redis_failure_falls_back_to_local_lock(self):
+        redis = FakeLeaseRedis()
+        redis.fail = True
+        locks = TargetLockManager(RedisLease(redis), 1)
+        with locks.hold(NS, "cart"):
+            pass
+        self.assertEqual(locks.get_stats()["acquired"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
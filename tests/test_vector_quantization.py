@@ -0,0 +1,213 @@
+"""
+Unit tests for quantized vector storage (int8 / PQ with exact re-ranking)
+"""
+
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(
+    0,
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../components/ai-agent")),
+)
+
+import agent_config
+from vector_quantization import (
+    FloatVectorFile,
+    exact_rerank,
+    int8_scores,
+    normalize,
+    quantize_int8,
+)
+
+try:
+    import faiss  # noqa: F401
+
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+DIM = 64
+
+
+class FakeSentenceTransformer:
+    """Deterministic bag-of-words embedder standing in for sentence-transformers."""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def encode(self, texts):
+        out = np.zeros((len(texts), DIM), dtype="float32")
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                h = int(
+                    hashlib.md5(word.encode(), usedforsecurity=False).hexdigest(), 16
+                )
+                out[row, h % DIM] += 1.0 if (h >> 8) & 1 else -1.0
+        return out
+
+
+def _fake_sentence_transformers():
+    module = types.ModuleType("sentence_transformers")
+    module.SentenceTransformer = FakeSentenceTransformer
+    return module
+
+
+class TestQuantizationHelpers(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.vectors = normalize(rng.standard_normal((200, DIM)))
+
+    def test_int8_roundtrip_error_is_small(self):
+        codes, scale = quantize_int8(self.vectors[0])
+        self.assertEqual(codes.dtype, np.int8)
+        self.assertLess(np.max(np.abs(codes * scale - self.vectors[0])), scale)
+
+    def test_int8_scores_preserve_ranking(self):
+        quantized = [quantize_int8(v) for v in self.vectors]
+        codes = np.stack([c for c, _ in quantized])
+        scales = np.array([s for _, s in quantized], dtype="float32")
+        query = self.vectors[17]
+
+        approx = int8_scores(codes, scales, query)
+        self.assertEqual(int(np.argmax(approx)), 17)
+
+    def test_exact_rerank_orders_by_distance(self):
+        ranked = exact_rerank(self.vectors[3], [5, 3, 9, -1], self.vectors, k=2)
+        self.assertEqual(ranked[0][0], 3)
+        self.assertAlmostEqual(ranked[0][1], 0.0, places=5)
+        self.assertEqual(len(ranked), 2)
+
+    def test_float_vector_file_appends(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            store = FloatVectorFile(os.path.join(tmp, "vectors.f32"), DIM)
+            self.assertEqual(len(store), 0)
+            store.append(self.vectors[:3])
+            store.append(self.vectors[3:5])
+            self.assertEqual(len(store), 5)
+            np.testing.assert_allclose(store.view()[4], self.vectors[4])
+        finally:
+            shutil.rmtree(tmp)
+
+
+@unittest.skipUnless(FAISS_AVAILABLE, "faiss not installed")
+class TestFAISSQuantizedBackend(unittest.TestCase):
+    DOCS = [
+        "paymentservice OOMKilled memory leak in grpc handler",
+        "cartservice redis connection refused crash loop",
+        "frontend high latency ingress buffering saturated",
+        "checkoutservice certificate expired mtls handshake failure",
+        "shippingservice cpu throttling under load spike",
+    ]
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.modules = patch.dict(
+            sys.modules, {"sentence_transformers": _fake_sentence_transformers()}
+        )
+        self.modules.start()
+
+    def tearDown(self):
+        self.modules.stop()
+        shutil.rmtree(self.tmp)
+
+    def _backend(self, quantization, **overrides):
+        from rag_unified import FAISSBackend
+
+        vector_config = agent_config.config.vector_store.model_copy(
+            update={
+                "vector_dim": DIM,
+                "persist_directory": self.tmp,
+                "quantization": quantization,
+                "pq_m": 8,
+                **overrides,
+            }
+        )
+        with patch.object(agent_config.config, "vector_store", vector_config):
+            backend = FAISSBackend()
+        self.assertTrue(backend.is_available())
+        return backend
+
+    def _embed_all(self, backend):
+        for i, doc in enumerate(self.DOCS):
+            self.assertTrue(backend.embed_document(doc, f"doc{i}", {"i": i}))
+
+    def test_int8_query_matches_float_baseline(self):
+        baseline = self._backend("none")
+        self._embed_all(baseline)
+        shutil.rmtree(self.tmp)
+        os.makedirs(self.tmp)
+
+        quantized = self._backend("int8")
+        self._embed_all(quantized)
+        self.assertEqual(quantized.get_document_count(), len(self.DOCS))
+
+        for doc in self.DOCS:
+            expected = baseline.query(doc, n_results=1)[0]
+            actual = quantized.query(doc, n_results=1)[0]
+            self.assertEqual(actual.metadata["doc_id"], expected.metadata["doc_id"])
+
+    def test_int8_index_reloads_from_disk(self):
+        self._embed_all(self._backend("int8"))
+
+        reloaded = self._backend("int8")
+        self.assertEqual(reloaded.get_document_count(), len(self.DOCS))
+        hit = reloaded.query("redis connection refused", n_results=1)[0]
+        self.assertEqual(hit.metadata["doc_id"], "doc1")
+
+    def test_switching_to_int8_rebuilds_from_metadata(self):
+        self._embed_all(self._backend("none"))
+
+        switched = self._backend("int8")
+        self.assertEqual(switched.index.ntotal, len(self.DOCS))
+        hit = switched.query("certificate expired", n_results=1)[0]
+        self.assertEqual(hit.metadata["doc_id"], "doc3")
+
+    def test_pq_exact_scan_before_training(self):
+        backend = self._backend("pq", pq_train_size=10_000)
+        self._embed_all(backend)
+
+        self.assertFalse(backend.index.is_trained)
+        hit = backend.query("cpu throttling", n_results=1)[0]
+        self.assertEqual(hit.metadata["doc_id"], "doc4")
+
+
+class TestInMemoryQuantizedBackend(unittest.TestCase):
+    def setUp(self):
+        self.modules = patch.dict(
+            sys.modules, {"sentence_transformers": _fake_sentence_transformers()}
+        )
+        self.modules.start()
+
+    def tearDown(self):
+        self.modules.stop()
+
+    def test_int8_codes_cached_and_reranked(self):
+        from rag_unified import InMemoryBackend
+
+        vector_config = agent_config.config.vector_store.model_copy(
+            update={"quantization": "int8", "rerank_factor": 2}
+        )
+        with patch.object(agent_config.config, "vector_store", vector_config):
+            backend = InMemoryBackend()
+
+        for i, doc in enumerate(TestFAISSQuantizedBackend.DOCS):
+            backend.embed_document(doc, f"doc{i}", {"alert_name": f"A{i}"})
+
+        self.assertEqual(backend.documents[0]["codes"].dtype, np.int8)
+        self.assertNotIn("vector", backend.documents[0])
+        hits = backend.query("mtls certificate expired", n_results=2)
+        self.assertEqual(hits[0].metadata["alert_name"], "A3")
+        self.assertGreaterEqual(hits[0].similarity, hits[1].similarity)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Unit tests for the agent-managed shallow, sparse working copy
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(
+    0,
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../components/ai-agent")),
+)
+
+from git_backend import GitError
+from working_copy import WorkingCopy, url_with_token
+
+
+def _git(repo, *args):
+    return subprocess.run(
+        ["git", "-C", repo, "-c", "user.name=t", "-c", "user.email=t@x", *args],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+
+class TestUrlWithToken(unittest.TestCase):
+    def test_inserts_token(self):
+        self.assertEqual(
+            url_with_token("https://github.com/org/repo.git", "tok"),
+            "https://tok@github.com/org/repo.git",
+        )
+        self.assertEqual(
+            url_with_token("https://old@github.com/org/repo", "tok"),
+            "https://tok@github.com/org/repo",
+        )
+        self.assertEqual(url_with_token("/srv/repo.git", "tok"), "/srv/repo.git")
+
+
+@unittest.skipUnless(shutil.which("git"), "git not installed")
+class TestWorkingCopy(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.remote = os.path.join(self.tmp, "remote.git")
+        seed = os.path.join(self.tmp, "seed")
+        subprocess.run(["git", "init", "-q", "--bare", self.remote], check=True)
+        _git(self.remote, "config", "uploadpack.allowFilter", "true")
+        subprocess.run(["git", "init", "-q", seed], check=True)
+        _git(seed, "checkout", "-q", "-b", "main")
+        for rel in ("apps/cart.yaml", "runbooks/a.md", "services/big/blob.bin"):
+            self._write(seed, rel, rel)
+        _git(seed, "add", ".")
+        for i in range(3):
+            _git(seed, "commit", "-q", "--allow-empty", "-m", f"c{i}")
+        _git(seed, "push", "-q", self.remote, "main")
+        self.seed = seed
+        self.repo = os.path.join(self.tmp, "work")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _write(self, repo, rel, content):
+        path = os.path.join(repo, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+
+    def _identity(self):
+        # The git backend's setup() does this for the agent
+        _git(self.repo, "config", "user.name", "AI SRE Agent")
+        _git(self.repo, "config", "user.email", "agent@x")
+
+    def _copy(self):
+        return WorkingCopy(
+            self.repo,
+            "main",
+            url=f"file://{self.remote}",
+            sparse_paths=["apps", "runbooks", "post-mortems"],
+        )
+
+    def test_clone_is_shallow_and_sparse(self):
+        copy = self._copy()
+        copy.ensure()
+
+        self.assertTrue(os.path.exists(os.path.join(self.repo, "apps", "cart.yaml")))
+        self.assertTrue(os.path.exists(os.path.join(self.repo, "runbooks", "a.md")))
+        self.assertFalse(os.path.exists(os.path.join(self.repo, "services")))
+        self.assertEqual(_git(self.repo, "rev-list", "--count", "HEAD").strip(), "1")
+        self.assertIsNotNone(copy.get_stats()["clone_seconds"])
+
+        # Idempotent on an existing clone
+        copy.ensure()
+
+    def test_missing_repository_without_url(self):
+        with self.assertRaises(GitError):
+            WorkingCopy(self.repo, "main").ensure()
+
+    def test_sync_rebases_local_commit_and_keeps_local_edits(self):
+        copy = self._copy()
+        copy.ensure()
+        self._identity()
+        self._write(self.seed, "apps/checkout.yaml", "checkout")
+        _git(self.seed, "add", ".")
+        _git(self.seed, "commit", "-q", "-m", "upstream")
+        _git(self.seed, "push", "-q", self.remote, "main")
+
+        self._write(self.repo, "apps/cart.yaml", "scaled")
+        _git(self.repo, "commit", "-qam", "local")
+        self._write(self.repo, "runbooks/a.md", "edited runbook")
+        copy.sync()
+
+        log = _git(self.repo, "log", "--format=%s").splitlines()
+        self.assertEqual(log[:2], ["local", "upstream"])
+        self.assertTrue(os.path.exists(os.path.join(self.repo, "apps/checkout.yaml")))
+        with open(os.path.join(self.repo, "runbooks", "a.md")) as f:
+            self.assertEqual(f.read(), "edited runbook")
+        self.assertEqual(copy.get_stats()["syncs"], 1)
+
+    def test_conflicting_sync_is_aborted(self):
+        copy = self._copy()
+        copy.ensure()
+        self._identity()
+        self._write(self.seed, "apps/cart.yaml", "upstream")
+        _git(self.seed, "commit", "-qam", "upstream")
+        _git(self.seed, "push", "-q", self.remote, "main")
+        self._write(self.repo, "apps/cart.yaml", "local")
+        _git(self.repo, "commit", "-qam", "local")
+
+        with self.assertRaises(GitError):
+            copy.sync()
+        self.assertEqual(_git(self.repo, "log", "-1", "--format=%s").strip(), "local")
+        self.assertFalse(os.path.isdir(os.path.join(self.repo, ".git", "rebase-merge")))
+        self.assertEqual(copy.get_stats()["sync_failures"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()